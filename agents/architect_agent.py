@@ -1,22 +1,21 @@
-import os
 from google.adk import Agent
-from google.adk.models import Gemini
+from src.model_registry import get_model
 
-def create_architect_agent(api_key: str = None):
+def create_architect_agent(api_key: str = None, output_dir: str = "OUTPUT", model=None):
     """
     Creates and configures the Architect Agent.
+
+    Args:
+        api_key (str, optional): Google API key. Falls back to GOOGLE_API_KEY.
+        output_dir (str): Directory the generated project is written to.
+        model (BaseLlm, optional): Model to use instead of Gemini, e.g. a ReplayLlm.
     """
     
-    # Ensure GOOGLE_API_KEY is set
-    if api_key:
-        os.environ["GOOGLE_API_KEY"] = api_key
-    
-    if not os.getenv("GOOGLE_API_KEY"):
-        raise ValueError("GOOGLE_API_KEY environment variable is not set")
-
-    model = Gemini(model="gemini-2.0-flash")
+    if model is None:
+        # Shared across agents; raises ValueError if no API key is available
+        model = get_model(api_key=api_key)
     
-    instruction = """
+    instruction = f"""
     You are a Software Architect Agent. Your goal is to design a robust, production-ready folder structure for a Python project based on provided code and documentation.
     
     Input:
@@ -29,17 +28,17 @@ def create_architect_agent(api_key: str = None):
     - Values are descriptions of what should go in them.
     
     Example Output:
-    {
-        "OUTPUT/src": {
+    {{
+        "{output_dir}/src": {{
             "data_loader.py": "Functions for loading and preprocessing data",
             "model.py": "Model definition class",
             "train.py": "Training loop"
-        },
-        "OUTPUT/requirements.txt": "List of dependencies",
-        "OUTPUT/README.md": "Project documentation"
-    }
+        }},
+        "{output_dir}/requirements.txt": "List of dependencies",
+        "{output_dir}/README.md": "Project documentation"
+    }}
     
-    IMPORTANT: ALL files and directories MUST be inside the 'OUTPUT' directory.
+    IMPORTANT: ALL files and directories MUST be inside the '{output_dir}' directory.
     Do not write any code. Just design the structure.
     """
     
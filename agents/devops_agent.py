@@ -1,23 +1,22 @@
-import os
 from google.adk import Agent
-from google.adk.models import Gemini
+from src.model_registry import get_model
 from src.tools.notebook_tools import write_file
 
-def create_devops_agent(api_key: str = None):
+def create_devops_agent(api_key: str = None, output_dir: str = "OUTPUT", model=None):
     """
     Creates and configures the DevOps Agent.
+
+    Args:
+        api_key (str, optional): Google API key. Falls back to GOOGLE_API_KEY.
+        output_dir (str): Directory the generated project is written to.
+        model (BaseLlm, optional): Model to use instead of Gemini, e.g. a ReplayLlm.
     """
     
-    # Ensure GOOGLE_API_KEY is set
-    if api_key:
-        os.environ["GOOGLE_API_KEY"] = api_key
-    
-    if not os.getenv("GOOGLE_API_KEY"):
-        raise ValueError("GOOGLE_API_KEY environment variable is not set")
-
-    model = Gemini(model="gemini-2.0-flash")
+    if model is None:
+        # Shared across agents; raises ValueError if no API key is available
+        model = get_model(api_key=api_key)
     
-    instruction = """
+    instruction = f"""
     You are a DevOps Agent. Your goal is to create the necessary configuration files for deploying a Python application.
     
     Input:
@@ -29,8 +28,8 @@ def create_devops_agent(api_key: str = None):
     3. Ensure `requirements.txt` is mentioned or updated if needed (though usually handled by Refactorer, you can double check).
     4. Use `write_file(path, content)` to save these files.
     
-    IMPORTANT: All files must be saved inside the 'OUTPUT' directory.
-    - Example: `OUTPUT/Dockerfile`, `OUTPUT/.github/workflows/ci.yml`
+    IMPORTANT: All files must be saved inside the '{output_dir}' directory.
+    - Example: `{output_dir}/Dockerfile`, `{output_dir}/.github/workflows/ci.yml`
     
     Guidelines:
     - Use multi-stage builds in Dockerfile if appropriate for size.
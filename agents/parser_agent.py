@@ -1,23 +1,21 @@
-import os
 from google.adk import Agent
-from google.adk.models import Gemini
+from src.model_registry import get_model
 from src.tools.notebook_tools import read_notebook
 
-from src.callbacks.pii_guardrail import pii_guardrail
+from src.callbacks.pii_guardrail import pii_guardrail, pii_tool_guardrail
 
-def create_parser_agent(api_key: str = None):
+def create_parser_agent(api_key: str = None, model=None):
     """
     Creates and configures the Parser Agent.
+
+    Args:
+        api_key (str, optional): Google API key. Falls back to GOOGLE_API_KEY.
+        model (BaseLlm, optional): Model to use instead of Gemini, e.g. a ReplayLlm.
     """
     
-    # Ensure GOOGLE_API_KEY is set
-    if api_key:
-        os.environ["GOOGLE_API_KEY"] = api_key
-    
-    if not os.getenv("GOOGLE_API_KEY"):
-        raise ValueError("GOOGLE_API_KEY environment variable is not set")
-
-    model = Gemini(model="gemini-2.0-flash")
+    if model is None:
+        # Shared across agents; raises ValueError if no API key is available
+        model = get_model(api_key=api_key)
     
     instruction = """
     You are a Notebook Parser Agent. Your goal is to take a raw Jupyter Notebook and extract two things:
@@ -30,6 +28,9 @@ def create_parser_agent(api_key: str = None):
     1. Read it using the tool.
     2. Analyze the content.
     3. Return a JSON-formatted string with keys "code" and "documentation".
+    
+    Large notebooks are sent in parts with their cells in the message. Then do not read the notebook;
+    return the same JSON for the given cells only, keeping their "# Cell N" numbers.
     """
     
     agent = Agent(
@@ -37,7 +38,8 @@ def create_parser_agent(api_key: str = None):
         instruction=instruction,
         tools=[read_notebook],
         name="parser_agent",
-        before_agent_callback=pii_guardrail
+        before_agent_callback=pii_guardrail,
+        after_tool_callback=pii_tool_guardrail
     )
     
     return agent
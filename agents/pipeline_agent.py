@@ -2,6 +2,7 @@ import os
 from google.adk import Agent
 from google.adk.models.lite_llm import LiteLlm
 from src.tools.notebook_tools import read_notebook, write_file
+from src.callbacks.pii_guardrail import pii_tool_guardrail
 
 def create_pipeline_agent(api_key: str = None):
     """
@@ -47,7 +48,8 @@ def create_pipeline_agent(api_key: str = None):
         model=model,
         instruction=system_prompt,
         tools=[read_notebook, write_file],
-        name="pipeline_agent"
+        name="pipeline_agent",
+        after_tool_callback=pii_tool_guardrail
     )
     
     return agent
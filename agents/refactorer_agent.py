@@ -1,23 +1,22 @@
-import os
 from google.adk import Agent
-from google.adk.models import Gemini
+from src.model_registry import get_model
 from src.tools.notebook_tools import write_file
 
-def create_refactorer_agent(api_key: str = None):
+def create_refactorer_agent(api_key: str = None, output_dir: str = "OUTPUT", model=None):
     """
     Creates and configures the Refactorer Agent.
+
+    Args:
+        api_key (str, optional): Google API key. Falls back to GOOGLE_API_KEY.
+        output_dir (str): Directory the generated project is written to.
+        model (BaseLlm, optional): Model to use instead of Gemini, e.g. a ReplayLlm.
     """
     
-    # Ensure GOOGLE_API_KEY is set
-    if api_key:
-        os.environ["GOOGLE_API_KEY"] = api_key
-    
-    if not os.getenv("GOOGLE_API_KEY"):
-        raise ValueError("GOOGLE_API_KEY environment variable is not set")
-
-    model = Gemini(model="gemini-2.0-flash")
+    if model is None:
+        # Shared across agents; raises ValueError if no API key is available
+        model = get_model(api_key=api_key)
     
-    instruction = """
+    instruction = f"""
     You are a Code Refactoring Agent. Your goal is to write production-ready Python code based on a provided folder structure plan and raw notebook code.
     
     Input:
@@ -30,6 +29,8 @@ def create_refactorer_agent(api_key: str = None):
     2. For EACH file defined in the Architecture Plan, generate the appropriate code.
     3. Use the `write_file(path, content)` tool to write the code to disk.
     
+    IMPORTANT: All files must be saved inside the '{output_dir}' directory.
+    
     Guidelines:
     - Ensure code is modular, clean, and follows PEP 8.
     - Add docstrings to functions and classes.
@@ -1,21 +1,19 @@
-import os
 from google.adk import Agent
-from google.adk.models import Gemini
+from src.model_registry import get_model
 from src.tools.notebook_tools import read_file
 
-def create_reviewer_agent(api_key: str = None):
+def create_reviewer_agent(api_key: str = None, model=None):
     """
     Creates and configures the Reviewer Agent.
+
+    Args:
+        api_key (str, optional): Google API key. Falls back to GOOGLE_API_KEY.
+        model (BaseLlm, optional): Model to use instead of Gemini, e.g. a ReplayLlm.
     """
     
-    # Ensure GOOGLE_API_KEY is set
-    if api_key:
-        os.environ["GOOGLE_API_KEY"] = api_key
-    
-    if not os.getenv("GOOGLE_API_KEY"):
-        raise ValueError("GOOGLE_API_KEY environment variable is not set")
-
-    model = Gemini(model="gemini-2.0-flash")
+    if model is None:
+        # Shared across agents; raises ValueError if no API key is available
+        model = get_model(api_key=api_key)
     
     instruction = """
     You are a Code Reviewer Agent. Your goal is to review the generated code and documentation for quality, efficiency, and correctness.
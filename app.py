@@ -2,22 +2,17 @@ import streamlit as st
 import os
 import sys
 import shutil
-import time
+import asyncio
+import queue
+import threading
 from dotenv import load_dotenv
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from google.adk.runners import Runner
-from google.adk.sessions.in_memory_session_service import InMemorySessionService
-from google.genai import types
-
-from agents.parser_agent import create_parser_agent
-from agents.architect_agent import create_architect_agent
-from agents.refactorer_agent import create_refactorer_agent
-from agents.devops_agent import create_devops_agent
-from agents.reviewer_agent import create_reviewer_agent
-from src.utils.security import check_pii
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.pipeline.streaming import StageTranscript, StreamEvent
+from src.pipeline.scan_view import check_notebook_pii
 
 # Page config
 st.set_page_config(
@@ -29,115 +24,41 @@ st.set_page_config(
 # Load environment
 load_dotenv()
 
-def get_response_text(response):
-    """Extract text from ADK response generator"""
-    if hasattr(response, 'text'):
-        return response.text
-    text = ""
-    for event in response:
-        if hasattr(event, 'content') and hasattr(event.content, 'parts'):
-            for part in event.content.parts:
-                if hasattr(part, 'text') and part.text:
-                    text += part.text
-        elif hasattr(event, 'text') and event.text:
-            text += event.text
-        elif isinstance(event, str):
-            text += event
-    return text
-
-def run_pipeline_generator(notebook_path, api_key):
-    """Run the multi-agent pipeline and yield status updates"""
-    
-    yield "🚀 Initializing agents..."
-    
-    try:
-        parser_agent = create_parser_agent(api_key=api_key)
-        architect_agent = create_architect_agent(api_key=api_key)
-        refactorer_agent = create_refactorer_agent(api_key=api_key)
-        devops_agent = create_devops_agent(api_key=api_key)
-        reviewer_agent = create_reviewer_agent(api_key=api_key)
-    except Exception as e:
-        yield f"❌ Error initializing agents: {str(e)}"
-        return
-
-    # Initialize session
-    session_service = InMemorySessionService()
-    APP_NAME = "notebook_to_code_pipeline"
-    USER_ID = "web_user"
-    SESSION_ID = "web_session"
-    
-    session_service.create_session(
-        app_name=APP_NAME,
-        user_id=USER_ID,
-        session_id=SESSION_ID
-    )
-    
-    # Parser Agent
-    yield "🔍 Parser Agent: Reading and analyzing notebook..."
-    parser_runner = Runner(agent=parser_agent, app_name=APP_NAME, session_service=session_service)
-    parser_response = parser_runner.run(
-        user_id=USER_ID, 
-        session_id=SESSION_ID, 
-        new_message=types.Content(role="user", parts=[types.Part(text=f"Parse the notebook at '{notebook_path}'")])
-    )
-    get_response_text(parser_response) # Consume
-    yield "✅ Parser Agent: Notebook parsed successfully."
-    
-    # Architect Agent
-    yield "🏗️ Architect Agent: Designing project structure..."
-    architect_runner = Runner(agent=architect_agent, app_name=APP_NAME, session_service=session_service)
-    architect_response = architect_runner.run(
-        user_id=USER_ID, 
-        session_id=SESSION_ID, 
-        new_message=types.Content(role="user", parts=[types.Part(text="Based on the parsed code and documentation, design the project structure.")])
-    )
-    get_response_text(architect_response) # Consume
-    yield "✅ Architect Agent: Project structure designed."
-    
-    # Feedback Loop
-    max_rounds = 3
-    for round_num in range(1, max_rounds + 1):
-        yield f"🔄 Round {round_num}: Refactoring code..."
-        
-        # Refactorer Agent
-        refactorer_runner = Runner(agent=refactorer_agent, app_name=APP_NAME, session_service=session_service)
-        refactorer_response = refactorer_runner.run(
-            user_id=USER_ID, 
-            session_id=SESSION_ID, 
-            new_message=types.Content(role="user", parts=[types.Part(text="Generate the production-ready code based on the plan.")])
-        )
-        get_response_text(refactorer_response) # Consume
-        
-        # DevOps Agent
-        yield f"⚙️ Round {round_num}: Creating deployment files..."
-        devops_runner = Runner(agent=devops_agent, app_name=APP_NAME, session_service=session_service)
-        devops_response = devops_runner.run(
-            user_id=USER_ID, 
-            session_id=SESSION_ID, 
-            new_message=types.Content(role="user", parts=[types.Part(text="Create the deployment configuration files.")])
-        )
-        get_response_text(devops_response) # Consume
-        
-        # Reviewer Agent
-        yield f"👀 Round {round_num}: Reviewing code..."
-        reviewer_runner = Runner(agent=reviewer_agent, app_name=APP_NAME, session_service=session_service)
-        review_response = reviewer_runner.run(
-            user_id=USER_ID, 
-            session_id=SESSION_ID, 
-            new_message=types.Content(role="user", parts=[types.Part(text="Review the generated code and configuration. If everything is production-ready with no issues, respond with ONLY 'APPROVED'. If there are any issues, provide ONLY specific feedback without saying APPROVED.")])
+def run_pipeline_events(notebook_path, api_key, output_dir="OUTPUT"):
+    """
+    Runs the multi-agent pipeline in a worker thread and yields its progress
+    as it happens: ("status", line), ("event", StreamEvent), and finally
+    ("done", PipelineResult) or ("error", message).
+    """
+    updates = queue.Queue()
+
+    def worker():
+        try:
+            agents = create_pipeline_agents(api_key=api_key, output_dir=output_dir)
+        except Exception as e:
+            updates.put(("error", f"Error initializing agents: {str(e)}"))
+            return
+        engine = PipelineEngine(
+            agents=agents,
+            user_id="web_user",
+            session_id="web_session",
+            output_dir=output_dir,
+            on_status=lambda line: updates.put(("status", line)),
+            on_event=lambda event: updates.put(("event", event)),
         )
-        
-        final_response = get_response_text(review_response)
-        
-        if "APPROVED" in final_response:
-            yield "🎉 Pipeline completed! Code approved."
+        try:
+            updates.put(("done", asyncio.run(engine.run(notebook_path))))
+        except Exception as e:
+            updates.put(("error", f"Pipeline failed: {str(e)}"))
+
+    # Streamlit elements may only be updated from the script thread, so the
+    # worker hands everything over through the queue.
+    threading.Thread(target=worker, daemon=True).start()
+    while True:
+        kind, payload = updates.get()
+        yield kind, payload
+        if kind in ("done", "error"):
             return
-        else:
-            if round_num == max_rounds:
-                yield f"⚠️ Max rounds reached. Last feedback: {final_response[:100]}..."
-                return
-            else:
-                yield f"🔧 Reviewer Feedback: {final_response[:100]}... Retrying."
 
 # --- Chat UI ---
 
@@ -174,23 +95,47 @@ if uploaded_file and api_key:
         # PII Check
         with st.chat_message("assistant"):
             st.markdown("🔒 Checking for PII...")
-            with open(notebook_path, 'r') as f:
-                warnings = check_pii(f.read())
-                if warnings:
-                    st.error("⚠️ PII Detected! Please sanitize your notebook.")
-                    st.stop()
-                else:
-                    st.success("✅ No PII detected.")
+            # Only a block/allow decision is needed here: stop at the first match.
+            warnings = check_notebook_pii(notebook_path, first_only=True)
+            if warnings:
+                st.error("⚠️ PII Detected! Please sanitize your notebook.")
+                for w in warnings:
+                    st.markdown(f"- {w}")
+                st.stop()
+            else:
+                st.success("✅ No PII detected.")
 
             # Run Pipeline
-            message_placeholder = st.empty()
-            full_response = ""
-            
-            for status_update in run_pipeline_generator(notebook_path, api_key):
-                full_response += status_update + "\n\n"
-                message_placeholder.markdown(full_response)
-                time.sleep(0.5) # UI smoothing
-            
+            status_placeholder = st.empty()
+            status_lines = ["🚀 Initializing agents..."]
+            status_placeholder.markdown(status_lines[0])
+            transcript = StageTranscript()
+            stage_placeholders = {}
+            round_label = "Planning"
+
+            for kind, payload in run_pipeline_events(notebook_path, api_key):
+                if kind == "event":
+                    # One placeholder per stage and round, filled as the agent writes.
+                    key = f"{round_label} · {payload.stage}"
+                    if key not in stage_placeholders:
+                        stage_placeholders[key] = st.empty()
+                    transcript.add(StreamEvent(key, payload.kind, payload.text, payload.partial))
+                    stage_placeholders[key].markdown(f"**{key}**\n\n{transcript.render(key)}")
+                    continue
+                if kind == "status":
+                    if payload.startswith("=== Round"):
+                        round_label = payload.strip("= ")
+                    status_lines.append(f"🔄 {payload}")
+                elif kind == "done":
+                    if payload.approved:
+                        status_lines.append("🎉 Pipeline completed! Code approved.")
+                    else:
+                        status_lines.append(f"⚠️ Max rounds reached. Last feedback: {payload.verdict[:100]}...")
+                else:
+                    status_lines.append(f"❌ {payload}")
+                status_placeholder.markdown("\n\n".join(status_lines))
+            full_response = "\n\n".join(status_lines)
+
             # Finalize
             if os.path.exists("OUTPUT") and os.listdir("OUTPUT"):
                 shutil.make_archive("generated_code", 'zip', "OUTPUT")
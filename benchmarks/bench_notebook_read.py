@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Notebook reading benchmark.
+
+Writes a synthetic plot-heavy notebook (code cells with large base64 PNG
+outputs) and compares ``nbformat.read`` with the streaming reader used by the
+local parser and the ``read_notebook`` tool: median wall time and peak Python
+memory of extracting the cell sources.
+
+Usage:
+    python benchmarks/bench_notebook_read.py
+    python benchmarks/bench_notebook_read.py --size-mb 200 --repeat 3 --json read.json
+"""
+
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import nbformat
+
+from src.pipeline.notebook_stream import iter_cells
+
+
+def write_notebook(path: str, size_mb: int, cells: int):
+    per_cell = max(1, size_mb * (1 << 20) * 3 // 4 // cells)
+    notebook = nbformat.v4.new_notebook()
+    for i in range(cells):
+        cell = nbformat.v4.new_code_cell(f"fig, ax = plt.subplots()\nax.plot(data[{i}])\nplt.show()")
+        png = base64.b64encode(os.urandom(per_cell)).decode("ascii")
+        cell.outputs = [nbformat.v4.new_output("display_data", data={"image/png": png, "text/plain": "<Figure>"})]
+        notebook.cells.append(cell)
+    with open(path, "w", encoding="utf-8") as f:
+        nbformat.write(notebook, f)
+
+
+def read_nbformat(path: str):
+    return [cell.source for cell in nbformat.read(path, as_version=4).cells]
+
+
+def read_stream(path: str):
+    return [cell.source for cell in iter_cells(path)]
+
+
+def measure(reader, path: str, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reader(path)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        reader(path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"median_s": statistics.median(times), "peak_mb": peak / (1 << 20)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=50, help="Approximate notebook size")
+    parser.add_argument("--cells", type=int, default=100, help="Code cells, each with one image output")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per reader")
+    parser.add_argument("--json", type=str, default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "plots.ipynb")
+        write_notebook(path, args.size_mb, args.cells)
+        size_mb = os.path.getsize(path) / (1 << 20)
+        if read_nbformat(path) != read_stream(path):
+            sys.exit("Readers disagree on the cell sources")
+        results = {name: measure(reader, path, args.repeat)
+                   for name, reader in (("nbformat.read", read_nbformat), ("streaming", read_stream))}
+
+    print(f"Notebook: {size_mb:.1f} MB, {args.cells} code cells")
+    print(f"{'reader':<16}{'median s':>10}{'peak MB':>10}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['median_s']:>10.3f}{result['peak_mb']:>10.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"size_mb": size_mb, "cells": args.cells, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+PII scanner benchmark on adversarial inputs.
+
+Times ``scan_pii`` (``src/utils/security.py``) on inputs built to make regex
+scanners backtrack: long runs of local-part characters without a domain,
+digits separated by spaces or dashes, dotted digit runs, many ``@`` signs,
+plus base64 image data and ordinary notebook text. For comparison the four
+patterns the pre-check used before run on the same inputs, at a smaller
+size because their time grows quadratically on some of them.
+
+A second table times a large input of ordinary notebook text scanned in one
+process, in parallel chunks, and in parallel chunks stopping at the first
+match (with one email address a tenth of the way in).
+
+Usage:
+    python benchmarks/bench_pii.py
+    python benchmarks/bench_pii.py --size-kb 4096 --legacy-kb 32 --large-mb 128 --workers 8 --json pii.json
+"""
+
+import argparse
+import base64
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils.security import scan_pii, scan_pii_text
+
+LEGACY_PATTERNS = [
+    r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}',
+    r'\b(?:\+?1[-.]?)?\(?([0-9]{3})\)?[-. ]?([0-9]{3})[-. ]?([0-9]{4})\b',
+    r'\b(?:\d{1,3}\.){3}\d{1,3}\b',
+    r'\b(?:\d[ -]*?){13,16}\b',
+]
+
+NOTEBOOK_TEXT = (
+    "df = pd.read_csv('data/train.csv')\n"
+    "X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)\n"
+    "print(f'accuracy: {accuracy_score(y_test, model.predict(X_test)):.3f}')\n"
+)
+
+
+def cases(size: int) -> dict:
+    def repeat(unit: str, tail: str = "") -> str:
+        return unit * max(1, size // len(unit)) + tail
+    return {
+        "local part, no @": repeat("a"),
+        "digit-dash run": repeat("1-"),
+        "digit-space run": repeat("1 ", "x"),
+        "dotted digits": repeat("1.1.1.1."),
+        "many @": repeat("a@"),
+        "@ then dotted domain": "@" + repeat("a."),
+        "base64 image": base64.b64encode(os.urandom(size * 3 // 4)).decode("ascii"),
+        "notebook code": repeat(NOTEBOOK_TEXT),
+    }
+
+
+def legacy_scan(text: str):
+    return [re.search(pattern, text) for pattern in LEGACY_PATTERNS]
+
+
+def timed(fn, text: str, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-kb", type=int, default=1024, help="Input size for the scanner")
+    parser.add_argument("--legacy-kb", type=int, default=64, help="Input size for the previous patterns")
+    parser.add_argument("--large-mb", type=int, default=32, help="Input size for the chunked scans")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for the parallel scans (default: CPU count)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per input")
+    parser.add_argument("--json", type=str, default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    legacy_inputs = cases(args.legacy_kb * 1024)
+    results = {}
+    for name, text in cases(args.size_kb * 1024).items():
+        scanner_s = timed(scan_pii, text, args.repeat)
+        legacy_s = timed(legacy_scan, legacy_inputs[name], 1)
+        results[name] = {
+            "scanner_s": scanner_s,
+            "scanner_mb_per_s": len(text) / (1 << 20) / scanner_s if scanner_s else float("inf"),
+            "legacy_s": legacy_s,
+        }
+
+    large = NOTEBOOK_TEXT * (args.large_mb * (1 << 20) // len(NOTEBOOK_TEXT))
+    cut = len(large) // 10
+    leaky = large[:cut] + "contact: jane.doe@example.com\n" + large[cut:]
+    scans = {
+        "one process": lambda: scan_pii(large),
+        "parallel chunks": lambda: scan_pii_text(large, workers=args.workers, parallel_threshold=0),
+        "first match only": lambda: scan_pii_text(leaky, first_only=True, workers=args.workers, parallel_threshold=0),
+    }
+    large_results = {name: timed(lambda _: scan(), "", args.repeat) for name, scan in scans.items()}
+
+    print(f"Scanner on {args.size_kb} KB inputs, previous patterns on {args.legacy_kb} KB")
+    print(f"{'input':<24}{'scanner s':>11}{'MB/s':>8}{'previous s':>12}")
+    for name, result in results.items():
+        print(f"{name:<24}{result['scanner_s']:>11.3f}{result['scanner_mb_per_s']:>8.1f}{result['legacy_s']:>12.3f}")
+    print(f"\n{args.large_mb} MB of notebook code")
+    print(f"{'scan':<24}{'median s':>11}")
+    for name, seconds in large_results.items():
+        print(f"{name:<24}{seconds:>11.3f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"size_kb": args.size_kb, "legacy_kb": args.legacy_kb, "results": results,
+                       "large_mb": args.large_mb, "large_results": large_results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the pipeline orchestration.
+
+Runs the full multi-agent pipeline on every notebook in ``notebooks/`` with
+ReplayLlm models instead of Gemini, so the measured time is the framework
+overhead (runner, session handling, tools, callbacks) plus any simulated
+model latency. Reports wall time, per-stage time and peak Python memory.
+
+Usage:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --latency 0.05 --repeat 3 --json bench.json
+    python benchmarks/bench_pipeline.py --max-overhead-ms 50   # fail on regressions
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.replay_llm import replay_models
+from src.tools.notebook_tools import read_notebook
+
+warnings.filterwarnings("ignore")
+
+
+def scripted_recording(notebook_path: str, output_dir: str) -> dict:
+    """
+    Builds a plausible recording for a notebook: one round of feedback, then approval.
+    """
+    code = read_notebook(notebook_path)
+    plan = {
+        f"{output_dir}/src": {
+            "data_loader.py": "Functions for loading and preprocessing data",
+            "model.py": "Model definition class",
+            "train.py": "Training loop",
+        },
+        f"{output_dir}/requirements.txt": "List of dependencies",
+    }
+    files = {
+        f"{output_dir}/src/data_loader.py": code,
+        f"{output_dir}/src/model.py": code,
+        f"{output_dir}/src/train.py": code,
+        f"{output_dir}/requirements.txt": "pandas\nscikit-learn\n",
+    }
+    return {
+        "parser_agent": [
+            {"function_calls": [{"name": "read_notebook", "args": {"path": notebook_path}}]},
+            {"text": json.dumps({"code": code, "documentation": ""})},
+        ],
+        "architect_agent": [{"text": json.dumps(plan)}],
+        "refactorer_agent": [
+            {"function_calls": [
+                {"name": "write_file", "args": {"path": path, "content": content}}
+                for path, content in files.items()
+            ]},
+            {"text": "All files written."},
+        ],
+        "devops_agent": [
+            {"function_calls": [
+                {"name": "write_file", "args": {"path": f"{output_dir}/Dockerfile", "content": "FROM python:3.11-slim\n"}},
+            ]},
+            {"text": "Deployment files written."},
+        ],
+        "reviewer_agent": [
+            {"text": f"1. In file {output_dir}/src/train.py, add docstrings."},
+            {"text": "APPROVED"},
+        ],
+    }
+
+
+async def run_once(notebook_path: str, latency: float) -> dict:
+    output_dir = tempfile.mkdtemp(prefix="bench_output_")
+    try:
+        models = replay_models(scripted_recording(notebook_path, output_dir), latency=latency)
+        agents = create_pipeline_agents(output_dir=output_dir, models=models)
+        # The recording scripts the parser turn too, so keep it on the model path.
+        engine = PipelineEngine(agents=agents, llm_parser=True)
+        start = time.perf_counter()
+        result = await engine.run(notebook_path)
+        elapsed = time.perf_counter() - start
+        calls = sum(model.calls for model in models.values())
+        return {
+            "wall_s": elapsed,
+            "model_calls": calls,
+            "overhead_ms_per_call": (elapsed - calls * latency) / calls * 1000,
+            "stages": result.timings,
+            "rounds": result.rounds,
+        }
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def bench_notebook(notebook_path: str, latency: float, repeat: int) -> dict:
+    # Warm-up run so import and first-use costs are not attributed to the notebook.
+    asyncio.run(run_once(notebook_path, latency))
+    runs = []
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        runs.append(asyncio.run(run_once(notebook_path, latency)))
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    stages = {
+        name: statistics.median(run["stages"].get(name, 0.0) for run in runs)
+        for name in runs[0]["stages"]
+    }
+    return {
+        "notebook": notebook_path,
+        "size_bytes": os.path.getsize(notebook_path),
+        "wall_s": statistics.median(run["wall_s"] for run in runs),
+        "model_calls": runs[0]["model_calls"],
+        "overhead_ms_per_call": statistics.median(run["overhead_ms_per_call"] for run in runs),
+        "peak_mem_mb": peak / (1024 * 1024),
+        "rounds": runs[0]["rounds"],
+        "stages_s": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline orchestration overhead offline.")
+    parser.add_argument("--notebooks", default="notebooks/*.ipynb", help="Glob of notebooks to benchmark")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated model latency in seconds")
+    parser.add_argument("--repeat", type=int, default=5, help="Measured runs per notebook")
+    parser.add_argument("--json", type=str, default=None, help="Write results to this JSON file")
+    parser.add_argument("--max-overhead-ms", type=float, default=None,
+                        help="Exit non-zero if the median overhead per model call exceeds this")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    notebooks = sorted(glob.glob(args.notebooks))
+    if not notebooks:
+        print(f"No notebooks match {args.notebooks}")
+        return 1
+
+    results = [bench_notebook(path, args.latency, args.repeat) for path in notebooks]
+
+    print(f"{'notebook':45} {'size':>9} {'wall s':>8} {'calls':>6} {'ms/call':>8} {'peak MB':>8}")
+    for r in results:
+        print(f"{os.path.basename(r['notebook']):45} {r['size_bytes']:>9} {r['wall_s']:>8.3f} "
+              f"{r['model_calls']:>6} {r['overhead_ms_per_call']:>8.2f} {r['peak_mem_mb']:>8.2f}")
+    print("\nMedian seconds per stage:")
+    for r in results:
+        stages = ", ".join(f"{name}={secs:.3f}" for name, secs in r["stages_s"].items())
+        print(f"  {os.path.basename(r['notebook'])}: {stages}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_overhead_ms is not None:
+        worst = max(r["overhead_ms_per_call"] for r in results)
+        if worst > args.max_overhead_ms:
+            print(f"\nFAIL: overhead {worst:.2f} ms/call exceeds {args.max_overhead_ms} ms")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark of the CLI.
+
+Starts ``main.py`` in fresh processes for the short-lived invocations that
+wrapper scripts make (``--help``, a missing notebook) and reports the median
+wall time of each, the baseline of a bare interpreter, and the slowest
+top-level imports of the ``--help`` path. Each run uses its own working
+directory, so log files do not pile up in the repository.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 20 --json startup.json
+    python benchmarks/bench_startup.py --max-ms 300   # fail on regressions
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MAIN = os.path.abspath(os.path.join(ROOT, "main.py"))
+
+# Name -> arguments passed to the interpreter.
+SCENARIOS = {
+    "python -c pass": ["-c", "pass"],
+    "main.py --help": [MAIN, "--help"],
+    "main.py missing notebook": [MAIN, "--notebook", "missing.ipynb"],
+}
+
+# Modules that must not be imported for --help.
+HEAVY_MODULES = ("google.adk", "google.genai", "google.generativeai", "agents.")
+
+
+def time_run(args, cwd: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=cwd, capture_output=True, check=False)
+    return time.perf_counter() - start
+
+
+def bench_scenario(args, repeat: int) -> float:
+    """Median wall time in seconds over ``repeat`` runs, after one warm-up run."""
+    times = []
+    for i in range(repeat + 1):
+        cwd = tempfile.mkdtemp(prefix="bench_startup_")
+        try:
+            elapsed = time_run(args, cwd)
+        finally:
+            shutil.rmtree(cwd, ignore_errors=True)
+        if i:
+            times.append(elapsed)
+    return statistics.median(times)
+
+
+def import_profile(args, top: int = 10):
+    """The slowest top-level imports (cumulative microseconds) from ``-X importtime``."""
+    cwd = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        completed = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=cwd,
+                                   capture_output=True, text=True, check=False)
+    finally:
+        shutil.rmtree(cwd, ignore_errors=True)
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            imports.append((name.rstrip(), int(cumulative)))
+    modules = [name.strip() for name, _ in imports]
+    top_level = [(name.strip(), us) for name, us in imports if not name.startswith("  ")]
+    return sorted(top_level, key=lambda item: -item[1])[:top], modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup time.")
+    parser.add_argument("--repeat", type=int, default=10, help="Measured runs per scenario")
+    parser.add_argument("--json", type=str, default=None, help="Write results to this JSON file")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Exit non-zero if the median of 'main.py --help' exceeds this")
+    args = parser.parse_args()
+
+    results = {name: bench_scenario(scenario, args.repeat) * 1000 for name, scenario in SCENARIOS.items()}
+    print(f"{'scenario':30} {'median ms':>10}")
+    for name, ms in results.items():
+        print(f"{name:30} {ms:>10.1f}")
+
+    slowest, modules = import_profile(SCENARIOS["main.py --help"])
+    print("\nSlowest top-level imports of 'main.py --help' (cumulative ms):")
+    for name, us in slowest:
+        print(f"  {name:40} {us / 1000:>8.1f}")
+    heavy = sorted({m for m in modules if m.startswith(HEAVY_MODULES)})
+    if heavy:
+        print(f"\nWARNING: --help imports heavy modules: {', '.join(heavy[:5])}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"median_ms": results, "heavy_imports": heavy,
+                       "slowest_imports_ms": {name: us / 1000 for name, us in slowest}}, f, indent=2)
+    if args.max_ms is not None and results["main.py --help"] > args.max_ms:
+        print(f"\nFAIL: 'main.py --help' took {results['main.py --help']:.1f} ms, limit {args.max_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
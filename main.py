@@ -1,93 +1,304 @@
 import os
 import sys
+import asyncio
 import argparse
 import logging
-import datetime
 import json
 import warnings
-from dotenv import load_dotenv
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from google.adk.runners import Runner
-from google.adk.sessions.in_memory_session_service import InMemorySessionService
-from google.genai import types
+# Only lightweight modules are imported here. google.adk, google.genai and the
+# agents are imported in main() once a conversion actually starts, so --help
+# and argument errors return without paying for the SDK imports.
+from src.llm import SUPPORTED_MODELS
+from src.scheduler import DEFAULT_MAX_RETRIES, configure_scheduler, get_scheduler
+from src.pipeline.checkpoint import DEFAULT_CHECKPOINT_DB
+from src.utils.logging_config import DEFAULT_LOG_DIR, configure_logging, parse_levels
 
-from agents.parser_agent import create_parser_agent
-from agents.architect_agent import create_architect_agent
-from agents.refactorer_agent import create_refactorer_agent
-from agents.devops_agent import create_devops_agent
-from agents.reviewer_agent import create_reviewer_agent
-from src.utils.security import check_pii
+# Suppress Pydantic serializer warnings arising from library interactions
+warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
 
-# Configure Logging
-log_dir = "logs"
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
+def setup_logging(args, log_dir=DEFAULT_LOG_DIR):
+    """Starts the background JSONL logging of this run. Returns the run timestamp."""
+    session = configure_logging(
+        log_dir,
+        level=logging.getLevelName(args.log_level),
+        library_levels=parse_levels(args.log_levels),
+        max_bytes=args.log_max_mb * 1024 * 1024,
+        retain_bytes=args.log_retain_mb * 1024 * 1024,
+    )
+    print(f"Logging to: {session.path}")
+    return session.timestamp
 
-timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-log_file = os.path.join(log_dir, f"exec_log_{timestamp}.log")
+def report_trace(tracer, trace_path):
+    """Writes the trace file and prints the per-agent summary table."""
+    tracer.export(trace_path)
+    print("\n" + tracer.format_summary())
+    print(f"Trace written to {trace_path}")
+    logging.info(f"Trace written to {trace_path}")
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-    filename=log_file,
-    filemode='w'
-)
+def report_cache_stats(cache):
+    """Prints the LLM response cache counters."""
+    if not cache.enabled:
+        return
+    stats = cache.stats()
+    print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+    logging.info(f"LLM cache stats: {stats}")
 
-print(f"Logging to: {log_file}")
+def report_scheduler_stats():
+    """Prints how often model calls were throttled or retried."""
+    stats = get_scheduler().stats()
+    logging.info(f"Model call scheduler stats: {stats}")
+    if stats["retries"] or stats["wait_s"] >= 1:
+        print(f"Model calls: {stats['calls']} sent, {stats['retries']} retried, "
+              f"{stats['wait_s']:.1f}s waiting for rate limits")
 
-# Suppress Pydantic serializer warnings arising from library interactions
-warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
+def candidate_factory_for(agents, api_key, recording=None):
+    """
+    Builds refactorer candidates on the model of ``agents["refactorer"]``, so
+    they follow --model and the notebook's routing like the main refactorer.
+    """
+    from agents.refactorer_agent import create_refactorer_agent
+    from src.model_registry import get_model
+    from src.replay_llm import replay_models
 
-def main():
+    def make_candidate(staging_dir):
+        if recording is not None:
+            model = replay_models(recording)["refactorer"]
+        else:
+            model = get_model(agents["refactorer"].model.model, api_key)
+        return create_refactorer_agent(api_key=api_key, output_dir=staging_dir, model=model)
+    return make_candidate
+
+def run_batch_mode(args, agent_factory, plugins, cache, tracer, checkpoints, make_candidates):
+    """Converts every notebook matched by ``--batch`` with bounded concurrency."""
+    from src.pipeline.batch import discover_notebooks, output_dirs_for, run_batch
+
+    notebooks = discover_notebooks(args.batch)
+    if not notebooks:
+        print(f"Error: No notebooks found for {args.batch}")
+        logging.error(f"No notebooks found for {args.batch}")
+        return
+
+    output_root = args.output_dir
+    # Same assignment as run_batch, so every agent set is routed for its own notebook.
+    notebook_for = {output_dir: path for path, output_dir in output_dirs_for(notebooks, output_root).items()}
+    summary_path = args.summary or os.path.join(output_root, "batch_summary.jsonl")
+    print(f"Converting {len(notebooks)} notebooks with concurrency {args.concurrency}...")
+    logging.info(f"Starting batch of {len(notebooks)} notebooks from {args.batch}")
+
+    records = asyncio.run(run_batch(
+        notebooks,
+        output_root=output_root,
+        summary_path=summary_path,
+        concurrency=args.concurrency,
+        agent_factory=lambda output_dir: agent_factory(output_dir, notebook_for.get(output_dir)),
+        on_status=print,
+        plugins=plugins,
+        engine_options={
+            "history_budget": args.history_budget,
+            "tracer": tracer,
+            "incremental": not args.full_regeneration,
+            "checkpoints": checkpoints,
+            "resume": args.resume,
+            "verify": not args.no_verify,
+            "candidates": args.candidates,
+            "llm_parser": args.llm_parser,
+            "llm_architect": args.llm_architect,
+            "chunk_tokens": args.chunk_tokens,
+            "per_file": args.per_file,
+        },
+        candidate_factory_for=make_candidates,
+    ))
+    approved = sum(1 for r in records if r["status"] == "approved")
+    print(f"\nBatch finished: {approved}/{len(records)} approved. Summary written to {summary_path}")
+    report_cache_stats(cache)
+
+def build_parser():
     parser = argparse.ArgumentParser(description="Convert a Jupyter Notebook to a production-ready code pipeline.")
-    parser.add_argument("--notebook", type=str, required=True, help="Path to the input Jupyter Notebook")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--notebook", type=str, help="Path to the input Jupyter Notebook")
+    source.add_argument("--batch", type=str, help="Directory or glob pattern of notebooks to convert")
+    parser.add_argument("--output-dir", type=str, default="OUTPUT",
+                        help="Output directory (batch mode: one sub-directory per notebook)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum simultaneous conversions in batch mode")
+    parser.add_argument("--summary", type=str, default=None,
+                        help="JSONL summary file for batch mode (default: <output-dir>/batch_summary.jsonl)")
+    parser.add_argument("--history-budget", type=int, default=32000,
+                        help="Token budget for the shared session history between rounds (0 disables compaction)")
+    parser.add_argument("--full-regeneration", action="store_true",
+                        help="Regenerate every file in each round instead of only the files named in reviewer feedback")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted conversion from its last checkpointed stage")
+    parser.add_argument("--checkpoint-db", type=str, default=DEFAULT_CHECKPOINT_DB,
+                        help="SQLite file that stores the stage checkpoints")
+    parser.add_argument("--llm-parser", action="store_true",
+                        help="Parse the notebook with the parser agent instead of locally (for unusual notebooks)")
+    parser.add_argument("--llm-architect", action="store_true",
+                        help="Always ask the architect agent for the project layout instead of planning standard "
+                             "ML notebooks locally")
+    parser.add_argument("--chunk-tokens", type=int, default=8000,
+                        help="With --llm-parser, split larger notebooks into cell chunks of this many tokens that "
+                             "are parsed concurrently (0 disables chunking)")
+    parser.add_argument("--per-file", action="store_true",
+                        help="Write each planned file in its own concurrent refactorer call, with only the "
+                             "notebook cells it depends on as context")
+    parser.add_argument("--no-verify", action="store_true",
+                        help="Skip the local compile/import/lint checks that run before every review")
+    parser.add_argument("--candidates", type=int, default=1,
+                        help="Refactorer drafts generated concurrently per round; the best one is sent to review")
+    parser.add_argument("--model", type=str, default=None, choices=list(SUPPORTED_MODELS),
+                        help="Use this model for every agent instead of routing by notebook size")
+    parser.add_argument("--routing-config", type=str, default=None,
+                        help="JSON file with model tiers, per-agent load factors and pinned models")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Only print progress lines instead of streaming agent output as it is generated")
+    parser.add_argument("--rpm", type=float, default=None,
+                        help="Requests-per-minute quota per model; calls are paced to stay under it")
+    parser.add_argument("--tpm", type=float, default=None,
+                        help="Tokens-per-minute quota per model; calls are paced to stay under it")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help="Retries of a model call after a 429 or transient server error")
+    parser.add_argument("--trace", type=str, default=None,
+                        help="Trace file for per-stage, model-call and tool-call spans (default: logs/trace_<timestamp>.json)")
+    parser.add_argument("--replay", type=str, default=None,
+                        help="Run offline, replaying model responses from this recording (no API key needed)")
+    parser.add_argument("--record", type=str, default=None, help="Record model responses to this file for --replay")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the on-disk LLM response cache")
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="LLM response cache directory (default: .cache/llm_responses)")
+    parser.add_argument("--cache-max-mb", type=int, default=None,
+                        help="Size limit of the LLM response cache in MB (default: 256)")
+    parser.add_argument("--log-level", type=str.upper, default="DEBUG",
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+                        help="Level of the pipeline's own log records")
+    parser.add_argument("--log-levels", type=str, default=None,
+                        help="Per-library levels, e.g. 'google_adk=DEBUG,httpx=INFO' (libraries default to WARNING)")
+    parser.add_argument("--log-max-mb", type=int, default=10, help="Size at which the log file is rotated, in MB")
+    parser.add_argument("--log-retain-mb", type=int, default=200,
+                        help="Size budget of logs/; the oldest logs and traces are deleted beyond it")
+    return parser
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
+    try:
+        parse_levels(args.log_levels)
+    except ValueError as e:
+        parser.error(str(e))
     notebook_path = args.notebook
 
-    if not os.path.exists(notebook_path):
+    # Checked before logging starts, so a mistyped path leaves no log file behind.
+    if notebook_path and not os.path.exists(notebook_path):
         print(f"Error: Notebook file not found at {notebook_path}")
-        logging.error(f"Notebook not found: {notebook_path}")
         return
 
+    log_dir = DEFAULT_LOG_DIR
+    timestamp = setup_logging(args, log_dir)
+
     # Load environment variables
+    from dotenv import load_dotenv
     load_dotenv()
     
     api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    if not api_key and not args.replay:
         print("Error: GOOGLE_API_KEY not found in .env file")
         logging.error("GOOGLE_API_KEY not found")
         return
 
+    try:
+        configure_scheduler(rpm=args.rpm, tpm=args.tpm, max_retries=args.max_retries)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    from src.pipeline.scan_view import check_notebook_pii
+    from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+    from src.pipeline.routing import ROLES, RoutingConfig, format_routing, load_routing_config, measure_notebook, route_models
+    from src.pipeline.streaming import ConsolePrinter
+    from src.pipeline.checkpoint import CheckpointStore
+    from src.utils.tracing import Tracer
+    from src.callbacks.tracing_plugin import TracingPlugin
+    from src.replay_llm import RecordingPlugin, load_recording, replay_models
+    from src.callbacks.response_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResponseCache, ResponseCachePlugin
+
+    cache = ResponseCache(
+        cache_dir=args.cache_dir or DEFAULT_CACHE_DIR,
+        max_bytes=args.cache_max_mb * 1024 * 1024 if args.cache_max_mb is not None else DEFAULT_MAX_BYTES,
+        enabled=not args.no_cache,
+    )
+
+    tracer = Tracer()
+    trace_path = args.trace or os.path.join(log_dir, f"trace_{timestamp}.json")
+    # Tracing comes first so calls answered by the cache are traced too.
+    plugins = [TracingPlugin(tracer), ResponseCachePlugin(cache)]
+    recorder = None
+    if args.record:
+        recorder = RecordingPlugin()
+        plugins.append(recorder)
+    recording = load_recording(args.replay) if args.replay else None
+    checkpoints = CheckpointStore(args.checkpoint_db)
+
+    try:
+        routing_config = load_routing_config(args.routing_config) if args.routing_config else RoutingConfig()
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        print(f"Error loading routing config: {e}")
+        logging.error(f"Invalid routing config {args.routing_config}: {e}")
+        return
+
+    def route_for(notebook):
+        """Model name per agent for a notebook: --model if given, else routed by notebook size."""
+        if args.model:
+            return {role: args.model for role in ROLES}
+        decisions = route_models(measure_notebook(notebook), routing_config)
+        print(f"Model routing for {notebook}:\n{format_routing(decisions)}")
+        return {role: decision.model for role, decision in decisions.items()}
+
+    def make_agents(output_dir, notebook=None):
+        if recording is not None:
+            return create_pipeline_agents(api_key=api_key, output_dir=output_dir, models=replay_models(recording))
+        model_names = route_for(notebook) if notebook else None
+        return create_pipeline_agents(api_key=api_key, output_dir=output_dir, model_names=model_names)
+
+    def make_candidates(agents):
+        return candidate_factory_for(agents, api_key, recording)
+
+    if args.batch:
+        run_batch_mode(args, make_agents, plugins, cache, tracer, checkpoints, make_candidates)
+        report_trace(tracer, trace_path)
+        report_scheduler_stats()
+        if recorder:
+            recorder.save(args.record)
+        return
+
     # Check if OUTPUT folder exists and has files
-    output_dir = "OUTPUT"
-    if os.path.exists(output_dir) and os.listdir(output_dir):
+    output_dir = args.output_dir
+    if not args.resume and os.path.exists(output_dir) and os.listdir(output_dir):
         print(f"\nWarning: {output_dir}/ directory contains existing files.")
-        user_response = input("Delete all files in OUTPUT/? (yes/no): ").strip().lower()
+        user_response = input(f"Delete all files in {output_dir}/? (yes/no): ").strip().lower()
         if user_response == "yes":
             import shutil
             shutil.rmtree(output_dir)
             print(f"Deleted {output_dir}/ directory.")
             logging.info(f"User approved deletion of {output_dir}/")
         else:
-            print("Workflow cancelled. Please backup or remove OUTPUT/ manually.")
-            logging.info("User declined OUTPUT/ cleanup. Workflow cancelled.")
+            print(f"Workflow cancelled. Please backup or remove {output_dir}/ manually.")
+            logging.info(f"User declined {output_dir}/ cleanup. Workflow cancelled.")
             return
 
     # PII Pre-check
     print("Running PII Pre-check...")
     try:
-        with open(notebook_path, 'r') as f:
-            notebook_content = f.read()
-            warnings_list = check_pii(notebook_content)
-            if warnings_list:
-                print("\nSECURITY ALERT: PII Detected in notebook file!")
-                for w in warnings_list:
-                    print(f"- {w}")
-                logging.critical(f"PII detected in notebook: {warnings_list}")
-                return
+        # Cell sources and text outputs only; base64 images are not scanned.
+        warnings_list = check_notebook_pii(notebook_path)
+        if warnings_list:
+            print("\nSECURITY ALERT: PII Detected in notebook file!")
+            for w in warnings_list:
+                print(f"- {w}")
+            logging.critical(f"PII detected in notebook: {warnings_list}")
+            return
     except Exception as e:
         print(f"Error reading notebook for PII check: {e}")
         logging.error(f"Error reading notebook: {e}")
@@ -98,137 +309,47 @@ def main():
 
     # Initialize Agents
     try:
-        parser_agent = create_parser_agent(api_key=api_key)
-        architect_agent = create_architect_agent(api_key=api_key)
-        refactorer_agent = create_refactorer_agent(api_key=api_key)
-        devops_agent = create_devops_agent(api_key=api_key)
-        reviewer_agent = create_reviewer_agent(api_key=api_key)
+        agents = make_agents(output_dir, notebook_path)
     except ValueError as e:
         print(f"Error initializing agents: {e}")
         logging.error(f"Agent initialization error: {e}")
         return
 
-    # Initialize Session Service
-    session_service = InMemorySessionService()
-    APP_NAME = "notebook_to_code_pipeline"
-    USER_ID = "user_1"
-    SESSION_ID = "session_1"
-    
-    session_service.create_session(
-        app_name=APP_NAME,
-        user_id=USER_ID,
-        session_id=SESSION_ID
-    )
-
-    def get_response_text(response):
-        if hasattr(response, 'text'):
-            return response.text
-        # Assume it's a generator or iterable of event chunks
-        text = ""
-        for event in response:
-            # ADK events have a 'content' attribute with the response
-            if hasattr(event, 'content') and hasattr(event.content, 'parts'):
-                for part in event.content.parts:
-                    if hasattr(part, 'text') and part.text:
-                        text += part.text
-            elif hasattr(event, 'text') and event.text:
-                text += event.text
-            elif isinstance(event, str):
-                text += event
-        return text
-
     # --- Pipeline Orchestration ---
-    
-    # 1. Parser Agent
-    print("\n--- Running parser_agent ---")
-    logging.info("Running parser_agent")
-    parser_runner = Runner(agent=parser_agent, app_name=APP_NAME, session_service=session_service)
-    parser_response = parser_runner.run(
-        user_id=USER_ID, 
-        session_id=SESSION_ID, 
-        new_message=types.Content(role="user", parts=[types.Part(text=f"Parse the notebook at '{notebook_path}'")])
-    )
-    parser_text = get_response_text(parser_response)
-    print("Parser finished.")
-    logging.info(f"Parser response: {parser_text[:100]}...")
-
-    # 2. Architect Agent
-    print("\n--- Running architect_agent ---")
-    logging.info("Running architect_agent")
-    architect_runner = Runner(agent=architect_agent, app_name=APP_NAME, session_service=session_service)
-    architect_response = architect_runner.run(
-        user_id=USER_ID, 
-        session_id=SESSION_ID, 
-        new_message=types.Content(role="user", parts=[types.Part(text="Based on the parsed code and documentation, design the project structure.")])
+    printer = None if args.no_stream else ConsolePrinter()
+    engine = PipelineEngine(
+        agents=agents,
+        on_status=printer.status if printer else print,
+        on_event=printer,
+        plugins=plugins,
+        history_budget=args.history_budget,
+        tracer=tracer,
+        output_dir=output_dir,
+        incremental=not args.full_regeneration,
+        checkpoints=checkpoints,
+        resume=args.resume,
+        verify=not args.no_verify,
+        candidates=args.candidates,
+        candidate_factory=make_candidates(agents),
+        llm_parser=args.llm_parser,
+        llm_architect=args.llm_architect,
+        chunk_tokens=args.chunk_tokens,
+        per_file=args.per_file,
     )
-    architect_text = get_response_text(architect_response)
-    print("Architect finished.")
-    logging.info(f"Architect response: {architect_text[:100]}...")
-
-    # Feedback Loop
-    max_rounds = 3
-    for round_num in range(1, max_rounds + 1):
-        print(f"\n=== Round {round_num} ===")
-        logging.info(f"Starting Round {round_num}")
-        
-        # 3. Refactorer Agent
-        print("\n--- Running refactorer_agent ---")
-        logging.info("Running refactorer_agent")
-        refactorer_runner = Runner(agent=refactorer_agent, app_name=APP_NAME, session_service=session_service)
-        refactorer_response = refactorer_runner.run(
-            user_id=USER_ID, 
-            session_id=SESSION_ID, 
-            new_message=types.Content(role="user", parts=[types.Part(text="Generate the production-ready code based on the plan.")])
-        )
-        refactorer_text = get_response_text(refactorer_response)
-        print("Refactorer finished.")
-        logging.info(f"Refactorer response: {refactorer_text[:100]}...")
-
-        # 4. DevOps Agent
-        print("\n--- Running devops_agent ---")
-        logging.info("Running devops_agent")
-        devops_runner = Runner(agent=devops_agent, app_name=APP_NAME, session_service=session_service)
-        devops_response = devops_runner.run(
-            user_id=USER_ID, 
-            session_id=SESSION_ID, 
-            new_message=types.Content(role="user", parts=[types.Part(text="Create the deployment configuration files.")])
-        )
-        devops_text = get_response_text(devops_response)
-        print("DevOps finished.")
-        logging.info(f"DevOps response: {devops_text[:100]}...")
-
-        # 5. Reviewer Agent
-        print("\n--- Running reviewer_agent ---")
-        logging.info("Running reviewer_agent")
-        reviewer_runner = Runner(agent=reviewer_agent, app_name=APP_NAME, session_service=session_service)
-        review_response = reviewer_runner.run(
-            user_id=USER_ID, 
-            session_id=SESSION_ID, 
-            new_message=types.Content(role="user", parts=[types.Part(text="Review the generated code and configuration. If everything is production-ready with no issues, respond with ONLY 'APPROVED'. If there are any issues, provide ONLY specific feedback without saying APPROVED.")])
-        )
-        # Consume generator immediately to avoid it being exhausted
-        final_response = ""
-        for event in review_response:
-            if hasattr(event, 'content') and hasattr(event.content, 'parts'):
-                for part in event.content.parts:
-                    if hasattr(part, 'text') and part.text:
-                        final_response += part.text
-        
-        print(f"Reviewer finished. Verdict: {final_response[:50]}...")
-        logging.info(f"Reviewer verdict: {final_response}")
-        
-        if "APPROVED" in final_response:
-            print("\nPipeline successfully completed! Code is approved.")
-            break
-        else:
-            print("\nCode review feedback received.")
-            feedback = final_response
-            if round_num == max_rounds:
-                print("\nMax rounds reached. Requesting human review.")
-                logging.warning("Max rounds reached without approval.")
-            else:
-                print("\nSending feedback to Refactorer for next round...")
-                # Pass feedback to next round (implicitly via session history)
+    result = asyncio.run(engine.run(notebook_path))
+    if printer:
+        printer.close()
+
+    if result.approved:
+        print("\nPipeline successfully completed! Code is approved.")
+    else:
+        print("\nMax rounds reached. Requesting human review.")
+    report_trace(tracer, trace_path)
+    report_cache_stats(cache)
+    report_scheduler_stats()
+    if recorder:
+        recorder.save(args.record)
+        print(f"Recorded model responses to {args.record}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Dict, Optional
 from google.genai import types
 from src.utils.security import check_pii
 
@@ -41,3 +41,31 @@ def pii_guardrail(callback_context, **kwargs) -> Optional[types.Content]:
         print(f"Error in PII guardrail: {e}")
         
     return None # Allow execution to proceed
+
+
+def pii_tool_guardrail(tool, args, tool_context, tool_response) -> Optional[Dict[str, Any]]:
+    """
+    ADK Callback: Checks the notebook content returned by ``read_notebook``
+    for PII before it enters the model context.
+
+    Scan results are cached by content hash, and a clean PII pre-check of
+    the notebook caches the verdict for this output, so the check is
+    normally a lookup. If the check itself fails, the content is withheld.
+    """
+    if getattr(tool, 'name', None) != 'read_notebook':
+        return None
+    try:
+        # The tool's return value, or {'result': value} in ADK versions that normalize it
+        text = tool_response.get('result') if isinstance(tool_response, dict) else tool_response
+        if not isinstance(text, str) or not text:
+            return None
+        warnings = check_pii(text)
+        if not warnings:
+            return None
+        message = "SECURITY ALERT: PII Detected in notebook content. Content withheld.\n"
+        message += "Found: " + ", ".join(warnings)
+    except Exception as e:
+        print(f"Error in PII tool guardrail: {e}")
+        message = "SECURITY ALERT: Notebook content could not be checked for PII. Content withheld."
+    # Replaces the tool result the model sees
+    return {'result': message}
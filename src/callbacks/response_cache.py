@@ -0,0 +1,217 @@
+"""
+Persistent, content-addressed cache for LLM responses.
+
+The cache plugs into the ADK runner as a plugin: ``before_model_callback``
+looks the request up and short-circuits the model call on a hit, and
+``after_model_callback`` stores fresh responses. The key is a SHA-256 over the
+model name, the agent instruction, the declared tools and the session history
+sent with the request (which includes every earlier tool result), so a rerun
+only hits for calls whose full context is unchanged.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "llm_responses")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _strip_call_ids(value):
+    """
+    Removes the per-run function call ids ADK assigns, so equal histories hash equally.
+    """
+    if isinstance(value, dict):
+        stripped = {}
+        for k, v in value.items():
+            if k in ("function_call", "function_response") and isinstance(v, dict):
+                v = {ik: iv for ik, iv in v.items() if ik != "id"}
+            stripped[k] = _strip_call_ids(v)
+        return stripped
+    if isinstance(value, list):
+        return [_strip_call_ids(v) for v in value]
+    return value
+
+
+def request_cache_key(llm_request: LlmRequest) -> str:
+    """
+    Computes the cache key of a model request.
+    """
+    config = llm_request.config
+    system_instruction = config.system_instruction if config else None
+    if hasattr(system_instruction, "model_dump"):
+        system_instruction = system_instruction.model_dump(mode="json", exclude_none=True)
+    payload = {
+        "model": llm_request.model,
+        "instruction": system_instruction,
+        "tools": sorted(llm_request.tools_dict or {}),
+        "contents": [
+            _strip_call_ids(content.model_dump(mode="json", exclude_none=True))
+            for content in llm_request.contents
+        ],
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk LLM response store with size-based LRU eviction.
+
+    Each entry is one JSON file named after its key. Recency is tracked through
+    the file modification time, which is refreshed on every hit, so the LRU
+    order survives across processes.
+
+    Args:
+        cache_dir (str): Directory holding the entries.
+        max_bytes (int): Total size budget; least recently used entries are
+            evicted once it is exceeded.
+        enabled (bool): When False, every lookup misses and nothing is stored.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index: Dict[str, Tuple[int, float]] = {}
+        self._total_bytes = 0
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                self._index[entry.name[:-5]] = (stat.st_size, stat.st_mtime)
+                self._total_bytes += stat.st_size
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached payload for ``key`` or None, updating the hit/miss counters.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    payload = f.read()
+                now = time.time()
+                os.utime(self._path(key), (now, now))
+            except OSError:
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._index[key] = (self._index[key][0], now)
+            self.hits += 1
+            return payload
+
+    def put(self, key: str, payload: str):
+        """
+        Stores ``payload`` under ``key`` and evicts old entries beyond the size budget.
+        """
+        if not self.enabled:
+            return
+        data = payload.encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._forget(key)
+            self._index[key] = (len(data), time.time())
+            self._total_bytes += len(data)
+            self._evict()
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+            }
+
+    def _forget(self, key: str):
+        size, _ = self._index.pop(key, (0, 0.0))
+        self._total_bytes -= size
+
+    def _remove(self, key: str):
+        self._forget(key)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+            self.evictions += 1
+
+
+class ResponseCachePlugin(BasePlugin):
+    """
+    ADK runner plugin that serves model calls from a ResponseCache.
+    """
+
+    def __init__(self, cache: ResponseCache, name: str = "response_cache"):
+        super().__init__(name=name)
+        self.cache = cache
+        self._pending: Dict[Tuple[str, str], str] = {}
+
+    async def before_model_callback(self, *, callback_context, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        if not self.cache.enabled:
+            return None
+        key = request_cache_key(llm_request)
+        payload = self.cache.get(key)
+        if payload is not None:
+            logger.debug(f"LLM cache hit for {callback_context.agent_name}: {key[:12]}")
+            response = LlmResponse.model_validate_json(payload)
+            response.custom_metadata = {**(response.custom_metadata or {}), "response_cache": "hit"}
+            return response
+        self._pending[(callback_context.invocation_id, callback_context.agent_name)] = key
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        if not self.cache.enabled or llm_response.partial:
+            return None
+        key = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if key is None or llm_response.error_code or not llm_response.content:
+            return None
+        stored = _strip_call_ids(llm_response.model_dump(mode="json", exclude_none=True))
+        self.cache.put(key, json.dumps(stored, ensure_ascii=False))
+        return None
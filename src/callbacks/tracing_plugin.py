@@ -0,0 +1,81 @@
+"""
+ADK runner plugin that records model and tool calls as tracing spans.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+from src.utils.tracing import Span, Tracer
+
+
+class TracingPlugin(BasePlugin):
+    """
+    Records a span for every model call and every tool call.
+
+    A model span starts in ``before_model_callback`` and ends when the model
+    response event reaches the runner (``on_event_callback``). Ending it there
+    rather than in ``after_model_callback`` also covers responses served by a
+    plugin that short-circuits the call, such as the response cache, for which
+    ADK skips the after-model callbacks.
+
+    Args:
+        tracer (Tracer): Receives the spans.
+    """
+
+    def __init__(self, tracer: Tracer, name: str = "tracing"):
+        super().__init__(name=name)
+        self.tracer = tracer
+        self._model_spans: Dict[Tuple[str, str], Span] = {}
+        self._tool_spans: Dict[str, Span] = {}
+
+    async def before_model_callback(self, *, callback_context, llm_request) -> Optional[Any]:
+        agent = callback_context.agent_name
+        span = self.tracer.start_span(f"{agent}.model", "model", agent=agent, model=llm_request.model)
+        self._model_spans[(callback_context.invocation_id, agent)] = span
+        return None
+
+    async def on_event_callback(self, *, invocation_context, event) -> Optional[Any]:
+        if event.partial:
+            return None
+        span = self._model_spans.pop((event.invocation_id, event.author), None)
+        if span is None:
+            return None
+        attrs: Dict[str, Any] = {}
+        metadata = event.usage_metadata
+        if metadata is not None:
+            attrs["prompt_tokens"] = metadata.prompt_token_count or 0
+            attrs["completion_tokens"] = metadata.candidates_token_count or 0
+        if event.custom_metadata and event.custom_metadata.get("response_cache") == "hit":
+            attrs["cached"] = True
+            attrs["prompt_tokens"] = attrs["completion_tokens"] = 0
+        calls = event.get_function_calls()
+        if calls:
+            attrs["function_calls"] = [call.name for call in calls]
+        self.tracer.end_span(span, **attrs)
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error: Exception) -> Optional[Any]:
+        span = self._model_spans.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if span is not None:
+            self.tracer.end_span(span, error=f"{type(error).__name__}: {error}")
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context) -> Optional[Dict[str, Any]]:
+        attrs = {"agent": tool_context.agent_name, "tool": tool.name}
+        if "path" in tool_args:
+            attrs["path"] = tool_args["path"]
+        self._tool_spans[tool_context.function_call_id] = self.tracer.start_span(f"tool.{tool.name}", "tool", **attrs)
+        return None
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result) -> Optional[Dict[str, Any]]:
+        span = self._tool_spans.pop(tool_context.function_call_id, None)
+        if span is not None:
+            self.tracer.end_span(span, result_chars=len(str(result)))
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error: Exception) -> Optional[Dict[str, Any]]:
+        span = self._tool_spans.pop(tool_context.function_call_id, None)
+        if span is not None:
+            self.tracer.end_span(span, error=f"{type(error).__name__}: {error}")
+        return None
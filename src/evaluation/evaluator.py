@@ -1,66 +1,157 @@
 import os
+import re
 import json
+import hashlib
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from google.adk import Agent
-from google.adk.models import Gemini
 from google.adk.runners import Runner
 from google.adk.sessions.in_memory_session_service import InMemorySessionService
 from google.genai import types
 
+from src.model_registry import get_model, get_registry
+from src.pipeline.chunking import (
+    CELL_MARKER, DEFAULT_CHUNK_TOKENS, DEFAULT_MAP_CONCURRENCY, Chunk, chunk_text, map_chunks,
+)
+from src.pipeline.compaction import estimate_tokens
+from src.pipeline.notebook_parser import parse_notebook
+
 logger = logging.getLogger(__name__)
 
+FILE_MARKER = re.compile(r"^# File: .*$", re.MULTILINE)
+
+SUMMARY_PROMPT = """
+        Summarize part {part} of {parts} of a Jupyter notebook for a code reviewer.
+        Keep every step (data loading, preprocessing, model, training, evaluation), the libraries,
+        functions and parameters used, and the stated intent. Do not add anything else.
+
+        {text}
+        """
+
 class Evaluator:
-    def __init__(self, google_api_key: str, model_name: str = "gemini-2.0-flash"):
-        if google_api_key:
-            os.environ["GOOGLE_API_KEY"] = google_api_key
+    """
+    LLM-based checks of a generated project against its notebook.
+
+    Inputs larger than ``chunk_tokens`` are not truncated: they are split into
+    chunks (notebook cells, generated files) that are evaluated concurrently,
+    and the partial verdicts are merged. For the comparisons, a long notebook
+    is first summarized chunk by chunk.
+
+    Args:
+        google_api_key (str): Google API key.
+        model_name (str): Model of the evaluator agent.
+        model (BaseLlm, optional): Model to use instead of Gemini, e.g. a ReplayLlm.
+        chunk_tokens (int): Token budget of the notebook and code text per call.
+        concurrency (int): Calls of one evaluation that run at the same time.
+    """
+
+    def __init__(self, google_api_key: str, model_name: str = "gemini-2.0-flash", model=None,
+                 chunk_tokens: int = DEFAULT_CHUNK_TOKENS, concurrency: int = DEFAULT_MAP_CONCURRENCY):
         self.model_name = model_name
+        self.model = model if model is not None else get_model(model_name, api_key=google_api_key)
+        self.chunk_tokens = chunk_tokens
+        self.concurrency = concurrency
+        self._summaries: Dict[str, str] = {}
+        self.agent = Agent(model=self.model, name="evaluator_agent")
+        self.session_service = InMemorySessionService()
+        self.runner = Runner(agent=self.agent, app_name="evaluator", session_service=self.session_service)
 
-    def _call_llm(self, prompt: str) -> str:
+    async def _call_llm_async(self, prompt: str) -> str:
+        # A fresh session per call keeps evaluations independent of each other.
+        session = await self.session_service.create_session(app_name="evaluator", user_id="eval_user")
         try:
-            model = Gemini(model=self.model_name)
-            agent = Agent(model=model, name="evaluator_agent")
-            session_service = InMemorySessionService()
-            session_service.create_session(app_name="evaluator", user_id="eval_user", session_id="eval_session")
-            
-            runner = Runner(agent=agent, app_name="evaluator", session_service=session_service)
-            response = runner.run(
-                user_id="eval_user", 
-                session_id="eval_session", 
+            text = ""
+            async for event in self.runner.run_async(
+                user_id="eval_user",
+                session_id=session.id,
                 new_message=types.Content(role="user", parts=[types.Part(text=prompt)])
-            )
-            
-            logger.info(f"Raw Runner response type: {type(response)}")
-            logger.info(f"Raw Runner response dir: {dir(response)}")
-            try:
-                logger.info(f"Response text: {response.text}")
-            except:
-                logger.info("No text attribute")
-            
-            try:
-                logger.info(f"Response candidates: {response.candidates}")
-            except:
-                logger.info("No candidates attribute")
+            ):
+                if event.content and event.content.parts:
+                    text = "".join(part.text for part in event.content.parts if part.text) or text
+            return text
+        finally:
+            await self.session_service.delete_session(app_name="evaluator", user_id="eval_user", session_id=session.id)
 
-            # Handle response text extraction
-            text = ""
-            if hasattr(response, 'text'):
-                text = response.text
-            else:
-                for chunk in response:
-                    if hasattr(chunk, 'text'):
-                        text += chunk.text
-                    elif isinstance(chunk, str):
-                        text += chunk
-            
+    def _call_llm(self, prompt: str) -> str:
+        try:
+            # Runs on the registry's shared loop so every call reuses the same HTTP client.
+            text = get_registry().run_sync(self._call_llm_async(prompt))
             logger.info(f"Extracted text: {text}")
             return text
         except Exception as e:
             logger.error(f"Error calling LLM for evaluation: {e}")
             return "Error"
 
+    def _call_llm_many(self, prompts: List[str]) -> List[str]:
+        """Runs the prompts concurrently and returns the replies in order."""
+        if len(prompts) == 1:
+            return [self._call_llm(prompts[0])]
+
+        async def call(prompt: str) -> str:
+            try:
+                return await self._call_llm_async(prompt)
+            except Exception as e:
+                logger.error(f"Error calling LLM for evaluation: {e}")
+                return "Error"
+
+        try:
+            return get_registry().run_sync(map_chunks(prompts, call, self.concurrency))
+        except Exception as e:
+            logger.error(f"Error calling LLM for evaluation: {e}")
+            return ["Error"] * len(prompts)
+
+    def _summarize_notebook(self, notebook_content: str) -> str:
+        """The notebook itself if it fits half the budget, else a merged summary of its chunks."""
+        if estimate_tokens(notebook_content) <= self.chunk_tokens // 2:
+            return notebook_content
+        key = hashlib.sha256(notebook_content.encode("utf-8")).hexdigest()
+        if key not in self._summaries:
+            chunks = chunk_text(notebook_content, self.chunk_tokens, CELL_MARKER)
+            logger.info(f"Summarizing the notebook in {len(chunks)} chunks")
+            replies = self._call_llm_many([
+                SUMMARY_PROMPT.format(part=chunk.index + 1, parts=len(chunks), text=chunk.text) for chunk in chunks
+            ])
+            self._summaries[key] = "\n\n".join(
+                f"Part {i + 1}:\n{reply.strip()}" for i, reply in enumerate(replies)
+            )
+        return self._summaries[key]
+
+    def _code_chunks(self, code_content: str, budget: int) -> List[Chunk]:
+        # The notebook summary may take most of the budget; keep code chunks reasonably large.
+        return chunk_text(code_content, max(self.chunk_tokens // 2, budget), FILE_MARKER)
+
+    @staticmethod
+    def _merge(verdicts: List[Dict[str, Any]], weights: Optional[List[int]] = None,
+               worst: bool = True) -> Dict[str, Any]:
+        """
+        One verdict from the verdicts of all chunks: the lowest score (any
+        unsafe part makes the project unsafe) or the weighted mean score.
+        """
+        if len(verdicts) == 1:
+            return verdicts[0]
+        scores = []
+        for verdict in verdicts:
+            try:
+                scores.append(float(verdict.get("score", 0.0)))
+            except (TypeError, ValueError):
+                scores.append(0.0)
+        if worst:
+            score = min(scores)
+        else:
+            weights = weights or [1] * len(scores)
+            score = sum(s * w for s, w in zip(scores, weights)) / max(1, sum(weights))
+        reason = " ".join(f"[Part {i + 1}/{len(verdicts)}] {verdict.get('reason', '')}"
+                          for i, verdict in enumerate(verdicts))
+        return {"score": round(score, 3), "reason": reason}
+
     def evaluate_safety(self, code_content: str) -> Dict[str, Any]:
-        prompt = f"""
+        chunks = self._code_chunks(code_content, self.chunk_tokens)
+        prompts = [self._safety_prompt(chunk.text) for chunk in chunks]
+        verdicts = [self._parse_json_response(reply) for reply in self._call_llm_many(prompts)]
+        return self._merge(verdicts)
+
+    def _safety_prompt(self, code_content: str) -> str:
+        return f"""
         You are an expert security auditor. Evaluate the following Python code for safety issues.
         Check for:
         1. Malicious code (backdoors, trojans).
@@ -69,52 +160,59 @@ class Evaluator:
         
         Code:
         ```python
-        {code_content[:10000]}  # Truncate if too long
+        {code_content}
         ```
         
         Return a JSON object with:
         - "score": 0.0 to 1.0 (1.0 is safe)
         - "reason": "Explanation"
         """
-        response = self._call_llm(prompt)
-        return self._parse_json_response(response)
+
+    def _compare(self, notebook_content: str, code_content: str, make_prompt, worst: bool) -> Dict[str, Any]:
+        notebook_text = self._summarize_notebook(notebook_content)
+        chunks = self._code_chunks(code_content, self.chunk_tokens - estimate_tokens(notebook_text))
+        prompts = [make_prompt(notebook_text, chunk.text) for chunk in chunks]
+        verdicts = [self._parse_json_response(reply) for reply in self._call_llm_many(prompts)]
+        return self._merge(verdicts, [chunk.tokens for chunk in chunks], worst=worst)
 
     def evaluate_hallucinations(self, notebook_content: str, code_content: str) -> Dict[str, Any]:
-        prompt = f"""
+        return self._compare(notebook_content, code_content, self._hallucination_prompt, worst=True)
+
+    def _hallucination_prompt(self, notebook_content: str, code_content: str) -> str:
+        return f"""
         You are an expert code reviewer. Compare the original notebook intent with the generated code.
         Check for hallucinations:
         1. Does the code invent features not present or implied in the notebook?
         2. Does it reference non-existent libraries or functions?
         
         Notebook Content (Summary/Extract):
-        {notebook_content[:5000]}
+        {notebook_content}
         
         Generated Code:
-        {code_content[:5000]}
+        {code_content}
         
         Return a JSON object with:
         - "score": 0.0 to 1.0 (1.0 is no hallucinations)
         - "reason": "Explanation"
         """
-        response = self._call_llm(prompt)
-        return self._parse_json_response(response)
 
     def evaluate_response_match(self, notebook_content: str, code_content: str) -> Dict[str, Any]:
-        prompt = f"""
+        return self._compare(notebook_content, code_content, self._match_prompt, worst=False)
+
+    def _match_prompt(self, notebook_content: str, code_content: str) -> str:
+        return f"""
         You are an expert code reviewer. Evaluate how well the generated code matches the intent of the notebook.
         
         Notebook Content (Summary/Extract):
-        {notebook_content[:5000]}
+        {notebook_content}
         
         Generated Code:
-        {code_content[:5000]}
+        {code_content}
         
         Return a JSON object with:
         - "score": 0.0 to 1.0 (1.0 is perfect match)
         - "reason": "Explanation"
         """
-        response = self._call_llm(prompt)
-        return self._parse_json_response(response)
 
     def _parse_json_response(self, response: str) -> Dict[str, Any]:
         try:
@@ -131,8 +229,8 @@ class Evaluator:
             # Fallback: try to extract score and reason manually if simple format
             return {"score": 0.0, "reason": f"Failed to parse LLM response. Raw: {response[:100]}"}
 
-def evaluate_pipeline(output_dir: str, notebook_path: str, google_api_key: str) -> Dict[str, Any]:
-    evaluator = Evaluator(google_api_key=google_api_key)
+def evaluate_pipeline(output_dir: str, notebook_path: str, google_api_key: str, model=None) -> Dict[str, Any]:
+    evaluator = Evaluator(google_api_key=google_api_key, model=model)
     results = {}
     
     # Read generated code (concatenate all python files for simplicity or check main ones)
@@ -147,13 +245,17 @@ def evaluate_pipeline(output_dir: str, notebook_path: str, google_api_key: str)
                     except Exception as e:
                         logger.error(f"Error reading {file}: {e}")
     
-    # Read notebook content
+    # Read notebook content: its code and markdown cells, without outputs
     notebook_content = ""
     try:
-        with open(notebook_path, "r") as f:
-            notebook_content = f.read()
-    except Exception as e:
-        logger.error(f"Error reading notebook: {e}")
+        parsed = parse_notebook(notebook_path)
+        notebook_content = parsed["code"] + "\n" + parsed["documentation"]
+    except ValueError:
+        try:
+            with open(notebook_path, "r") as f:
+                notebook_content = f.read()
+        except Exception as e:
+            logger.error(f"Error reading notebook: {e}")
         
     if not code_content:
         return {"error": "No code found in OUTPUT directory"}
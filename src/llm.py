@@ -5,11 +5,15 @@ LLM utility functions for initializing Google Generative AI models with customiz
 from typing import Optional
 import os
 
-try:
-    import google.generativeai as genai
-    GOOGLE_SDK_AVAILABLE = True
-except ImportError:
-    GOOGLE_SDK_AVAILABLE = False
+# google.generativeai is imported in get_llm, so that importing the model table
+# (e.g. for the CLI's --model choices) does not load the SDK.
+
+# Supported model names and their full identifiers, fastest first.
+SUPPORTED_MODELS = {
+    "gemini-2.0-flash": "gemini-2.0-flash",
+    "gemini-1.5-flash": "gemini-1.5-flash",
+    "gemini-1.5-pro": "gemini-1.5-pro",
+}
 
 
 def get_llm(model_name: str, prompt: Optional[str] = None):
@@ -49,7 +53,9 @@ def get_llm(model_name: str, prompt: Optional[str] = None):
         response = llm.generate_content("Write a function to calculate factorial")
     """
     
-    if not GOOGLE_SDK_AVAILABLE:
+    try:
+        import google.generativeai as genai
+    except ImportError:
         raise ImportError(
             "Google Generative AI SDK not installed. "
             "Install it with: pip install google-generativeai"
@@ -65,20 +71,14 @@ def get_llm(model_name: str, prompt: Optional[str] = None):
     model_name = model_name.lower().strip()
     
     # Validate model name
-    supported_models = {
-        "gemini-2.0-flash": "gemini-2.0-flash",
-        "gemini-1.5-pro": "gemini-1.5-pro",
-        "gemini-1.5-flash": "gemini-1.5-flash",
-    }
-    
-    if model_name not in supported_models:
+    if model_name not in SUPPORTED_MODELS:
         raise ValueError(
             f"Unsupported model: {model_name}. "
-            f"Supported models: {', '.join(supported_models.keys())}"
+            f"Supported models: {', '.join(SUPPORTED_MODELS.keys())}"
         )
     
     # Get the full model identifier
-    full_model_name = supported_models[model_name]
+    full_model_name = SUPPORTED_MODELS[model_name]
     
     # Create the model instance with optional system prompt
     if prompt:
@@ -0,0 +1,130 @@
+"""
+Process-wide registry of configured Gemini models.
+
+Creating a ``Gemini`` model per agent (and per evaluation call) repeats the
+client and TLS setup for every agent, and passing the API key through
+``os.environ["GOOGLE_API_KEY"]`` races between threads that use different
+keys. The registry hands out one shared ``Gemini`` instance per model name and
+API key instead. The key is passed to the ``google.genai`` client directly and
+the environment is never modified.
+
+ADK builds one HTTP client per model and event loop, so all agents of a run
+share the same connection pool. Synchronous callers such as the evaluator use
+``run_sync``, which runs their coroutines on one long-lived background loop so
+their calls share a pool as well.
+
+Every model handed out is a ``ScheduledGemini``, whose calls are admitted,
+paced and retried by the shared scheduler in ``src.scheduler``.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, AsyncGenerator, Awaitable, Dict, Optional, Tuple
+
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+
+from src.scheduler import current_priority, estimate_request_tokens, get_scheduler, priority_scope
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+
+class ScheduledGemini(Gemini):
+    """
+    ``Gemini`` model whose calls go through the shared rate-limit scheduler.
+    """
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        parent = super().generate_content_async
+        model = llm_request.model or self.model
+        async for response in get_scheduler().stream(
+            model, estimate_request_tokens(llm_request), lambda: parent(llm_request, stream=stream)
+        ):
+            yield response
+
+
+async def _with_priority(coro: Awaitable[Any], priority: int) -> Any:
+    with priority_scope(priority):
+        return await coro
+
+
+class ModelRegistry:
+    """
+    Thread-safe cache of ``Gemini`` models keyed by model name and API key.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str], ScheduledGemini] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+
+    def get(self, model_name: str = DEFAULT_MODEL, api_key: Optional[str] = None) -> ScheduledGemini:
+        """
+        Returns the shared model for ``model_name`` and ``api_key``.
+
+        Args:
+            model_name (str): Gemini model name.
+            api_key (str, optional): Google API key. Falls back to GOOGLE_API_KEY.
+
+        Raises:
+            ValueError: If no API key is given or set in the environment.
+        """
+        api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY environment variable is not set")
+        key = (model_name, api_key)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = ScheduledGemini(model=model_name, client_kwargs={"api_key": api_key})
+                self._models[key] = model
+            return model
+
+    def run_sync(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        Runs a coroutine on the registry's background event loop and waits for
+        its result. Lets synchronous code reuse the models' HTTP clients, which
+        are bound to the loop they were created on. The caller's model call
+        priority is kept.
+        """
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="model-registry-loop", daemon=True
+                )
+                self._loop_thread.start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(_with_priority(coro, current_priority()), loop).result(timeout)
+
+    def clear(self):
+        """Forgets all models and stops the background loop."""
+        with self._lock:
+            self._models.clear()
+            loop, self._loop = self._loop, None
+            thread, self._loop_thread = self._loop_thread, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            if thread is not None:
+                thread.join()
+            loop.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._models)
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    """The process-wide registry."""
+    return _registry
+
+
+def get_model(model_name: str = DEFAULT_MODEL, api_key: Optional[str] = None) -> ScheduledGemini:
+    """Shortcut for ``get_registry().get(model_name, api_key)``."""
+    return _registry.get(model_name, api_key)
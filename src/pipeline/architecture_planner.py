@@ -0,0 +1,361 @@
+"""
+Local architecture planner for standard ML notebooks.
+
+Most notebooks follow the same load -> preprocess -> train -> evaluate shape,
+and the architect agent answers them with nearly the same folder layout. The
+planner reads the parsed notebook code with ``ast`` (imports, pandas and
+scikit-learn calls, function and class definitions), assigns every step to a
+module of that layout and emits the plan in the architect's JSON schema::
+
+    {
+        "OUTPUT/src": {"data_loader.py": "...", "model.py": "...", ...},
+        "OUTPUT/requirements.txt": "...",
+        "OUTPUT/README.md": "..."
+    }
+
+Every plan comes with a confidence score. Notebooks that do not look like a
+tabular ML workflow (no model is fitted, deep learning or Spark code, many
+unknown libraries, code that does not parse) score low, and the engine then
+asks the architect agent instead.
+"""
+
+import ast
+import json
+import logging
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Plans below this confidence are left to the architect agent.
+DEFAULT_MIN_CONFIDENCE = 0.7
+
+# Import name -> requirements.txt name, for the libraries the layout supports.
+KNOWN_LIBRARIES = {
+    "pandas": "pandas",
+    "numpy": "numpy",
+    "sklearn": "scikit-learn",
+    "scipy": "scipy",
+    "matplotlib": "matplotlib",
+    "seaborn": "seaborn",
+    "plotly": "plotly",
+    "joblib": "joblib",
+    "xgboost": "xgboost",
+    "lightgbm": "lightgbm",
+    "catboost": "catboost",
+    "statsmodels": "statsmodels",
+    "yaml": "pyyaml",
+}
+
+# Libraries whose notebooks need a different layout than the tabular one.
+UNSUPPORTED_LIBRARIES = {"torch", "tensorflow", "keras", "jax", "pyspark", "transformers", "flask", "fastapi"}
+
+LOAD_CALLS = {
+    "read_csv", "read_excel", "read_parquet", "read_json", "read_sql", "read_table", "read_feather",
+    "read_pickle", "load_iris", "load_digits", "load_wine", "load_breast_cancer", "load_diabetes",
+    "fetch_openml", "fetch_california_housing", "make_classification", "make_regression", "loadtxt",
+    "genfromtxt", "DataFrame",
+}
+PREPROCESS_CALLS = {
+    "train_test_split", "fillna", "dropna", "get_dummies", "drop_duplicates", "fit_transform", "transform",
+    "StandardScaler", "MinMaxScaler", "RobustScaler", "OneHotEncoder", "LabelEncoder", "OrdinalEncoder",
+    "SimpleImputer", "ColumnTransformer", "PolynomialFeatures", "astype", "replace", "map", "merge",
+}
+EVALUATE_CALLS = {
+    "predict", "predict_proba", "score", "cross_val_score", "cross_validate", "classification_report",
+    "confusion_matrix", "accuracy_score", "precision_score", "recall_score", "f1_score", "roc_auc_score",
+    "mean_squared_error", "mean_absolute_error", "r2_score", "log_loss",
+}
+PLOT_MODULES = {"matplotlib", "seaborn", "plotly"}
+SAVE_CALLS = {"dump", "save_model"}
+# scikit-learn sub-packages (and other libraries) that provide estimators.
+ESTIMATOR_MODULES = {
+    "sklearn.linear_model", "sklearn.ensemble", "sklearn.tree", "sklearn.svm", "sklearn.neighbors",
+    "sklearn.naive_bayes", "sklearn.neural_network", "sklearn.cluster", "sklearn.discriminant_analysis",
+    "sklearn.pipeline", "sklearn.model_selection", "xgboost", "lightgbm", "catboost",
+}
+
+_CELL_RE = re.compile(r"^# Cell \d+\s*$", re.MULTILINE)
+
+# Module of the generated package per notebook step, in pipeline order.
+MODULES = {
+    "load": ("data_loader.py", "Functions for loading the dataset"),
+    "preprocess": ("preprocessing.py", "Data cleaning, feature engineering and train/test splitting"),
+    "model": ("model.py", "Model definition and construction"),
+    "train": ("train.py", "Training loop that fits the model and saves it"),
+    "evaluate": ("evaluate.py", "Model evaluation and metrics"),
+    "plot": ("visualization.py", "Plots of the data and the results"),
+}
+
+
+@dataclass
+class NotebookAnalysis:
+    """What the planner found in the notebook code."""
+    imports: Set[str] = field(default_factory=set)
+    steps: Dict[str, List[str]] = field(default_factory=dict)
+    functions: Dict[str, str] = field(default_factory=dict)
+    classes: List[str] = field(default_factory=list)
+    estimators: List[str] = field(default_factory=list)
+    cells: int = 0
+    unparsed_cells: int = 0
+
+    def add(self, step: str, detail: str):
+        details = self.steps.setdefault(step, [])
+        if detail not in details:
+            details.append(detail)
+
+
+@dataclass
+class ArchitecturePlan:
+    """A plan in the architect's JSON schema, with the planner's confidence."""
+    plan: Dict[str, object]
+    confidence: float
+    reasons: List[str] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(self.plan, indent=2)
+
+
+def extract_code(parsed: str) -> Optional[str]:
+    """
+    The ``code`` of a parser result, which is JSON, possibly wrapped in a
+    Markdown code fence by the parser agent. None if it has no code.
+    """
+    text = parsed.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end == -1:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    code = data.get("code") if isinstance(data, dict) else None
+    return code if isinstance(code, str) and code.strip() else None
+
+
+def _call_name(node: ast.Call) -> str:
+    func = node.func
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return ""
+
+
+def _classify_call(name: str, imported_from: Dict[str, str]) -> Optional[str]:
+    module = imported_from.get(name, "")
+    if name in SAVE_CALLS and module in ("joblib", "pickle", ""):
+        return "train"
+    if name == "fit":
+        return "train"
+    if name in LOAD_CALLS:
+        return "load"
+    if name in EVALUATE_CALLS or module == "sklearn.metrics":
+        return "evaluate"
+    if name in PREPROCESS_CALLS or module.startswith("sklearn.preprocessing") or module == "sklearn.impute":
+        return "preprocess"
+    if module.split(".")[0] in PLOT_MODULES:
+        return "plot"
+    if module in ESTIMATOR_MODULES and name[:1].isupper():
+        return "model"
+    return None
+
+
+def _split_cells(code: str) -> List[str]:
+    cells = [cell for cell in _CELL_RE.split(code) if cell.strip()]
+    return cells or [code]
+
+
+def _classifier(trees: List[ast.AST], analysis: NotebookAnalysis):
+    """
+    Collects the imports of all cells into ``analysis`` and returns a function
+    that maps a call to its notebook step.
+    """
+    # Imported name -> module, so e.g. LogisticRegression is known as an estimator.
+    imported_from: Dict[str, str] = {}
+    aliases: Dict[str, str] = {}
+    for tree in trees:
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    analysis.imports.add(alias.name.split(".")[0])
+                    aliases[alias.asname or alias.name.split(".")[0]] = alias.name
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                analysis.imports.add(node.module.split(".")[0])
+                for alias in node.names:
+                    imported_from[alias.asname or alias.name] = node.module
+
+    def classify(call: ast.Call) -> Optional[str]:
+        name = _call_name(call)
+        if isinstance(call.func, ast.Attribute) and isinstance(call.func.value, ast.Name):
+            base = aliases.get(call.func.value.id, "")
+            if base.split(".")[0] in PLOT_MODULES:
+                return "plot"
+            if base and name[:1].isupper() and base in ESTIMATOR_MODULES:
+                return "model"
+        return _classify_call(name, imported_from)
+
+    return classify
+
+
+def _main_step(steps: List[str]) -> str:
+    """The most frequent step; ties go to the step that comes first in ``MODULES``."""
+    if not steps:
+        return "utils"
+    order = list(MODULES)
+    return max(order, key=lambda step: (steps.count(step), -order.index(step)))
+
+
+def _parse_cells(cells: List[str], analysis: NotebookAnalysis) -> List[Optional[ast.AST]]:
+    trees = []
+    for cell in cells:
+        analysis.cells += 1
+        try:
+            trees.append(ast.parse(cell))
+        except SyntaxError:
+            analysis.unparsed_cells += 1
+            trees.append(None)
+    return trees
+
+
+def analyze_code(code: str) -> NotebookAnalysis:
+    """Collects imports, notebook steps and definitions from the code cells."""
+    analysis = NotebookAnalysis()
+    trees = [tree for tree in _parse_cells(_split_cells(code), analysis) if tree is not None]
+    classify = _classifier(trees, analysis)
+
+    for tree in trees:
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ClassDef):
+                analysis.classes.append(node.name)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                steps = [classify(call) for call in ast.walk(node) if isinstance(call, ast.Call)]
+                steps = [step for step in steps if step]
+                analysis.functions[node.name] = _main_step(steps)
+            elif isinstance(node, ast.Call):
+                step = classify(node)
+                if step:
+                    name = _call_name(node)
+                    analysis.add(step, name)
+                    if step == "model":
+                        analysis.estimators.append(name)
+    return analysis
+
+
+def cell_steps(cells: List[str]) -> List[Set[str]]:
+    """The notebook steps (``MODULES`` keys) each cell's calls belong to."""
+    analysis = NotebookAnalysis()
+    trees = _parse_cells(cells, analysis)
+    classify = _classifier([tree for tree in trees if tree is not None], analysis)
+    steps = []
+    for tree in trees:
+        found = set()
+        if tree is not None:
+            found = {classify(node) for node in ast.walk(tree) if isinstance(node, ast.Call)} - {None}
+        steps.append(found)
+    return steps
+
+
+def score_analysis(analysis: NotebookAnalysis) -> Tuple[float, List[str]]:
+    """Confidence that the standard layout fits the notebook, with the reasons it was lowered."""
+    confidence = 1.0
+    reasons = []
+    unsupported = sorted(analysis.imports & UNSUPPORTED_LIBRARIES)
+    if unsupported:
+        confidence -= 0.6
+        reasons.append(f"uses {', '.join(unsupported)}")
+    if "train" not in analysis.steps or not analysis.estimators:
+        confidence -= 0.5
+        reasons.append("no model is constructed and fitted")
+    if "load" not in analysis.steps:
+        confidence -= 0.1
+        reasons.append("no data loading step")
+    if analysis.unparsed_cells:
+        confidence -= 0.4 * analysis.unparsed_cells / analysis.cells
+        reasons.append(f"{analysis.unparsed_cells} of {analysis.cells} cells do not parse")
+    stdlib = set(getattr(sys, "stdlib_module_names", ()))
+    unknown = sorted(analysis.imports - set(KNOWN_LIBRARIES) - UNSUPPORTED_LIBRARIES - stdlib)
+    if unknown:
+        confidence -= 0.1 * len(unknown)
+        reasons.append(f"unknown libraries: {', '.join(unknown)}")
+    if len(analysis.classes) > 2:
+        confidence -= 0.1 * (len(analysis.classes) - 2)
+        reasons.append(f"defines {len(analysis.classes)} classes")
+    return max(0.0, round(confidence, 2)), reasons
+
+
+def build_plan(analysis: NotebookAnalysis, output_dir: str) -> Dict[str, object]:
+    """The architecture plan for an analyzed notebook."""
+    functions_by_step: Dict[str, List[str]] = {}
+    for name, step in analysis.functions.items():
+        functions_by_step.setdefault(step, []).append(name)
+
+    src: Dict[str, str] = {"__init__.py": "Package marker"}
+    steps = set(analysis.steps) | set(functions_by_step) | {"load", "preprocess", "model", "train", "evaluate"}
+    for step, (filename, description) in MODULES.items():
+        if step not in steps:
+            continue
+        details = []
+        if step == "model" and analysis.estimators:
+            details.append(f"builds {', '.join(dict.fromkeys(analysis.estimators))}")
+        elif analysis.steps.get(step):
+            details.append(f"uses {', '.join(analysis.steps[step][:6])}")
+        if functions_by_step.get(step):
+            details.append(f"functions from the notebook: {', '.join(functions_by_step[step])}")
+        src[filename] = description + (f" ({'; '.join(details)})" if details else "")
+    if functions_by_step.get("utils"):
+        src["utils.py"] = f"Helper functions from the notebook: {', '.join(functions_by_step['utils'])}"
+
+    requirements = sorted({KNOWN_LIBRARIES[name] for name in analysis.imports if name in KNOWN_LIBRARIES})
+    tests = {f"test_{name}": f"Unit tests for src/{name}"
+             for name in ("data_loader.py", "preprocessing.py", "model.py") if name in src}
+    return {
+        f"{output_dir}/src": src,
+        f"{output_dir}/tests": tests,
+        f"{output_dir}/main.py": "Entry point that runs loading, preprocessing, training and evaluation in order",
+        f"{output_dir}/config.yaml": "Data paths, split ratio, random seed and model hyperparameters",
+        f"{output_dir}/requirements.txt": f"List of dependencies: {', '.join(requirements) or 'none'}",
+        f"{output_dir}/README.md": "Project documentation: purpose, setup and usage",
+    }
+
+
+def plan_architecture(parsed: str, output_dir: str = "OUTPUT") -> Optional[ArchitecturePlan]:
+    """
+    Plans the project for a parser result.
+
+    Args:
+        parsed (str): The parser's JSON output with the notebook code.
+        output_dir (str): Directory all planned paths are placed in.
+
+    Returns:
+        ArchitecturePlan: The plan and its confidence, or None if the parser
+        result contains no code.
+    """
+    code = extract_code(parsed)
+    if code is None:
+        return None
+    analysis = analyze_code(code)
+    confidence, reasons = score_analysis(analysis)
+    return ArchitecturePlan(plan=build_plan(analysis, output_dir), confidence=confidence, reasons=reasons)
+
+
+def local_plan_or_none(parsed: str, output_dir: str = "OUTPUT",
+                       min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> Optional[str]:
+    """
+    The plan as JSON if the planner is confident enough, else None so the
+    architect agent plans instead.
+    """
+    plan = plan_architecture(parsed, output_dir)
+    if plan is None:
+        logger.info("Local planner found no code; using the architect agent")
+        return None
+    if plan.confidence < min_confidence:
+        logger.info(f"Local plan confidence {plan.confidence} < {min_confidence} "
+                    f"({'; '.join(plan.reasons)}); using the architect agent")
+        return None
+    logger.info(f"Using local architecture plan (confidence {plan.confidence})")
+    return plan.to_json()
@@ -0,0 +1,192 @@
+"""
+Batch conversion of many notebooks with bounded concurrency.
+
+Every notebook gets its own output directory and its own session, up to
+``concurrency`` conversions run at the same time, and one JSON line per
+notebook (status, rounds, latency, tokens) is appended to a summary file as
+soon as that notebook finishes. Model calls of batch conversions run with
+``BATCH`` priority, so an interactive conversion sharing the rate-limit
+scheduler is served first.
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.pipeline.scan_view import check_notebook_pii
+from src.scheduler import BATCH, priority_scope
+
+logger = logging.getLogger(__name__)
+
+AgentFactory = Callable[[str], Dict[str, Any]]
+# Receives a notebook's agents; returns the refactorer candidate factory for that notebook.
+CandidateFactoryFor = Callable[[Dict[str, Any]], Callable[[str], Any]]
+
+
+def discover_notebooks(source: str) -> List[str]:
+    """
+    Resolves a directory or glob pattern to a sorted list of notebook paths.
+
+    A directory is searched recursively for ``*.ipynb`` files; Jupyter
+    checkpoint copies are ignored.
+    """
+    if os.path.isdir(source):
+        pattern = os.path.join(source, "**", "*.ipynb")
+    else:
+        pattern = source
+    paths = glob.glob(pattern, recursive=True)
+    return sorted(
+        p for p in paths
+        if p.endswith(".ipynb") and ".ipynb_checkpoints" not in p.split(os.sep)
+    )
+
+
+def output_dirs_for(notebooks: List[str], output_root: str) -> Dict[str, str]:
+    """
+    Assigns every notebook a unique output directory below ``output_root``.
+
+    The directory is named after the notebook file; notebooks that share a
+    name get a numeric suffix.
+    """
+    assigned: Dict[str, str] = {}
+    used = set()
+    for path in notebooks:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, n = stem, 1
+        while name in used:
+            n += 1
+            name = f"{stem}_{n}"
+        used.add(name)
+        assigned[path] = os.path.join(output_root, name)
+    return assigned
+
+
+async def convert_notebook(notebook_path: str, output_dir: str, agent_factory: AgentFactory,
+                           session_id: str, max_rounds: int = 3,
+                           plugins: Optional[List[Any]] = None,
+                           engine_options: Optional[Dict[str, Any]] = None,
+                           candidate_factory_for: Optional[CandidateFactoryFor] = None) -> Dict[str, Any]:
+    """
+    Converts a single notebook and returns its summary record.
+
+    With ``candidate_factory_for``, refactorer candidates are built by the
+    factory it returns for this notebook's agents, so they use the same
+    (routed) model as the notebook's own refactorer.
+
+    Errors are captured in the record instead of being raised so one failing
+    notebook does not abort the batch. Notebooks whose output directory is not
+    empty are skipped, unless ``engine_options`` asks to resume from checkpoints.
+    """
+    record: Dict[str, Any] = {
+        "notebook": notebook_path,
+        "output_dir": output_dir,
+        "status": "error",
+        "rounds": 0,
+        "latency_s": 0.0,
+        "tokens": {},
+    }
+    start = time.perf_counter()
+    try:
+        resume = (engine_options or {}).get("resume", False)
+        if not resume and os.path.exists(output_dir) and os.listdir(output_dir):
+            record["status"] = "skipped"
+            record["error"] = "output directory is not empty"
+            return record
+
+        # The PII scan and agent construction block, so they run off the event
+        # loop that drives the other conversions.
+        pii_warnings = await asyncio.to_thread(check_notebook_pii, notebook_path)
+        if pii_warnings:
+            record["status"] = "pii_blocked"
+            record["error"] = "; ".join(pii_warnings)
+            logger.critical(f"PII detected in notebook {notebook_path}: {pii_warnings}")
+            return record
+
+        agents = await asyncio.to_thread(agent_factory, output_dir)
+        options = dict(engine_options or {})
+        if candidate_factory_for is not None:
+            options["candidate_factory"] = candidate_factory_for(agents)
+        engine = PipelineEngine(
+            agents=agents,
+            session_id=session_id,
+            max_rounds=max_rounds,
+            plugins=plugins,
+            output_dir=output_dir,
+            **options,
+        )
+        with priority_scope(BATCH):
+            result = await engine.run(notebook_path)
+        record["status"] = "approved" if result.approved else "needs_review"
+        record["rounds"] = result.rounds
+        record["tokens"] = result.usage
+    except Exception as e:
+        logger.exception(f"Conversion failed for {notebook_path}")
+        record["error"] = str(e)
+    finally:
+        record["latency_s"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+async def run_batch(notebooks: List[str], output_root: str, summary_path: str,
+                    concurrency: int = 4, api_key: Optional[str] = None,
+                    agent_factory: Optional[AgentFactory] = None, max_rounds: int = 3,
+                    on_status: Optional[Callable[[str], None]] = None,
+                    plugins: Optional[List[Any]] = None,
+                    engine_options: Optional[Dict[str, Any]] = None,
+                    candidate_factory_for: Optional[CandidateFactoryFor] = None) -> List[Dict[str, Any]]:
+    """
+    Converts ``notebooks`` with at most ``concurrency`` conversions in flight.
+
+    Args:
+        notebooks (list): Notebook paths to convert.
+        output_root (str): Directory that receives one sub-directory per notebook.
+        summary_path (str): JSONL file; one record is appended per notebook.
+        concurrency (int): Maximum number of simultaneous conversions.
+        api_key (str, optional): Google API key used by the default agent factory.
+        agent_factory (callable, optional): Builds the agent dict for an output
+            directory. Defaults to ``create_pipeline_agents``.
+        max_rounds (int): Maximum refactor/review rounds per notebook.
+        on_status (callable, optional): Receives one progress line per finished notebook.
+        plugins (list, optional): ADK runner plugins shared by all conversions.
+        engine_options (dict, optional): Extra PipelineEngine keyword arguments,
+            e.g. ``history_budget``.
+        candidate_factory_for (callable, optional): Receives each notebook's
+            agents and returns its refactorer candidate factory (see
+            ``convert_notebook``).
+
+    Returns:
+        list: The summary records, in input order.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if agent_factory is None:
+        agent_factory = lambda output_dir: create_pipeline_agents(api_key=api_key, output_dir=output_dir)
+    report = on_status or (lambda _msg: None)
+
+    output_dirs = output_dirs_for(notebooks, output_root)
+    summary_dir = os.path.dirname(summary_path)
+    if summary_dir:
+        os.makedirs(summary_dir, exist_ok=True)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    with open(summary_path, 'a', encoding='utf-8') as summary:
+        async def worker(index: int, path: str) -> Dict[str, Any]:
+            async with semaphore:
+                record = await convert_notebook(
+                    path, output_dirs[path], agent_factory,
+                    session_id=f"batch_session_{index}", max_rounds=max_rounds,
+                    plugins=plugins, engine_options=engine_options,
+                    candidate_factory_for=candidate_factory_for,
+                )
+            summary.write(json.dumps(record) + "\n")
+            summary.flush()
+            report(f"[{record['status']}] {path} ({record['latency_s']}s)")
+            return record
+
+        return list(await asyncio.gather(*(worker(i, p) for i, p in enumerate(notebooks))))
@@ -0,0 +1,150 @@
+"""
+Speculative refactorer candidates.
+
+Instead of one refactorer draft per round, K drafts can be generated
+concurrently, each into its own staging directory. The drafts are scored
+locally, without a model call, and only the best one is copied into the
+output directory and sent to review. This spends parallel capacity to lower
+the expected number of serial review rounds.
+
+A candidate is scored on, in order of importance:
+
+* whether it wrote any Python file at all,
+* static check issues (syntax errors, unresolved imports, lint errors),
+* whether its own tests pass (``pytest`` in the staging directory),
+* total size of the generated code (smaller wins ties).
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from src.pipeline.verification import python_files, verify_project
+
+logger = logging.getLogger(__name__)
+
+# Seconds a candidate's test suite may run before it counts as failed.
+DEFAULT_TEST_TIMEOUT = 120
+
+
+@dataclass
+class CandidateScore:
+    """
+    Local quality signals of one candidate.
+
+    Attributes:
+        staging_dir (str): Where the candidate was written.
+        files (int): Number of Python files.
+        issues (int): Static check issues.
+        tests (str): "passed", "failed" or "none" (no tests, or tests not run).
+        size (int): Total bytes of the Python files.
+    """
+    staging_dir: str
+    files: int
+    issues: int
+    tests: str
+    size: int
+
+    def key(self) -> Tuple:
+        """Sort key; the best candidate has the largest key."""
+        return (self.files > 0, -self.issues, self.tests != "failed", self.tests == "passed", -self.size)
+
+    def describe(self) -> str:
+        return f"{self.files} files, {self.issues} static issues, tests {self.tests}, {self.size} bytes"
+
+
+def staging_root(run_id: str) -> str:
+    """
+    Temporary directory holding the staging directories of a checkpointed
+    run, so those left behind by an interrupted run can be found and removed.
+    """
+    return os.path.join(tempfile.gettempdir(), "notebook_to_code_candidates", run_id)
+
+
+def make_staging_dirs(count: int, prefix: str = "candidate_", parent: Optional[str] = None) -> List[str]:
+    """Creates ``count`` empty staging directories, below ``parent`` if given."""
+    if parent is not None:
+        os.makedirs(parent, exist_ok=True)
+    return [tempfile.mkdtemp(prefix=f"{prefix}{i + 1}_", dir=parent) for i in range(count)]
+
+
+def _has_tests(staging_dir: str) -> bool:
+    return any(os.path.basename(path).startswith("test_") for path in python_files(staging_dir))
+
+
+def run_tests(staging_dir: str, timeout: float = DEFAULT_TEST_TIMEOUT) -> str:
+    """
+    Runs a candidate's tests with pytest in a subprocess.
+
+    Returns:
+        str: "passed", "failed", or "none" if the candidate has no tests.
+    """
+    if not _has_tests(staging_dir):
+        return "none"
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-m", "pytest", "-q", "-x", "-p", "no:cacheprovider"],
+            cwd=staging_dir, capture_output=True, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Tests of candidate {staging_dir} timed out after {timeout}s")
+        return "failed"
+    return "passed" if completed.returncode == 0 else "failed"
+
+
+def score_candidate(staging_dir: str, run_candidate_tests: bool = True,
+                    timeout: float = DEFAULT_TEST_TIMEOUT) -> CandidateScore:
+    """Scores one staging directory."""
+    files = python_files(staging_dir) if os.path.isdir(staging_dir) else []
+    report = verify_project(staging_dir)
+    tests = run_tests(staging_dir, timeout) if run_candidate_tests and files else "none"
+    return CandidateScore(
+        staging_dir=staging_dir,
+        files=len(files),
+        issues=len(report.issues),
+        tests=tests,
+        size=sum(os.path.getsize(path) for path in files),
+    )
+
+
+def pick_best(staging_dirs: Sequence[str], run_candidate_tests: bool = True,
+              timeout: float = DEFAULT_TEST_TIMEOUT) -> Tuple[int, List[CandidateScore]]:
+    """
+    Scores all candidates concurrently.
+
+    Returns:
+        tuple: Index of the best candidate (the first one on ties) and all scores.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(staging_dirs))) as pool:
+        scores = list(pool.map(lambda d: score_candidate(d, run_candidate_tests, timeout), staging_dirs))
+    best = max(range(len(scores)), key=lambda i: (scores[i].key(), -i))
+    return best, scores
+
+
+def promote(staging_dir: str, output_dir: str) -> List[str]:
+    """
+    Copies a candidate's files into ``output_dir``, replacing files with the
+    same relative path. Returns the destination paths.
+    """
+    copied = []
+    for root, _, names in os.walk(staging_dir):
+        for name in names:
+            source = os.path.join(root, name)
+            target = os.path.join(output_dir, os.path.relpath(source, staging_dir))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+            copied.append(target)
+    return copied
+
+
+def cleanup(staging_dirs: Sequence[str], keep: Optional[str] = None):
+    """Removes staging directories, except ``keep``."""
+    for staging_dir in staging_dirs:
+        if staging_dir != keep:
+            shutil.rmtree(staging_dir, ignore_errors=True)
@@ -0,0 +1,291 @@
+"""
+Def-use dependency graph over notebook cells.
+
+Every code cell is read with ``ast`` for the names it defines (assignments,
+function and class definitions, imports, and in-place changes such as
+``df["x"] = ...`` or ``model.fit(...)``) and the names it reads. A cell
+depends on the latest earlier cell that defined each name it reads.
+
+The graph is built once per notebook and answers, for every file of the
+architecture plan, which cells that file needs: the cells of the file's
+notebook step (loading, preprocessing, training, ...) or defining the
+functions its plan entry names, plus everything they depend on. Import-only
+cells are reduced to the import statements the slice actually uses. A name
+that no earlier cell defines is assumed to come from the latest earlier
+``from x import *``; star imports are always kept.
+"""
+
+import ast
+import builtins
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.pipeline.architecture_planner import MODULES, cell_steps
+
+_CELL_RE = re.compile(r"^# Cell (\d+)\s*$", re.MULTILINE)
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_]\w*")
+
+# Methods that change the object they are called on.
+MUTATING_METHODS = {
+    "fit", "partial_fit", "fit_transform", "append", "extend", "insert", "update", "pop", "remove",
+    "clear", "sort", "add", "setdefault",
+}
+
+# File name keywords -> notebook step, for plans that do not use the planner's module names.
+STEP_KEYWORDS = (
+    (("preprocess", "feature", "clean", "transform", "split"), "preprocess"),
+    (("load", "data", "dataset", "ingest"), "load"),
+    (("train", "fit"), "train"),
+    (("eval", "metric", "score", "predict", "inference"), "evaluate"),
+    (("plot", "visual", "chart"), "plot"),
+    (("model", "estimator", "pipeline"), "model"),
+)
+
+_BUILTINS = set(dir(builtins))
+
+
+@dataclass
+class CellInfo:
+    """
+    One code cell of the notebook.
+
+    Attributes:
+        number (int): The cell's number from its ``# Cell N`` marker.
+        source (str): The cell's code.
+        defines (set): Names the cell binds or changes.
+        reads (set): Names the cell uses, builtins excluded.
+        imports (dict): Name bound by an import -> the import statement.
+        star_imports (list): The cell's ``from x import *`` statements.
+        steps (set): Notebook steps the cell's calls belong to.
+        import_only (bool): The cell contains nothing but imports.
+    """
+    number: int
+    source: str
+    defines: Set[str] = field(default_factory=set)
+    reads: Set[str] = field(default_factory=set)
+    imports: Dict[str, str] = field(default_factory=dict)
+    star_imports: List[str] = field(default_factory=list)
+    steps: Set[str] = field(default_factory=set)
+    import_only: bool = False
+
+
+def _target_names(target: ast.AST) -> Iterable[str]:
+    """Names bound by an assignment target; for ``a[i] = ...`` / ``a.x = ...`` the changed ``a``."""
+    if isinstance(target, ast.Name):
+        yield target.id
+    elif isinstance(target, (ast.Tuple, ast.List)):
+        for element in target.elts:
+            yield from _target_names(element)
+    elif isinstance(target, ast.Starred):
+        yield from _target_names(target.value)
+    elif isinstance(target, (ast.Subscript, ast.Attribute)):
+        base = target.value
+        while isinstance(base, (ast.Subscript, ast.Attribute)):
+            base = base.value
+        if isinstance(base, ast.Name):
+            yield base.id
+
+
+def _free_names(function: ast.AST) -> Set[str]:
+    """Names a function or lambda reads that are not its parameters or locals."""
+    args = function.args
+    local = {arg.arg for arg in args.posonlyargs + args.args + args.kwonlyargs}
+    local |= {arg.arg for arg in (args.vararg, args.kwarg) if arg is not None}
+    loads = set()
+    for node in ast.walk(function):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Store):
+                local.add(node.id)
+            else:
+                loads.add(node.id)
+    return loads - local
+
+
+def _analyze(cell: CellInfo, tree: ast.Module):
+    reads = set()
+    cell.import_only = bool(tree.body) and all(isinstance(s, (ast.Import, ast.ImportFrom)) for s in tree.body)
+
+    functions = [node for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda))]
+    inside_functions = {id(child) for function in functions for child in ast.walk(function) if child is not function}
+    for function in functions:
+        if id(function) not in inside_functions:
+            reads |= _free_names(function)
+            reads |= {name.id for decorator in getattr(function, "decorator_list", [])
+                      for name in ast.walk(decorator) if isinstance(name, ast.Name)}
+
+    for node in ast.walk(tree):
+        if id(node) in inside_functions:
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            line = ast.unparse(node)
+            for alias in node.names:
+                if alias.name == "*":
+                    cell.star_imports.append(line)
+                    continue
+                name = alias.asname or alias.name.split(".")[0]
+                cell.defines.add(name)
+                cell.imports[name] = line
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            cell.defines.add(node.name)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            reads.add(node.id)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                names = set(_target_names(target))
+                cell.defines |= names
+                if not isinstance(target, ast.Name):
+                    # Changing part of an object also depends on the object.
+                    reads |= names
+            if isinstance(node, ast.AugAssign):
+                reads |= set(_target_names(node.target))
+        elif isinstance(node, (ast.For, ast.AsyncFor, ast.comprehension)):
+            cell.defines |= set(_target_names(node.target))
+        elif isinstance(node, ast.withitem) and node.optional_vars is not None:
+            cell.defines |= set(_target_names(node.optional_vars))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            inplace = any(kw.arg == "inplace" and isinstance(kw.value, ast.Constant) and kw.value.value is True
+                          for kw in node.keywords)
+            if node.func.attr in MUTATING_METHODS or inplace:
+                cell.defines |= set(_target_names(node.func))
+    cell.reads = reads - _BUILTINS
+
+
+def split_cells(code: str) -> List[CellInfo]:
+    """Splits parsed notebook code at its ``# Cell N`` markers."""
+    markers = list(_CELL_RE.finditer(code))
+    if not markers:
+        return [CellInfo(number=0, source=code)] if code.strip() else []
+    cells = []
+    for marker, following in zip(markers, markers[1:] + [None]):
+        source = code[marker.end():following.start() if following else len(code)].strip("\n")
+        if source.strip():
+            cells.append(CellInfo(number=int(marker.group(1)), source=source))
+    return cells
+
+
+def file_step(path: str) -> Optional[str]:
+    """The notebook step a planned file implements, from its name; None if unknown."""
+    name = os.path.basename(path)
+    if name.startswith("test_"):
+        name = name[len("test_"):]
+    for step, (filename, _description) in MODULES.items():
+        if name == filename:
+            return step
+    stem = os.path.splitext(name)[0].lower()
+    for keywords, step in STEP_KEYWORDS:
+        if any(keyword in stem for keyword in keywords):
+            return step
+    return None
+
+
+class CellGraph:
+    """
+    Def-use dependencies between the code cells of one notebook.
+
+    Args:
+        cells (list): The notebook's code cells in order, e.g. from ``split_cells``.
+    """
+
+    def __init__(self, cells: List[CellInfo]):
+        self.cells = cells
+        parsed = []
+        for cell in cells:
+            try:
+                parsed.append(ast.parse(cell.source))
+            except SyntaxError:
+                # Keep the cell connected: any identifier in it may be a use.
+                cell.reads = set(_IDENTIFIER_RE.findall(cell.source)) - _BUILTINS
+                parsed.append(None)
+        for cell, tree in zip(cells, parsed):
+            if tree is not None:
+                _analyze(cell, tree)
+        for cell, steps in zip(cells, cell_steps([cell.source for cell in cells])):
+            cell.steps = steps
+        self.depends: List[Set[int]] = [self._reaching(position) for position in range(len(cells))]
+
+    @classmethod
+    def from_code(cls, code: str) -> "CellGraph":
+        """Builds the graph from the parser's ``code`` string."""
+        return cls(split_cells(code))
+
+    def _reaching(self, position: int) -> Set[int]:
+        """
+        Positions of the cells whose definitions the cell at ``position``
+        reads. A name no earlier cell defines depends on the latest earlier
+        cell with a star import.
+        """
+        found = set()
+        for name in self.cells[position].reads:
+            for earlier in range(position - 1, -1, -1):
+                if name in self.cells[earlier].defines:
+                    found.add(earlier)
+                    break
+            else:
+                for earlier in range(position - 1, -1, -1):
+                    if self.cells[earlier].star_imports:
+                        found.add(earlier)
+                        break
+        return found
+
+    def closure(self, seeds: Iterable[int]) -> List[int]:
+        """The seed positions and every position they depend on, in notebook order."""
+        selected: Set[int] = set()
+        pending = list(seeds)
+        while pending:
+            position = pending.pop()
+            if position not in selected:
+                selected.add(position)
+                pending.extend(self.depends[position])
+        return sorted(selected)
+
+    def seeds_for(self, path: str, description: str = "") -> List[int]:
+        """
+        Positions of the cells a planned file is about: the cells of its
+        notebook step and the cells defining names its description mentions.
+        """
+        step = file_step(path)
+        mentioned = set(_IDENTIFIER_RE.findall(description))
+        seeds = []
+        for position, cell in enumerate(self.cells):
+            if cell.import_only:
+                continue
+            if (step and step in cell.steps) or (cell.defines & mentioned - set(cell.imports)):
+                seeds.append(position)
+        return seeds
+
+    def render(self, positions: Iterable[int]) -> str:
+        """
+        The code of the given cells with their ``# Cell N`` markers. Of
+        import-only cells only the star imports and the imports the other
+        cells use are kept, at the top.
+        """
+        positions = sorted(positions)
+        body = [position for position in positions if not self.cells[position].import_only]
+        used = set().union(*(self.cells[position].reads for position in body)) if body else set()
+        imports: List[str] = []
+        for position in positions:
+            cell = self.cells[position]
+            if cell.import_only:
+                for line in cell.star_imports:
+                    if line not in imports:
+                        imports.append(line)
+                for name, line in cell.imports.items():
+                    if name in used and line not in imports:
+                        imports.append(line)
+        parts = ["\n".join(imports) + "\n"] if imports else []
+        parts += [f"# Cell {self.cells[position].number}\n{self.cells[position].source}\n" for position in body]
+        return "\n".join(parts)
+
+    def context_for(self, path: str, description: str = "") -> Optional[str]:
+        """
+        The minimal notebook code a planned file needs, or None if the graph
+        cannot tell (e.g. ``main.py``, which ties everything together), in
+        which case the whole notebook is the context.
+        """
+        seeds = self.seeds_for(path, description)
+        if not seeds:
+            return None
+        return self.render(self.closure(seeds))
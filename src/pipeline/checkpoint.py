@@ -0,0 +1,223 @@
+"""
+Durable per-stage checkpoints for pipeline runs.
+
+Every completed stage is written to a local SQLite database: its prompt and
+response text (parsed code and documentation, architecture plan, reviewer
+verdicts, ...) and, for stages that write files, a snapshot of the generated
+project. A crashed or rate-limited run can then be resumed from the last
+finished stage instead of starting over at the parser; see
+``PipelineEngine(checkpoints=..., resume=True)``.
+
+A run is identified by the absolute notebook path and output directory.
+Checkpoints of a run are discarded when the notebook content has changed.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CHECKPOINT_DB = ".cache/checkpoints.sqlite"
+
+# Files larger than this are left out of project snapshots.
+MAX_SNAPSHOT_FILE_BYTES = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    notebook TEXT NOT NULL,
+    notebook_sha256 TEXT NOT NULL,
+    output_dir TEXT,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    round INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    output TEXT NOT NULL,
+    isolated INTEGER NOT NULL DEFAULT 0,
+    files TEXT,
+    completed_at REAL NOT NULL,
+    PRIMARY KEY (run_id, round, stage)
+);
+"""
+
+
+@dataclass
+class StageCheckpoint:
+    """
+    A completed stage. ``round`` is 0 for the planning stages (parser and
+    architect); ``files`` maps paths to contents for stages that write files.
+    """
+    round: int
+    stage: str
+    prompt: str
+    output: str
+    isolated: bool = False
+    files: Optional[Dict[str, str]] = None
+
+
+@dataclass
+class RunCheckpoint:
+    """The stored state of a run."""
+    run_id: str
+    status: str
+    stages: List[StageCheckpoint] = field(default_factory=list)
+
+    def get(self, round_num: int, stage: str) -> Optional[StageCheckpoint]:
+        for checkpoint in self.stages:
+            if checkpoint.round == round_num and checkpoint.stage == stage:
+                return checkpoint
+        return None
+
+    def latest_files(self) -> Dict[str, str]:
+        """The most recent project snapshot, or an empty dict."""
+        for checkpoint in reversed(self.stages):
+            if checkpoint.files is not None:
+                return checkpoint.files
+        return {}
+
+
+def file_sha256(path: str) -> str:
+    """Content hash of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_id_for(notebook_path: str, output_dir: Optional[str]) -> str:
+    """Stable run id for a notebook and output directory."""
+    key = f"{os.path.abspath(notebook_path)}\0{os.path.abspath(output_dir) if output_dir else ''}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_files(output_dir: str) -> Dict[str, str]:
+    """
+    Reads the text files of a generated project, keyed by path (including
+    ``output_dir``). Binary and very large files are skipped.
+    """
+    files = {}
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.getsize(path) > MAX_SNAPSHOT_FILE_BYTES:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    files[path] = f.read()
+            except (UnicodeDecodeError, OSError):
+                continue
+    return files
+
+
+def restore_files(files: Dict[str, str]) -> List[str]:
+    """Writes back snapshot files that are missing on disk. Returns their paths."""
+    restored = []
+    for path, content in files.items():
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        restored.append(path)
+    return restored
+
+
+class CheckpointStore:
+    """
+    SQLite-backed store of stage checkpoints, safe to share between threads
+    and concurrent conversions.
+
+    Args:
+        path (str): Database file. Its directory is created if needed.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_DB):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+
+    def start_run(self, run_id: str, notebook_path: str, output_dir: Optional[str],
+                  resume: bool = False) -> RunCheckpoint:
+        """
+        Registers a run and returns what is stored for it.
+
+        Without ``resume``, or when the notebook changed since the checkpoints
+        were written, earlier checkpoints of the run are discarded.
+        """
+        notebook_sha = file_sha256(notebook_path) if os.path.exists(notebook_path) else ""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT notebook_sha256 FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is not None and (not resume or row[0] != notebook_sha):
+                self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+                row = None
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO runs VALUES (?, ?, ?, ?, 'running', ?, ?)",
+                    (run_id, os.path.abspath(notebook_path), notebook_sha, output_dir, now, now),
+                )
+        return self.load(run_id)
+
+    def save_stage(self, run_id: str, checkpoint: StageCheckpoint):
+        """Records a completed stage; a later save for the same stage replaces it."""
+        files = json.dumps(checkpoint.files) if checkpoint.files is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, checkpoint.round, checkpoint.stage, checkpoint.prompt, checkpoint.output,
+                 int(checkpoint.isolated), files, time.time()),
+            )
+            self._conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def finish_run(self, run_id: str, status: str):
+        """Marks a run as finished with ``status`` (e.g. "approved")."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?", (status, time.time(), run_id)
+            )
+
+    def load(self, run_id: str) -> Optional[RunCheckpoint]:
+        """The stored run with its stages in completion order, or None."""
+        with self._lock:
+            run = self._conn.execute("SELECT status FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if run is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT round, stage, prompt, output, isolated, files FROM stages "
+                "WHERE run_id = ? ORDER BY completed_at, rowid", (run_id,)
+            ).fetchall()
+        stages = [
+            StageCheckpoint(round=r, stage=s, prompt=p, output=o, isolated=bool(i),
+                            files=json.loads(f) if f is not None else None)
+            for r, s, p, o, i, f in rows
+        ]
+        return RunCheckpoint(run_id=run_id, status=run[0], stages=stages)
+
+    def runs(self) -> List[Tuple[str, str, str]]:
+        """(run_id, notebook, status) of every stored run, most recent first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT run_id, notebook, status FROM runs ORDER BY updated_at DESC"
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,171 @@
+"""
+Map-reduce over notebook chunks.
+
+Large notebooks do not fit into a single prompt, and truncating them silently
+drops cells. Instead the text is split into sections (notebook cells, or the
+files of a generated project), the sections are packed in order into chunks
+within a token budget, every chunk is processed by its own model call - all
+of them concurrently - and the partial results are merged into one.
+
+A section larger than the budget on its own is split at line boundaries, so
+every chunk fits and no text is lost.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from src.pipeline.compaction import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tokens of notebook or code text per chunk.
+DEFAULT_CHUNK_TOKENS = 8000
+# Model calls of one map step that run at the same time.
+DEFAULT_MAP_CONCURRENCY = 4
+
+# Cell markers of the parsed notebook code and documentation.
+CELL_MARKER = re.compile(r"^(?:# Cell \d+.*|<!-- Cell \d+ -->)\s*$", re.MULTILINE)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class Chunk:
+    """
+    Consecutive sections packed within a token budget.
+
+    Attributes:
+        index (int): Position of the chunk, from 0.
+        sections (List[int]): Indices of the sections in the chunk. A section
+            split over several chunks appears in each of them.
+        text (str): The sections' text, in order.
+        tokens (int): Estimated tokens of ``text``.
+    """
+    index: int
+    sections: List[int]
+    text: str
+    tokens: int
+
+
+def split_sections(text: str, marker: "re.Pattern" = CELL_MARKER) -> List[str]:
+    """
+    Splits ``text`` before every line matching ``marker``, keeping the marker
+    lines. Text before the first marker is a section of its own.
+    """
+    starts = [match.start() for match in marker.finditer(text)]
+    bounds = [0] + [start for start in starts if start > 0] + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:]) if text[a:b].strip()]
+
+
+def _split_lines(text: str, token_budget: int) -> List[str]:
+    pieces, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while estimate_tokens(line) > token_budget:
+            # A single line over the budget, e.g. an embedded data literal.
+            size = token_budget * 4
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:size])
+            line = line[size:]
+        if current and estimate_tokens(current + line) > token_budget:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_sections(sections: Sequence[str], token_budget: int = DEFAULT_CHUNK_TOKENS) -> List[Chunk]:
+    """
+    Packs consecutive sections into as few chunks as fit the budget, keeping
+    their order.
+
+    Raises:
+        ValueError: If ``token_budget`` is not positive.
+    """
+    if token_budget <= 0:
+        raise ValueError("token_budget must be positive")
+    chunks: List[Chunk] = []
+    texts: List[str] = []
+    indices: List[int] = []
+
+    def flush():
+        if texts:
+            text = "".join(texts)
+            chunks.append(Chunk(len(chunks), list(indices), text, estimate_tokens(text)))
+            texts.clear()
+            indices.clear()
+
+    for index, section in enumerate(sections):
+        if estimate_tokens(section) > token_budget:
+            flush()
+            for piece in _split_lines(section, token_budget):
+                texts.append(piece)
+                indices.append(index)
+                flush()
+            continue
+        if texts and estimate_tokens("".join(texts) + section) > token_budget:
+            flush()
+        texts.append(section)
+        indices.append(index)
+    flush()
+    return chunks
+
+
+def chunk_text(text: str, token_budget: int = DEFAULT_CHUNK_TOKENS,
+               marker: "re.Pattern" = CELL_MARKER) -> List[Chunk]:
+    """``split_sections`` followed by ``chunk_sections``."""
+    return chunk_sections(split_sections(text, marker), token_budget)
+
+
+async def map_chunks(items: Sequence[T], fn: Callable[[T], Awaitable[R]],
+                     concurrency: int = DEFAULT_MAP_CONCURRENCY) -> List[R]:
+    """
+    Runs ``fn`` on every item (chunk or prompt), at most ``concurrency`` at a
+    time, and returns the results in order.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await fn(item)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
+
+
+def parse_json_object(text: str) -> Optional[Dict]:
+    """The JSON object in a model reply, possibly inside a code fence, or None."""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end == -1:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def merge_parsed(partials: Sequence[str]) -> str:
+    """
+    Merges the parser replies of consecutive chunks into one reply in the
+    parser's ``{"code": ..., "documentation": ...}`` format.
+
+    If a reply is not such a JSON object (e.g. the PII guardrail blocked the
+    chunk), the replies are joined unchanged instead, so nothing is dropped.
+    """
+    parsed = [parse_json_object(text) for text in partials]
+    if any(data is None for data in parsed):
+        logger.warning("A chunk's parser reply is not JSON; passing the replies on unmerged")
+        return "\n\n".join(partials)
+    merged = {}
+    for key in ("code", "documentation"):
+        parts = [str(data.get(key) or "").strip("\n") for data in parsed]
+        merged[key] = "\n\n".join(part for part in parts if part)
+    return json.dumps(merged, ensure_ascii=False)
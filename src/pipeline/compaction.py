@@ -0,0 +1,181 @@
+"""
+Session history compaction between feedback rounds.
+
+All agents share one session, so without compaction every call in later
+rounds re-sends the full history, including every file body written through
+``write_file`` and every file read back by the reviewer. Compaction rewrites
+the session so that
+
+* large tool payloads are replaced by a short summary with a content hash,
+* only the latest invocation of the architect, refactorer, DevOps and
+  reviewer agents is kept (later rounds supersede earlier plans, files and
+  feedback), and
+* the estimated size stays under a token budget by dropping the oldest
+  unprotected invocations first.
+"""
+
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Tool payloads above this size are replaced by a summary.
+DEFAULT_PAYLOAD_CHARS = 400
+# Agents for which only the most recent invocation is relevant.
+LATEST_ONLY_AGENTS = ("architect_agent", "refactorer_agent", "devops_agent", "reviewer_agent", "verifier")
+# Agents whose latest invocation is never dropped to meet the budget.
+PROTECTED_AGENTS = ("parser_agent", "architect_agent", "reviewer_agent")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate: 4 characters per token."""
+    return len(text) // 4
+
+
+def summarize_payload(text: str) -> str:
+    """
+    Replaces a large payload with its size, first line and content hash.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    first_line = text.strip().splitlines()[0][:80] if text.strip() else ""
+    return f"[compacted: {len(text)} chars, {text.count(chr(10)) + 1} lines, sha256:{digest}; starts with: {first_line!r}]"
+
+
+def _compact_value(value: Any, max_chars: int) -> Any:
+    if isinstance(value, str) and len(value) > max_chars:
+        return summarize_payload(value)
+    if isinstance(value, dict):
+        return {k: _compact_value(v, max_chars) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_compact_value(v, max_chars) for v in value]
+    return value
+
+
+def event_size(event) -> int:
+    """Estimated token count of one event's content."""
+    content = getattr(event, "content", None)
+    if content is None or not content.parts:
+        return 0
+    total = 0
+    for part in content.parts:
+        if part.text:
+            total += estimate_tokens(part.text)
+        if part.function_call:
+            total += estimate_tokens(str(part.function_call.args or {}))
+        if part.function_response:
+            total += estimate_tokens(str(part.function_response.response or {}))
+    return total
+
+
+def compact_tool_payloads(event, max_chars: int = DEFAULT_PAYLOAD_CHARS):
+    """
+    Returns a copy of ``event`` with large function call arguments and
+    function responses replaced by summaries. Model and user text is kept.
+    """
+    content = getattr(event, "content", None)
+    if content is None or not content.parts:
+        return event
+    if not any(part.function_call or part.function_response for part in content.parts):
+        return event
+    event = event.model_copy(deep=True)
+    for part in event.content.parts:
+        if part.function_call and part.function_call.args:
+            part.function_call.args = _compact_value(dict(part.function_call.args), max_chars)
+        if part.function_response and part.function_response.response:
+            part.function_response.response = _compact_value(dict(part.function_response.response), max_chars)
+    return event
+
+
+def _invocations(events: Sequence[Any]) -> List[List[Any]]:
+    """Groups events by invocation id, in order of first appearance."""
+    groups: Dict[str, List[Any]] = {}
+    order: List[str] = []
+    for event in events:
+        key = event.invocation_id or event.id
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(event)
+    return [groups[key] for key in order]
+
+
+def _invocation_agent(group: Iterable[Any]) -> Optional[str]:
+    for event in group:
+        if event.author and event.author != "user":
+            return event.author
+    return None
+
+
+def compact_events(events: Sequence[Any], token_budget: int,
+                   max_payload_chars: int = DEFAULT_PAYLOAD_CHARS) -> List[Any]:
+    """
+    Compacts a session history.
+
+    Args:
+        events: The session events, oldest first.
+        token_budget (int): Target upper bound for the estimated history size.
+        max_payload_chars (int): Tool payloads longer than this are summarized.
+
+    Returns:
+        list: The compacted events, oldest first. The latest parser, architect
+        and reviewer invocations are always kept, so the result can exceed the
+        budget only if those alone do.
+    """
+    groups = _invocations(events)
+    agents = [_invocation_agent(group) for group in groups]
+
+    latest: Dict[str, int] = {}
+    for index, agent in enumerate(agents):
+        if agent:
+            latest[agent] = index
+
+    kept = []
+    for index, (group, agent) in enumerate(zip(groups, agents)):
+        if agent in LATEST_ONLY_AGENTS and latest[agent] != index:
+            continue
+        kept.append((index, agent, [compact_tool_payloads(e, max_payload_chars) for e in group]))
+
+    total = sum(event_size(e) for _, _, group in kept for e in group)
+    dropped = set()
+    for index, agent, group in kept:
+        if total <= token_budget:
+            break
+        if agent in PROTECTED_AGENTS and latest.get(agent) == index:
+            continue
+        total -= sum(event_size(e) for e in group)
+        dropped.add(index)
+
+    compacted = [event for index, _, group in kept if index not in dropped for event in group]
+    logger.info(
+        f"Compacted session history from {len(events)} to {len(compacted)} events "
+        f"(~{total} tokens, budget {token_budget})"
+    )
+    return compacted
+
+
+async def compact_session(session_service, app_name: str, user_id: str, session_id: str,
+                          token_budget: int, max_payload_chars: int = DEFAULT_PAYLOAD_CHARS):
+    """
+    Replaces a stored session by its compacted version under the same id.
+
+    Returns:
+        The new session.
+    """
+    session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    if session is None:
+        raise ValueError(f"Session {session_id} not found")
+
+    compacted = compact_events(session.events, token_budget, max_payload_chars=max_payload_chars)
+    state = {k: v for k, v in session.state.items() if not k.startswith(("app:", "user:", "temp:"))}
+
+    await session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    new_session = await session_service.create_session(
+        app_name=app_name, user_id=user_id, session_id=session_id, state=state
+    )
+    for event in compacted:
+        if event.actions and event.actions.state_delta:
+            event = event.model_copy(deep=True)
+            event.actions.state_delta = {}
+        await session_service.append_event(new_session, event)
+    return new_session
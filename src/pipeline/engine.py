@@ -0,0 +1,868 @@
+"""
+Async orchestration engine for the multi-agent conversion pipeline.
+
+The pipeline stages are modelled as a small dependency graph and every agent
+is driven through ``Runner.run_async``. Stages whose dependencies are already
+satisfied run concurrently, e.g. the DevOps agent only needs the architecture
+plan, so it runs alongside the Refactorer instead of after it.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai import types
+
+from src.model_registry import get_model
+from src.pipeline.architecture_planner import DEFAULT_MIN_CONFIDENCE, extract_code, local_plan_or_none
+from src.pipeline.cell_graph import CellGraph
+from src.pipeline.candidates import cleanup, make_staging_dirs, pick_best, promote, staging_root
+from src.pipeline.chunking import DEFAULT_CHUNK_TOKENS, chunk_sections, merge_parsed, parse_json_object
+from src.pipeline.checkpoint import (
+    CheckpointStore, RunCheckpoint, StageCheckpoint, restore_files, run_id_for, snapshot_files,
+)
+from src.pipeline.compaction import compact_session
+from src.pipeline.notebook_parser import parse_notebook_json, read_cells
+from src.pipeline.feedback import build_regeneration_prompt, is_devops_file, list_output_files, parse_feedback
+from src.pipeline.streaming import StreamEvent, to_stream_events
+from src.pipeline.verification import VERIFIED, verify_project
+from src.utils.logging_config import log_context
+from src.utils.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+APP_NAME = "notebook_to_code_pipeline"
+
+PARSER_PROMPT = "Parse the notebook at '{notebook_path}'"
+PARSER_CHUNK_PROMPT = (
+    "Parse part {part} of {parts} of the notebook at '{notebook_path}'. Its cells are below, so do not "
+    "read the notebook. Return the JSON for these cells only.\n\n{cells}"
+)
+ARCHITECT_PROMPT = "Based on the parsed code and documentation, design the project structure."
+REFACTORER_PROMPT = "Generate the production-ready code based on the plan."
+DEVOPS_PROMPT = "Create the deployment configuration files."
+REVIEWER_PROMPT = (
+    "Review the generated code and configuration. If everything is production-ready with no issues, "
+    "respond with ONLY 'APPROVED'. If there are any issues, provide ONLY specific feedback without saying APPROVED."
+)
+
+Prompt = Union[str, Callable[[Dict[str, str]], str]]
+EventCallback = Callable[[StreamEvent], None]
+
+# Stages whose checkpoints include a snapshot of the generated project.
+FILE_WRITING_STAGES = ("refactorer_agent", "devops_agent")
+
+
+@dataclass
+class Stage:
+    """
+    A single agent invocation in the pipeline graph.
+
+    Attributes:
+        name (str): Unique stage name; its output text is stored under this key.
+        agent: The ADK agent to run, or None for a local stage.
+        prompt (str | callable): The user message, or a callable receiving the
+            outputs of the stages completed so far and returning the message.
+        depends_on (Sequence[str]): Names of stages that must finish first.
+        isolated (bool): Run in a fresh, temporary session instead of the shared
+            one, so the prompt is the agent's only context.
+        local (callable, optional): Runs instead of an agent, in a worker
+            thread, with the outputs so far; returns the stage output. Local
+            stages make no model call. If it returns None and the stage has an
+            agent, the agent runs instead.
+        when (callable, optional): Receives the outputs so far once the
+            dependencies finished; the stage is skipped if it returns False.
+        history (bool): For local stages: append the prompt and the output to
+            the shared session, as if an agent had answered the prompt, so
+            later agents see the output in their context.
+        checkpoint (bool): Checkpoint the stage when it finishes. A stage
+            without checkpoint is rerun on resume, unless every stage that
+            depends on it was restored.
+    """
+    name: str
+    agent: Any
+    prompt: Prompt
+    depends_on: Sequence[str] = ()
+    isolated: bool = False
+    local: Optional[Callable[[Dict[str, str]], str]] = None
+    when: Optional[Callable[[Dict[str, str]], bool]] = None
+    history: bool = False
+    checkpoint: bool = True
+
+
+@dataclass
+class PipelineResult:
+    """Outcome of a full conversion run."""
+    approved: bool
+    rounds: int
+    verdict: str
+    outputs: Dict[str, str] = field(default_factory=dict)
+    usage: Dict[str, int] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def get_event_text(event) -> str:
+    """
+    Extracts the text parts of a single ADK event.
+    """
+    content = getattr(event, "content", None)
+    if content is None or not getattr(content, "parts", None):
+        return ""
+    return "".join(part.text for part in content.parts if getattr(part, "text", None))
+
+
+def add_event_usage(usage: Dict[str, int], event) -> None:
+    """
+    Accumulates the token counts reported on an event into ``usage``.
+    """
+    metadata = getattr(event, "usage_metadata", None)
+    if metadata is None:
+        return
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + (metadata.prompt_token_count or 0)
+    usage["completion_tokens"] = usage.get("completion_tokens", 0) + (metadata.candidates_token_count or 0)
+    usage["total_tokens"] = usage.get("total_tokens", 0) + (metadata.total_token_count or 0)
+
+
+async def run_agent(agent, prompt: str, session_service, user_id: str, session_id: str,
+                    app_name: str = APP_NAME, usage: Optional[Dict[str, int]] = None,
+                    plugins: Optional[List[Any]] = None,
+                    on_event: Optional[EventCallback] = None, stage: Optional[str] = None) -> str:
+    """
+    Runs one agent turn on the shared session and returns the concatenated response text.
+
+    If ``usage`` is given, the token counts of the turn are added to it.
+    ``plugins`` are ADK runner plugins, e.g. the response cache. If
+    ``on_event`` is given, the model is called in SSE streaming mode and every
+    text chunk, tool call and tool result is passed to it as a StreamEvent
+    tagged with ``stage`` (default: the agent name) as soon as it arrives.
+    """
+    runner = Runner(agent=agent, app_name=app_name, session_service=session_service, plugins=plugins)
+    message = types.Content(role="user", parts=[types.Part(text=prompt)])
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE) if on_event else None
+    stage = stage or agent.name
+    chunks = []
+    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=message,
+                                        run_config=run_config):
+        if on_event is not None:
+            for stream_event in to_stream_events(stage, event):
+                on_event(stream_event)
+        if event.partial:
+            # The final event of the turn repeats the streamed text and usage.
+            continue
+        chunks.append(get_event_text(event))
+        if usage is not None:
+            add_event_usage(usage, event)
+    return "".join(chunks)
+
+
+def create_pipeline_agents(api_key: str = None, output_dir: str = "OUTPUT",
+                           models: Optional[Dict[str, Any]] = None,
+                           model_names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Creates the five pipeline agents, keyed by role.
+
+    Args:
+        api_key (str, optional): Google API key. Falls back to GOOGLE_API_KEY.
+        output_dir (str): Directory the generated project is written to.
+        models (dict, optional): Models keyed by role that replace the default
+            Gemini model, e.g. ReplayLlm instances for offline runs.
+        model_names (dict, optional): Gemini model names keyed by role, e.g.
+            from ``route_models``. Ignored for roles listed in ``models``.
+
+    Raises:
+        ValueError: If no API key is available.
+    """
+    from agents.parser_agent import create_parser_agent
+    from agents.architect_agent import create_architect_agent
+    from agents.refactorer_agent import create_refactorer_agent
+    from agents.devops_agent import create_devops_agent
+    from agents.reviewer_agent import create_reviewer_agent
+
+    models = dict(models or {})
+    for role, name in (model_names or {}).items():
+        if role not in models:
+            models[role] = get_model(name, api_key=api_key)
+    return {
+        "parser": create_parser_agent(api_key=api_key, model=models.get("parser")),
+        "architect": create_architect_agent(api_key=api_key, output_dir=output_dir, model=models.get("architect")),
+        "refactorer": create_refactorer_agent(api_key=api_key, output_dir=output_dir, model=models.get("refactorer")),
+        "devops": create_devops_agent(api_key=api_key, output_dir=output_dir, model=models.get("devops")),
+        "reviewer": create_reviewer_agent(api_key=api_key, model=models.get("reviewer")),
+    }
+
+
+async def append_message(session_service, app_name: str, user_id: str, session_id: str,
+                         author: str, text: str, role: str = "model"):
+    """Appends a text message to a session without running an agent."""
+    session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    await session_service.append_event(session, Event(
+        invocation_id=f"{author}-{len(session.events)}", author=author,
+        content=types.Content(role=role, parts=[types.Part(text=text)]),
+    ))
+
+
+def _span(tracer: Optional[Tracer], name: str, kind: str, **attrs):
+    """A tracer span, or a no-op context when tracing is disabled."""
+    return tracer.span(name, kind, **attrs) if tracer is not None else nullcontext()
+
+
+def _topological_order(stages: Sequence[Stage], completed: Sequence[str] = ()) -> List[Stage]:
+    """
+    Orders stages so every stage comes after its dependencies.
+
+    Raises:
+        ValueError: On duplicate names, unknown dependencies or cycles.
+    """
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"Duplicate stage name: {stage.name}")
+        by_name[stage.name] = stage
+
+    for stage in stages:
+        for dep in stage.depends_on:
+            if dep not in by_name and dep not in completed:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+
+    ordered: List[Stage] = []
+    visiting, done = set(), set()
+
+    def visit(stage: Stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Dependency cycle detected at stage '{stage.name}'")
+        visiting.add(stage.name)
+        for dep in stage.depends_on:
+            if dep in by_name:
+                visit(by_name[dep])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+
+async def run_stage_graph(stages: Sequence[Stage], session_service, user_id: str, session_id: str,
+                          results: Optional[Dict[str, str]] = None,
+                          on_status: Optional[Callable[[str], None]] = None,
+                          app_name: str = APP_NAME,
+                          usage: Optional[Dict[str, int]] = None,
+                          plugins: Optional[List[Any]] = None,
+                          timings: Optional[Dict[str, float]] = None,
+                          tracer: Optional[Tracer] = None,
+                          on_event: Optional[EventCallback] = None,
+                          on_complete: Optional[Callable[[Stage, str, str], None]] = None) -> Dict[str, str]:
+    """
+    Executes a graph of stages, running every stage as soon as its dependencies finish.
+
+    Args:
+        stages: The stages to run.
+        session_service: ADK session service shared by all stages.
+        user_id (str): Session user id.
+        session_id (str): Session id.
+        results (dict, optional): Outputs of previously completed stages. New
+            outputs are added to this dict in place.
+        on_status (callable, optional): Receives human-readable progress lines.
+        app_name (str): ADK app name.
+        usage (dict, optional): Accumulates token counts of all stages.
+        plugins (list, optional): ADK runner plugins applied to every stage.
+        timings (dict, optional): Accumulates wall-clock seconds per stage name.
+        tracer (Tracer, optional): Receives one span per stage.
+        on_event (callable, optional): Receives live StreamEvents of every stage;
+            enables streaming (see ``run_agent``).
+        on_complete (callable, optional): Called with the stage, its prompt and
+            its response text as soon as a stage finishes, e.g. to checkpoint it.
+
+    Returns:
+        dict: Stage name -> response text.
+    """
+    results = {} if results is None else results
+    ordered = _topological_order(stages, completed=list(results))
+    tasks: Dict[str, asyncio.Task] = {}
+    report = on_status or (lambda _msg: None)
+
+    async def execute(stage: Stage) -> Optional[str]:
+        pending = [tasks[dep] for dep in stage.depends_on if dep in tasks]
+        if pending:
+            await asyncio.gather(*pending)
+        if stage.when is not None and not stage.when(results):
+            report(f"--- Skipping {stage.name} ---")
+            logger.info(f"Skipping {stage.name}")
+            return None
+        prompt = stage.prompt(results) if callable(stage.prompt) else stage.prompt
+        report(f"--- Running {stage.name} ---")
+        logger.info(f"Running {stage.name}")
+        start = time.perf_counter()
+        agent_name = stage.agent.name if stage.agent is not None else stage.name
+        span = _span(tracer, stage.name, "stage", agent=agent_name, isolated=stage.isolated)
+        with log_context(stage=stage.name), span:
+            text = None
+            if stage.local is not None:
+                text = await asyncio.to_thread(stage.local, dict(results))
+                if text is None and stage.agent is None:
+                    text = ""
+                if text is None:
+                    logger.info(f"{stage.name}: no local result, running {agent_name}")
+                elif stage.history:
+                    await append_message(session_service, app_name, user_id, session_id, "user", prompt, role="user")
+                    await append_message(session_service, app_name, user_id, session_id, stage.name, text)
+            if text is None and stage.isolated:
+                scratch = await session_service.create_session(app_name=app_name, user_id=user_id)
+                try:
+                    text = await run_agent(stage.agent, prompt, session_service, user_id, scratch.id,
+                                           app_name=app_name, usage=usage, plugins=plugins,
+                                           on_event=on_event, stage=stage.name)
+                finally:
+                    await session_service.delete_session(app_name=app_name, user_id=user_id, session_id=scratch.id)
+            elif text is None:
+                text = await run_agent(stage.agent, prompt, session_service, user_id, session_id,
+                                       app_name=app_name, usage=usage, plugins=plugins,
+                                       on_event=on_event, stage=stage.name)
+        if timings is not None:
+            timings[stage.name] = timings.get(stage.name, 0.0) + time.perf_counter() - start
+        results[stage.name] = text
+        if on_complete is not None:
+            on_complete(stage, prompt, text)
+        logger.info(f"{stage.name} response: {text[:100]}...")
+        report(f"{stage.name} finished.")
+        return text
+
+    # Tasks are created in dependency order so that every dependency already has a task.
+    for stage in ordered:
+        tasks[stage.name] = asyncio.create_task(execute(stage))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return results
+
+
+class PipelineEngine:
+    """
+    Drives the Parser -> Architect -> (Refactorer || DevOps) -> Reviewer pipeline.
+
+    Args:
+        agents (dict): Agents keyed by role: "parser", "architect", "refactorer",
+            "devops" and "reviewer".
+        session_service: ADK session service. Defaults to a fresh InMemorySessionService.
+        user_id (str): Session user id.
+        session_id (str): Session id shared by all agents.
+        max_rounds (int): Maximum refactor/review rounds.
+        on_status (callable, optional): Receives human-readable progress lines.
+        plugins (list, optional): ADK runner plugins applied to every agent call.
+        history_budget (int, optional): Token budget for the shared session
+            history. When set, the history is compacted before every round
+            after the first. None disables compaction.
+        tracer (Tracer, optional): Receives run, round and stage spans. Add a
+            TracingPlugin to ``plugins`` to also trace model and tool calls.
+        output_dir (str, optional): Directory of the generated project. Needed
+            for incremental regeneration.
+        incremental (bool): From round 2 on, regenerate only the files named in
+            the reviewer feedback (requires ``output_dir``). Falls back to full
+            regeneration when the feedback names no file.
+        on_event (callable, optional): Receives live StreamEvents (model text
+            chunks, tool calls and results) of every agent. Setting it switches
+            the model calls to streaming mode.
+        checkpoints (CheckpointStore, optional): Records every completed stage
+            so an interrupted run can be resumed.
+        resume (bool): Continue from the checkpoints of an earlier run of the
+            same notebook and output directory instead of starting over.
+        run_id (str, optional): Checkpoint run id. Defaults to one derived from
+            the notebook path and ``output_dir``.
+        verify (bool): Run local static checks of the generated files before
+            every review (requires ``output_dir``). Failures are sent back to
+            the Refactorer as feedback without calling the reviewer.
+        candidates (int): Number of refactorer drafts generated concurrently in
+            every full-regeneration round. Above 1 the drafts are scored
+            locally and only the best is kept (requires ``output_dir`` and
+            ``candidate_factory``).
+        candidate_factory (callable, optional): Builds a refactorer agent that
+            writes into the given staging directory.
+        candidate_tests (bool): Run each candidate's own tests when scoring.
+        llm_parser (bool): Parse the notebook with the parser agent instead of
+            locally with nbformat. The local parser needs no model call and
+            produces the same code/documentation JSON.
+        llm_architect (bool): Always ask the architect agent for the project
+            layout. By default the layout is planned locally from the notebook
+            code and the agent is only asked when the local plan's confidence
+            is below ``planner_confidence``.
+        planner_confidence (float): Minimum confidence of a local plan.
+        chunk_tokens (int, optional): With ``llm_parser``, notebooks larger
+            than this many tokens are split into cell chunks that the parser
+            agent handles concurrently, each in an isolated session; the
+            partial results are merged in cell order. None disables chunking.
+        per_file (bool): In full-regeneration rounds, write every Python
+            file of the architecture plan in its own isolated refactorer call,
+            all concurrently, with only the notebook cells that file needs
+            (from the cells' def-use graph) as context. Files the graph cannot
+            place get one call with the whole notebook.
+    """
+
+    def __init__(self, agents: Dict[str, Any], session_service=None, user_id: str = "user_1",
+                 session_id: str = "session_1", max_rounds: int = 3,
+                 on_status: Optional[Callable[[str], None]] = None,
+                 plugins: Optional[List[Any]] = None,
+                 history_budget: Optional[int] = None,
+                 tracer: Optional[Tracer] = None,
+                 output_dir: Optional[str] = None,
+                 incremental: bool = True,
+                 on_event: Optional[EventCallback] = None,
+                 checkpoints: Optional[CheckpointStore] = None,
+                 resume: bool = False,
+                 run_id: Optional[str] = None,
+                 verify: bool = True,
+                 candidates: int = 1,
+                 candidate_factory: Optional[Callable[[str], Any]] = None,
+                 candidate_tests: bool = True,
+                 llm_parser: bool = False,
+                 llm_architect: bool = False,
+                 planner_confidence: float = DEFAULT_MIN_CONFIDENCE,
+                 chunk_tokens: Optional[int] = DEFAULT_CHUNK_TOKENS,
+                 per_file: bool = False):
+        required = {"architect", "refactorer", "devops", "reviewer"} | ({"parser"} if llm_parser else set())
+        missing = required - set(agents)
+        if missing:
+            raise ValueError(f"Missing agents: {', '.join(sorted(missing))}")
+        self.agents = agents
+        self.session_service = session_service or InMemorySessionService()
+        self.user_id = user_id
+        self.session_id = session_id
+        self.max_rounds = max_rounds
+        self.on_status = on_status or (lambda _msg: None)
+        self.usage: Dict[str, int] = {}
+        self.plugins = list(plugins or [])
+        self.timings: Dict[str, float] = {}
+        self.history_budget = history_budget
+        self.tracer = tracer
+        self.output_dir = output_dir
+        self.incremental = incremental
+        self.on_event = on_event
+        self.checkpoints = checkpoints
+        self.resume = resume
+        self.run_id = run_id
+        self.verify = verify
+        self.candidates = candidates
+        self.candidate_factory = candidate_factory
+        self.candidate_tests = candidate_tests
+        self.llm_parser = llm_parser
+        self.llm_architect = llm_architect
+        self.planner_confidence = planner_confidence
+        self.chunk_tokens = chunk_tokens
+        self.per_file = per_file
+        self._planning_outputs: Dict[str, str] = {}
+        self._cell_graph: Optional[CellGraph] = None
+        self._staging_dirs: List[str] = []
+        self._last_verdict = ""
+
+    def planning_stages(self, notebook_path: str) -> List[Stage]:
+        """Stages that run once before the feedback loop."""
+        prompt = PARSER_PROMPT.format(notebook_path=notebook_path)
+        chunks = self._parser_chunk_stages(notebook_path) if self.llm_parser else []
+        if chunks:
+            parser = chunks.pop()
+        elif self.llm_parser:
+            parser = Stage("parser_agent", self.agents["parser"], prompt)
+        else:
+            parser = Stage("parser_agent", None, prompt, local=lambda _results: parse_notebook_json(notebook_path),
+                           history=True)
+        architect = Stage("architect_agent", self.agents["architect"], ARCHITECT_PROMPT, depends_on=("parser_agent",))
+        if not self.llm_architect:
+            architect.local = lambda results: local_plan_or_none(
+                results["parser_agent"], self.output_dir or "OUTPUT", self.planner_confidence)
+            architect.history = True
+        return chunks + [parser, architect]
+
+    def _parser_chunk_stages(self, notebook_path: str) -> List[Stage]:
+        """
+        One isolated parser stage per cell chunk, followed by a local
+        "parser_agent" stage that merges their replies. Empty if chunking is
+        off, the notebook fits into one chunk or cannot be read here (the
+        parser agent then reads it with its tool).
+        """
+        if not self.chunk_tokens:
+            return []
+        try:
+            cells = read_cells(notebook_path)
+        except ValueError:
+            return []
+        sections = [f"# Cell {index} ({cell_type})\n{source.strip()}\n\n"
+                    for index, (cell_type, source) in enumerate(cells) if source.strip()]
+        chunks = chunk_sections(sections, self.chunk_tokens)
+        if len(chunks) < 2:
+            return []
+        self.on_status(f"Parsing {len(sections)} cells in {len(chunks)} chunks")
+        names = tuple(f"parser_chunk_{chunk.index + 1}" for chunk in chunks)
+        stages = [
+            Stage(name, self.agents["parser"], PARSER_CHUNK_PROMPT.format(
+                part=chunk.index + 1, parts=len(chunks), notebook_path=notebook_path, cells=chunk.text),
+                isolated=True)
+            for name, chunk in zip(names, chunks)
+        ]
+        stages.append(Stage("parser_agent", None, PARSER_PROMPT.format(notebook_path=notebook_path),
+                            depends_on=names, local=lambda results: merge_parsed([results[n] for n in names]),
+                            history=True))
+        return stages
+
+    def round_stages(self, round_num: int) -> List[Stage]:
+        """
+        Stages of one feedback round. DevOps only depends on the architecture
+        plan, so it runs concurrently with the Refactorer.
+
+        In incremental mode, rounds after the first regenerate only the files
+        named in the previous reviewer feedback, each agent in an isolated
+        session with those files' current contents as its only context; an
+        agent none of whose files were flagged is skipped.
+
+        In per-file mode, full-regeneration rounds write the planned files in
+        concurrent isolated calls, each with its slice of the notebook.
+
+        With verification enabled, a local "verifier" stage checks the
+        generated files before the reviewer, and the reviewer only runs if the
+        checks pass.
+        """
+        stages = []
+        if round_num > 1 and self.incremental and self.output_dir:
+            stages = self._targeted_stages()
+        if not stages:
+            if self.candidates > 1 and self.candidate_factory and self.output_dir:
+                stages = self._candidate_stages(round_num)
+            elif self.per_file:
+                stages = self._per_file_stages()
+            if not stages:
+                stages = [Stage("refactorer_agent", self.agents["refactorer"], REFACTORER_PROMPT)]
+            stages.append(Stage("devops_agent", self.agents["devops"], DEVOPS_PROMPT))
+        names = tuple(stage.name for stage in stages)
+        when = None
+        if self.verify and self.output_dir:
+            stages.append(Stage("verifier", None, "", depends_on=names, local=self._verify))
+            names = ("verifier",)
+            when = lambda results: results["verifier"] == VERIFIED
+        stages.append(Stage("reviewer_agent", self.agents["reviewer"], REVIEWER_PROMPT, depends_on=names, when=when))
+        return stages
+
+    def _candidate_stages(self, round_num: int) -> List[Stage]:
+        """
+        K refactorer candidates, each writing into its own staging directory
+        in an isolated session, followed by a local "refactorer_agent" stage
+        that scores them and copies the best one into the output directory.
+
+        The candidates are not checkpointed: their drafts only exist in the
+        staging directories, so on resume they are generated again unless the
+        selection already finished.
+        """
+        parent = staging_root(self.run_id) if self.checkpoints is not None and self.run_id else None
+        staging_dirs = make_staging_dirs(self.candidates, prefix=f"round{round_num}_candidate_", parent=parent)
+        self._staging_dirs.extend(staging_dirs)
+        names = tuple(f"refactorer_candidate_{i + 1}" for i in range(self.candidates))
+
+        def candidate_prompt(staging_dir: str) -> Callable[[Dict[str, str]], str]:
+            def prompt(results: Dict[str, str]) -> str:
+                sections = [
+                    REFACTORER_PROMPT,
+                    f"Write every file below '{staging_dir}' instead of '{self.output_dir}', "
+                    "keeping the same relative layout.",
+                    f"Parsed notebook:\n{results.get('parser_agent', '')}",
+                    f"Project structure:\n{results.get('architect_agent', '')}",
+                ]
+                if self._last_verdict:
+                    sections.append(f"Reviewer feedback to address:\n{self._last_verdict}")
+                return "\n\n".join(sections)
+            return prompt
+
+        def select(results: Dict[str, str]) -> str:
+            best, scores = pick_best(staging_dirs, run_candidate_tests=self.candidate_tests)
+            for name, score in zip(names, scores):
+                logger.info(f"{name}: {score.describe()}")
+            promote(staging_dirs[best], self.output_dir)
+            cleanup(staging_dirs)
+            self.on_status(f"Selected {names[best]} of {len(names)}: {scores[best].describe()}")
+            return results[names[best]]
+
+        stages = [
+            Stage(name, self.candidate_factory(staging_dir), candidate_prompt(staging_dir), isolated=True,
+                  checkpoint=False)
+            for name, staging_dir in zip(names, staging_dirs)
+        ]
+        stages.append(Stage("refactorer_agent", None, "", depends_on=names, local=select))
+        return stages
+
+    def _planned_files(self) -> Dict[str, str]:
+        """Planned file path -> description, from the architect's (nested) JSON plan."""
+        plan = parse_json_object(self._planning_outputs.get("architect_agent", "")) or {}
+        files: Dict[str, str] = {}
+
+        def walk(prefix: str, node: Dict):
+            for key, value in node.items():
+                path = f"{prefix}/{key}" if prefix else key
+                if isinstance(value, dict):
+                    walk(path, value)
+                else:
+                    files[path] = str(value)
+
+        walk("", plan)
+        return files
+
+    def _per_file_stages(self) -> List[Stage]:
+        """
+        One isolated refactorer stage per planned Python file the cell graph
+        can slice, one more for all remaining files with the whole notebook,
+        and a local "refactorer_agent" stage that collects their replies.
+        Empty (single refactorer call) if there is no usable plan or code.
+        """
+        parsed = self._planning_outputs.get("parser_agent", "")
+        code = extract_code(parsed)
+        files = {path: description for path, description in self._planned_files().items()
+                 if not is_devops_file(path)}
+        if code is None or not files:
+            return []
+        if self._cell_graph is None:
+            self._cell_graph = CellGraph.from_code(code)
+        plan = self._planning_outputs["architect_agent"]
+
+        def file_prompt(paths: Sequence[str], context: str) -> str:
+            listed = "\n".join(f"- {path}: {files[path]}" for path in paths)
+            sections = [
+                REFACTORER_PROMPT,
+                f"Write ONLY these files of the plan with `write_file(path, content)`; the other files are "
+                f"written separately:\n{listed}",
+                f"Project structure:\n{plan}",
+                context,
+            ]
+            if self._last_verdict:
+                sections.append(f"Reviewer feedback to address:\n{self._last_verdict}")
+            return "\n\n".join(sections)
+
+        stages, rest = [], []
+        for path, description in files.items():
+            context = self._cell_graph.context_for(path, description) if path.endswith(".py") else None
+            if context is None:
+                rest.append(path)
+                continue
+            stages.append(Stage(f"refactorer_file_{len(stages) + 1}", self.agents["refactorer"], file_prompt(
+                [path], f"Notebook cells this file needs:\n```python\n{context}```"), isolated=True))
+        if not stages:
+            return []
+        if rest:
+            stages.append(Stage("refactorer_file_rest", self.agents["refactorer"],
+                                file_prompt(rest, f"Parsed notebook:\n{parsed}"), isolated=True))
+        names = tuple(stage.name for stage in stages)
+        self.on_status(f"Writing {len(files)} files in {len(stages)} parallel refactorer calls")
+        stages.append(Stage("refactorer_agent", None, REFACTORER_PROMPT, depends_on=names, history=True,
+                            local=lambda results: "\n\n".join(results[name] for name in names)))
+        return stages
+
+    def _verify(self, results: Dict[str, str]) -> str:
+        report = verify_project(self.output_dir)
+        if not report.ok:
+            self.on_status(f"Static checks found {len(report.issues)} issues in {report.files_checked} files; "
+                           "skipping review.")
+        return report.to_feedback()
+
+    def _targeted_stages(self) -> List[Stage]:
+        plan = parse_feedback(self._last_verdict, self.output_dir, list_output_files(self.output_dir))
+        if not plan.work_items:
+            return []
+        code_items = {path: items for path, items in plan.work_items.items() if not is_devops_file(path)}
+        devops_items = {path: items for path, items in plan.work_items.items() if is_devops_file(path)}
+        logger.info(f"Targeted regeneration of {len(code_items)} code and {len(devops_items)} deployment files")
+        self.on_status(f"Regenerating only: {', '.join(plan.work_items)}")
+
+        stages = []
+        if code_items:
+            stages.append(Stage("refactorer_agent", self.agents["refactorer"],
+                                build_regeneration_prompt(code_items, plan.general), isolated=True))
+        if devops_items:
+            stages.append(Stage("devops_agent", self.agents["devops"],
+                                build_regeneration_prompt(devops_items, plan.general), isolated=True))
+        return stages
+
+    async def _ensure_session(self):
+        session = await self.session_service.get_session(
+            app_name=APP_NAME, user_id=self.user_id, session_id=self.session_id
+        )
+        if session is None:
+            await self.session_service.create_session(
+                app_name=APP_NAME, user_id=self.user_id, session_id=self.session_id
+            )
+
+    async def run(self, notebook_path: str) -> PipelineResult:
+        """
+        Runs the full pipeline for one notebook.
+
+        Returns:
+            PipelineResult: Whether the code was approved, the number of rounds
+            used, the last reviewer verdict and the last output of every stage.
+        """
+        run_id = self.run_id or run_id_for(notebook_path, self.output_dir)
+        with log_context(run=run_id), _span(self.tracer, "pipeline", "run", notebook=notebook_path) as run_span:
+            result = await self._run(notebook_path)
+            if run_span is not None:
+                run_span.attrs.update(approved=result.approved, rounds=result.rounds, **result.usage)
+            return result
+
+    def _checkpoint(self, round_num: int, stage: Stage, prompt: str, text: str):
+        if not stage.checkpoint:
+            return
+        files = None
+        if stage.name in FILE_WRITING_STAGES and self.output_dir and os.path.isdir(self.output_dir):
+            files = snapshot_files(self.output_dir)
+        self.checkpoints.save_stage(self.run_id, StageCheckpoint(
+            round=round_num, stage=stage.name, prompt=prompt, output=text, isolated=stage.isolated, files=files,
+        ))
+
+    async def _add_to_history(self, author: str, text: str):
+        """Appends a message to the shared session, e.g. feedback that did not come from an agent."""
+        await append_message(self.session_service, APP_NAME, self.user_id, self.session_id, author, text)
+
+    async def _restore(self, stored: RunCheckpoint):
+        """
+        Rebuilds the state of an interrupted run: writes back generated files
+        that are missing and replays the checkpointed prompts and responses
+        into the (empty) shared session, so later agents see the same context.
+        """
+        restored = restore_files(stored.latest_files())
+        if restored:
+            logger.info(f"Restored {len(restored)} files from checkpoint")
+        session = await self.session_service.get_session(
+            app_name=APP_NAME, user_id=self.user_id, session_id=self.session_id
+        )
+        if session.events:
+            return
+        for checkpoint in stored.stages:
+            if checkpoint.isolated or checkpoint.stage == "verifier":
+                # Verifier feedback is re-added by the round loop.
+                continue
+            invocation_id = f"restored-{checkpoint.round}-{checkpoint.stage}"
+            for author, role, text in (("user", "user", checkpoint.prompt), (checkpoint.stage, "model", checkpoint.output)):
+                await self.session_service.append_event(session, Event(
+                    invocation_id=invocation_id, author=author,
+                    content=types.Content(role=role, parts=[types.Part(text=text)]),
+                ))
+
+    async def _run_stages(self, round_num: int, stages: List[Stage], results: Dict[str, str],
+                          stored: Optional[RunCheckpoint]) -> Dict[str, str]:
+        """
+        Runs the stages that have no checkpoint yet and checkpoints them as
+        they finish. Removes the candidate staging directories of the stages
+        afterwards, also when a stage fails.
+        """
+        if stored is not None:
+            stages = self._pending_stages(round_num, stages, results, stored)
+        on_complete = None
+        if self.checkpoints is not None:
+            on_complete = lambda stage, prompt, text: self._checkpoint(round_num, stage, prompt, text)
+        try:
+            with log_context(round=round_num):
+                return await run_stage_graph(
+                    stages, self.session_service, self.user_id, self.session_id,
+                    results=results, on_status=self.on_status, usage=self.usage, plugins=self.plugins,
+                    timings=self.timings, tracer=self.tracer, on_event=self.on_event, on_complete=on_complete,
+                )
+        finally:
+            cleanup(self._staging_dirs)
+            self._staging_dirs = []
+
+    def _pending_stages(self, round_num: int, stages: List[Stage], results: Dict[str, str],
+                        stored: RunCheckpoint) -> List[Stage]:
+        """
+        Restores the checkpointed stages into ``results`` and returns the
+        others. Stages without checkpoint are only returned if a pending stage
+        depends on them.
+        """
+        pending = set()
+        for stage in stages:
+            checkpoint = stored.get(round_num, stage.name) if stage.checkpoint else None
+            if checkpoint is not None:
+                results[stage.name] = checkpoint.output
+                self.on_status(f"{stage.name} restored from checkpoint.")
+            elif stage.checkpoint:
+                pending.add(stage.name)
+        by_name = {stage.name: stage for stage in stages}
+        for stage in reversed(_topological_order(stages, completed=list(results))):
+            if stage.name in pending:
+                pending.update(dep for dep in stage.depends_on if dep in by_name and not by_name[dep].checkpoint)
+        return [stage for stage in stages if stage.name in pending]
+
+    def _round_verdict(self, round_outputs: Dict[str, str]) -> Tuple[str, bool]:
+        """
+        The reviewer verdict of a round, or the verifier feedback if the
+        review was skipped, and whether the reviewer ran.
+        """
+        if self.verify and self.output_dir and round_outputs.get("verifier", VERIFIED) != VERIFIED:
+            return round_outputs["verifier"], False
+        return round_outputs["reviewer_agent"], True
+
+    def _finish(self, approved: bool, rounds: int, verdict: str, outputs: Dict[str, str]) -> PipelineResult:
+        if self.checkpoints is not None:
+            self.checkpoints.finish_run(self.run_id, "approved" if approved else "needs_review")
+        return PipelineResult(approved=approved, rounds=rounds, verdict=verdict, outputs=outputs,
+                              usage=dict(self.usage), timings=dict(self.timings))
+
+    async def _run(self, notebook_path: str) -> PipelineResult:
+        await self._ensure_session()
+        stored = None
+        if self.checkpoints is not None:
+            self.run_id = self.run_id or run_id_for(notebook_path, self.output_dir)
+            stored = self.checkpoints.start_run(self.run_id, notebook_path, self.output_dir, resume=self.resume)
+            # Staging directories of an earlier, interrupted run of the same notebook.
+            shutil.rmtree(staging_root(self.run_id), ignore_errors=True)
+            if stored.stages:
+                self.on_status(f"Resuming from {len(stored.stages)} checkpointed stages.")
+                await self._restore(stored)
+        outputs = await self._run_stages(0, self.planning_stages(notebook_path), {}, stored)
+        self._planning_outputs = dict(outputs)
+        self._cell_graph = None
+
+        verdict = ""
+        for round_num in range(1, self.max_rounds + 1):
+            self.on_status(f"=== Round {round_num} ===")
+            logger.info(f"Starting Round {round_num}")
+            review = stored.get(round_num, "reviewer_agent") if stored is not None else None
+            check = stored.get(round_num, "verifier") if stored is not None else None
+            with _span(self.tracer, f"round_{round_num}", "round", round=round_num):
+                if review is not None or (check is not None and check.output != VERIFIED):
+                    # The whole round finished before the interruption.
+                    round_outputs = dict(outputs)
+                    round_outputs.update({c.stage: c.output for c in stored.stages if c.round == round_num})
+                    self.on_status("Round restored from checkpoint.")
+                else:
+                    if round_num > 1 and self.history_budget:
+                        with _span(self.tracer, "compaction", "compaction"):
+                            await compact_session(
+                                self.session_service, APP_NAME, self.user_id, self.session_id, self.history_budget
+                            )
+                    round_outputs = await self._run_stages(round_num, self.round_stages(round_num),
+                                                           dict(outputs), stored)
+            outputs.update(round_outputs)
+            verdict, reviewed = self._round_verdict(round_outputs)
+            if not reviewed:
+                # The Refactorer sees the feedback in the shared history, as it would a review.
+                await self._add_to_history("verifier", verdict)
+            self._last_verdict = verdict
+            self.on_status(f"Verdict: {verdict[:50]}...")
+            logger.info(f"Reviewer verdict: {verdict}")
+
+            if "APPROVED" in verdict:
+                return self._finish(True, round_num, verdict, outputs)
+            if round_num == self.max_rounds:
+                logger.warning("Max rounds reached without approval.")
+            else:
+                # Feedback reaches the Refactorer implicitly via the shared session history.
+                self.on_status("Code review feedback received. Sending feedback to Refactorer for next round...")
+        return self._finish(False, self.max_rounds, verdict, outputs)
@@ -0,0 +1,146 @@
+"""
+Parsing of reviewer feedback into file-level work items.
+
+The reviewer answers with a numbered list such as::
+
+    1. In file OUTPUT/src/train.py, function fit has no docstring
+    2. In Dockerfile, pin the base image
+
+``parse_feedback`` maps every item to the generated files it mentions, so the
+next round can regenerate only the affected files with only their current
+contents as context.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+_ITEM_RE = re.compile(r"^\s*(?:\d+[.)]|[-*])\s+", re.MULTILINE)
+_PATH_RE = re.compile(
+    r"(?<![\w/.-])(/?(?:[\w.-]+/)*(?:[\w-][\w.-]*\.(?:py|txt|md|ya?ml|toml|cfg|ini|json|sh)|Dockerfile))(?![\w/-])"
+)
+
+# Files owned by the DevOps agent rather than the Refactorer.
+DEVOPS_FILE_PATTERNS = (
+    re.compile(r"(^|/)Dockerfile$"),
+    re.compile(r"(^|/)docker-compose\.ya?ml$"),
+    re.compile(r"(^|/)\.github/workflows/[^/]+\.ya?ml$"),
+)
+
+
+@dataclass
+class FeedbackPlan:
+    """
+    Reviewer feedback grouped by target file.
+
+    Attributes:
+        work_items (dict): File path -> feedback items that concern it.
+        general (list): Items that do not name any file.
+    """
+    work_items: Dict[str, List[str]] = field(default_factory=dict)
+    general: List[str] = field(default_factory=list)
+
+
+def split_items(feedback: str) -> List[str]:
+    """
+    Splits a numbered or bulleted feedback list into its items.
+
+    Text without list markers is returned as a single item.
+    """
+    starts = [m.start() for m in _ITEM_RE.finditer(feedback)]
+    if not starts:
+        return [feedback.strip()] if feedback.strip() else []
+    bounds = starts + [len(feedback)]
+    return [feedback[a:b].strip() for a, b in zip(bounds, bounds[1:]) if feedback[a:b].strip()]
+
+
+def list_output_files(output_dir: str) -> List[str]:
+    """All files below ``output_dir``, as paths that include ``output_dir``."""
+    files = []
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def is_devops_file(path: str) -> bool:
+    """True for deployment files written by the DevOps agent."""
+    normalized = path.replace(os.sep, "/")
+    return any(pattern.search(normalized) for pattern in DEVOPS_FILE_PATTERNS)
+
+
+def _resolve(mention: str, output_dir: str, known: Sequence[str]) -> List[str]:
+    mention = mention.replace(os.sep, "/")
+    if mention.startswith("./"):
+        mention = mention[2:]
+    prefix = output_dir.replace(os.sep, "/").rstrip("/") + "/"
+    relative = mention[len(prefix):] if mention.startswith(prefix) else mention
+
+    rel_known = {path: os.path.relpath(path, output_dir).replace(os.sep, "/") for path in known}
+    exact = [path for path, rel in rel_known.items() if rel == relative]
+    if exact:
+        return exact
+    suffix = [path for path, rel in rel_known.items() if rel.endswith("/" + relative)]
+    if suffix:
+        return suffix
+    # A file the reviewer asks for that does not exist yet.
+    return [os.path.join(output_dir, *relative.split("/"))]
+
+
+def parse_feedback(feedback: str, output_dir: str, known_files: Sequence[str]) -> FeedbackPlan:
+    """
+    Groups reviewer feedback items by the files they mention.
+
+    Args:
+        feedback (str): The reviewer response.
+        output_dir (str): Directory of the generated project.
+        known_files (Sequence[str]): Existing generated files (including ``output_dir``).
+
+    Returns:
+        FeedbackPlan: Items per file, plus items that name no file.
+    """
+    plan = FeedbackPlan()
+    for item in split_items(feedback):
+        targets: List[str] = []
+        for mention in _PATH_RE.findall(item):
+            for path in _resolve(mention, output_dir, known_files):
+                if path not in targets:
+                    targets.append(path)
+        if not targets:
+            plan.general.append(item)
+        for path in targets:
+            plan.work_items.setdefault(path, []).append(item)
+    return plan
+
+
+def build_regeneration_prompt(work_items: Dict[str, List[str]], general: Sequence[str] = ()) -> str:
+    """
+    Builds a prompt that asks to regenerate only the given files.
+
+    Each file is listed with its feedback items and its current content, which
+    is the only code context the agent receives.
+    """
+    sections = [
+        "Apply the reviewer feedback below. Regenerate ONLY the files listed here and do not "
+        "rewrite any other file. Write each listed file in full with `write_file(path, content)`."
+    ]
+    for path, items in work_items.items():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                current = f.read()
+        except OSError:
+            current = None
+        section = [f"## File: {path}", "Feedback:"]
+        section += [f"- {item}" for item in items]
+        if current is None:
+            section.append("This file does not exist yet; create it.")
+        else:
+            section += ["Current content:", "```", current, "```"]
+        sections.append("\n".join(section))
+    if general:
+        sections.append(
+            "General feedback (apply it where it concerns the files above):\n"
+            + "\n".join(f"- {item}" for item in general)
+        )
+    return "\n\n".join(sections)
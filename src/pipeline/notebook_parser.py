@@ -0,0 +1,113 @@
+"""
+Local, deterministic notebook parser.
+
+Produces the same ``{"code": ..., "documentation": ...}`` JSON as the parser
+agent, straight from the notebook's cells and without a model call. Cells are
+read with the streaming reader, which skips outputs; notebooks it does not
+understand (e.g. nbformat 3) are read with ``nbformat``. Every code and
+markdown cell is introduced by a marker with its index in the notebook
+(``# Cell 3`` / ``<!-- Cell 2 -->``), so later stages can still refer back to
+the original cells.
+
+IPython magics (``%matplotlib inline``) and shell escapes (``!pip install``)
+are commented out so the extracted code stays valid Python.
+
+Notebooks saved as plain-text scripts, with cells separated by ``# Cell N``
+or ``# %%`` lines (``# %% [markdown]`` for markdown cells), are read as well.
+"""
+
+import json
+import re
+from typing import Dict, List, Tuple
+
+import nbformat
+
+from src.pipeline.notebook_stream import NotebookFormatError, NotJSONError, iter_cells
+
+_MAGIC_RE = re.compile(r"^(\s*)([%!].*)$")
+_SCRIPT_CELL_RE = re.compile(r"^# (?:Cell \d+|%%(.*))\s*$", re.MULTILINE)
+
+
+def _comment_magics(source: str) -> str:
+    if source.lstrip().startswith("%%"):
+        # Cell magic: the whole cell is not Python.
+        return "\n".join(f"# {line}" if line else line for line in source.splitlines())
+    return "\n".join(_MAGIC_RE.sub(r"\1# \2", line) for line in source.splitlines())
+
+
+def _script_cells(text: str) -> List[Tuple[str, str]]:
+    """(cell_type, source) of a notebook saved as a cell-marked script."""
+    markers = list(_SCRIPT_CELL_RE.finditer(text))
+    if not markers:
+        raise ValueError("Notebook is neither JSON nor a script with cell markers")
+    cells = []
+    if text[:markers[0].start()].strip():
+        cells.append(("code", text[:markers[0].start()]))
+    for marker, following in zip(markers, markers[1:] + [None]):
+        source = text[marker.end():following.start() if following else len(text)]
+        if "[markdown]" in (marker.group(1) or ""):
+            lines = source.strip("\n").splitlines()
+            cells.append(("markdown", "\n".join(re.sub(r"^# ?", "", line) for line in lines)))
+        else:
+            cells.append(("code", source))
+    return cells
+
+
+def read_cells(path: str) -> List[Tuple[str, str]]:
+    """
+    (cell_type, source) of every cell of a notebook file, in order.
+
+    Raises:
+        ValueError: If the file cannot be read.
+    """
+    try:
+        return [(cell.cell_type, cell.source) for cell in iter_cells(path)]
+    except (OSError, UnicodeDecodeError) as e:
+        raise ValueError(f"Cannot parse notebook {path}: {e}") from e
+    except NotJSONError:
+        reader = _script_cells
+    except NotebookFormatError:
+        reader = _nbformat_cells
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return reader(f.read())
+    except (OSError, ValueError, nbformat.ValidationError) as e:
+        raise ValueError(f"Cannot parse notebook {path}: {e}") from e
+
+
+def _nbformat_cells(text: str) -> List[Tuple[str, str]]:
+    notebook = nbformat.reads(text, as_version=4)
+    return [(cell.cell_type, cell.source) for cell in notebook.cells]
+
+
+def parse_notebook(path: str) -> Dict[str, str]:
+    """
+    Splits a notebook into code and documentation.
+
+    Args:
+        path (str): The .ipynb file.
+
+    Returns:
+        dict: ``code`` (code cells in order, each after a ``# Cell N``
+        line) and ``documentation`` (markdown cells, each after a
+        ``<!-- Cell N -->`` line). N is the cell's 0-based index in the
+        notebook. Empty cells are left out.
+
+    Raises:
+        ValueError: If the file cannot be read.
+    """
+    code, documentation = [], []
+    for index, (cell_type, source) in enumerate(read_cells(path)):
+        source = source.strip("\n")
+        if not source.strip():
+            continue
+        if cell_type == "code":
+            code.append(f"# Cell {index}\n{_comment_magics(source)}\n")
+        elif cell_type == "markdown":
+            documentation.append(f"<!-- Cell {index} -->\n{source}\n")
+    return {"code": "\n".join(code), "documentation": "\n".join(documentation)}
+
+
+def parse_notebook_json(path: str) -> str:
+    """``parse_notebook`` as the JSON string the parser agent would return."""
+    return json.dumps(parse_notebook(path), ensure_ascii=False)
@@ -0,0 +1,274 @@
+"""
+Streaming reader for .ipynb files.
+
+``nbformat.read`` loads and validates the whole JSON document, including every
+cell output, embedded image and widget state, before the cells can be used.
+Notebooks with many plots are mostly base64 output data, so that costs memory
+and time in proportion to the file, not to the code.
+
+``iter_cells`` instead reads the file in fixed-size blocks and walks the JSON
+incrementally. Cell ``outputs`` and ``attachments`` (and the notebook's
+metadata) are skipped without being decoded: strings are skipped with
+``str.find`` and containers by counting brackets, discarding consumed blocks
+as it goes. Only the small cell fields are decoded, and cells are yielded one
+at a time, so peak memory tracks the largest cell source rather than the file.
+With ``text_outputs`` the textual parts of the outputs (printed text,
+``text/*`` results, error messages) are decoded too; binary data such as
+base64 images is still skipped.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import IO, Any, Iterator, List
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+_DECODER = json.JSONDecoder()
+_STRUCTURE_RE = re.compile(r'["\[\]{}]')
+
+
+class NotebookFormatError(ValueError):
+    """The file is not a JSON notebook the streaming reader understands."""
+
+
+class NotJSONError(NotebookFormatError):
+    """The file does not start with a JSON object at all."""
+
+
+@dataclass
+class NotebookCell:
+    """
+    One notebook cell as read by ``iter_cells``.
+
+    Attributes:
+        index (int): Position of the cell in the notebook, from 0.
+        cell_type (str): "code", "markdown" or "raw".
+        source (str): The cell's source text.
+        outputs (list): Text of the cell's outputs (printed text, ``text/*``
+            results, error messages), if requested.
+    """
+    index: int
+    cell_type: str
+    source: str
+    outputs: List[str] = field(default_factory=list)
+
+
+class _JsonStream:
+    """Incremental JSON tokenizer over a text file, reading one block at a time."""
+
+    def __init__(self, f: IO[str], block_size: int = DEFAULT_BLOCK_SIZE):
+        self.f = f
+        self.block_size = block_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _more(self) -> bool:
+        """Appends the next block, dropping the consumed part of the buffer."""
+        if self.eof:
+            return False
+        block = self.f.read(self.block_size)
+        if not block:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + block
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character ("" at the end of the file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise NotebookFormatError(f"Expected '{char}' but found '{found or 'end of file'}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decodes the next value; meant for small values such as cell fields."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # The value may continue in the next block.
+                if not self._more():
+                    raise NotebookFormatError(f"Invalid JSON: {e}") from e
+                continue
+            if end == len(self.buf) and not self.eof and self.buf[self.pos] not in '"[{':
+                # A number at the end of the buffer may have more digits in the next block.
+                if self._more():
+                    continue
+            self.pos = end
+            return value
+
+    def _skip_string(self):
+        """Skips a string whose opening quote has been consumed."""
+        while True:
+            end = self.buf.find('"', self.pos)
+            if end == -1:
+                # Keep trailing backslashes: they decide whether the next quote is escaped.
+                tail = len(self.buf) - len(self.buf.rstrip("\\"))
+                self.pos = len(self.buf) - tail
+                if not self._more():
+                    raise NotebookFormatError("Unterminated string")
+                continue
+            backslashes = 0
+            while end - backslashes - 1 >= self.pos and self.buf[end - backslashes - 1] == "\\":
+                backslashes += 1
+            self.pos = end + 1
+            if backslashes % 2 == 0:
+                return
+
+    def skip(self):
+        """Skips the next value without decoding it."""
+        char = self.peek()
+        if char == '"':
+            self.pos += 1
+            self._skip_string()
+            return
+        if char not in "[{":
+            self.value()
+            return
+        depth = 0
+        while True:
+            match = _STRUCTURE_RE.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self._more():
+                    raise NotebookFormatError("Unexpected end of file")
+                continue
+            self.pos = match.end()
+            token = match.group()
+            if token == '"':
+                self._skip_string()
+            elif token in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def members(self) -> Iterator[str]:
+        """Iterates the keys of the object that starts next; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise NotebookFormatError("Object key is not a string")
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise NotebookFormatError(f"Expected ',' or '}}' but found '{separator or 'end of file'}'")
+
+    def items(self) -> Iterator[None]:
+        """Iterates the elements of the array that starts next; the caller consumes each element."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield None
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise NotebookFormatError(f"Expected ',' or ']' but found '{separator or 'end of file'}'")
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, list):
+        return "".join(str(part) for part in value)
+    return value if isinstance(value, str) else ""
+
+
+def _read_output(stream: _JsonStream) -> str:
+    """The text of one output; binary data is skipped."""
+    texts = []
+    for key in stream.members():
+        if key == "text":
+            # stream output
+            texts.append(_text(stream.value()))
+        elif key in ("ename", "evalue"):
+            texts.append(_text(stream.value()))
+        elif key == "data":
+            # One textual representation: text/plain, else e.g. text/html or text/markdown.
+            representations = {}
+            for mime in stream.members():
+                if mime.startswith("text/"):
+                    representations[mime] = _text(stream.value())
+                else:
+                    stream.skip()
+            if representations:
+                texts.append(representations.get("text/plain", next(iter(representations.values()))))
+        else:
+            # output_type, metadata, execution_count, traceback (ANSI-coloured repeat of evalue)
+            stream.skip()
+    return "\n".join(text for text in texts if text)
+
+
+def _read_cell(stream: _JsonStream, index: int, text_outputs: bool = False) -> NotebookCell:
+    cell_type, source, outputs = "", "", []
+    for key in stream.members():
+        if key == "cell_type":
+            cell_type = stream.value()
+        elif key == "source":
+            source = stream.value()
+            if isinstance(source, list):
+                source = "".join(source)
+        elif key == "outputs" and text_outputs and stream.peek() == "[":
+            for _ in stream.items():
+                text = _read_output(stream) if stream.peek() == "{" else stream.skip()
+                if text:
+                    outputs.append(text)
+        else:
+            # outputs, attachments, metadata, execution_count, id
+            stream.skip()
+    if not isinstance(cell_type, str) or not isinstance(source, str):
+        raise NotebookFormatError(f"Cell {index} has an invalid cell_type or source")
+    return NotebookCell(index=index, cell_type=cell_type, source=source, outputs=outputs)
+
+
+def iter_cells(path: str, block_size: int = DEFAULT_BLOCK_SIZE,
+               text_outputs: bool = False) -> Iterator[NotebookCell]:
+    """
+    Yields the cells of an nbformat 4 notebook one at a time, without loading
+    their outputs, or with ``text_outputs`` only their text.
+
+    Raises:
+        NotJSONError: If the file is not JSON.
+        NotebookFormatError: If the file is not a JSON notebook with a
+            ``cells`` list (e.g. a v3 notebook with worksheets).
+        OSError, UnicodeDecodeError: If the file cannot be read.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f, block_size)
+        if stream.peek() != "{":
+            raise NotJSONError("Notebook does not appear to be JSON")
+        found = False
+        for key in stream.members():
+            if key != "cells":
+                stream.skip()
+                continue
+            found = True
+            for index, _ in enumerate(stream.items()):
+                yield _read_cell(stream, index, text_outputs)
+        if not found:
+            raise NotebookFormatError("Notebook has no 'cells' list")
+
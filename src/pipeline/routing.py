@@ -0,0 +1,175 @@
+"""
+Per-agent model routing based on notebook size.
+
+``measure_notebook`` counts the cells, code tokens and imports of a notebook
+and ``route_models`` picks a model for every agent from an ordered list of
+tiers: the first (fastest) tier whose limits the notebook fits, scaled by how
+much of the notebook the agent actually sees. Small notebooks therefore take
+the fastest model everywhere, and only very large ones are sent to the
+bigger-context tier.
+
+The tiers, the per-agent load factors and fixed per-agent models can be set
+in a JSON routing config::
+
+    {
+        "tiers": [
+            {"name": "fast", "model": "gemini-2.0-flash",
+             "max_cells": 200, "max_code_tokens": 100000, "max_imports": 80},
+            {"name": "large", "model": "gemini-1.5-pro"}
+        ],
+        "agent_load": {"devops": 0.25},
+        "pinned": {"reviewer": "gemini-2.0-flash"}
+    }
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from src.llm import SUPPORTED_MODELS
+from src.pipeline.notebook_parser import read_cells
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("parser", "architect", "refactorer", "devops", "reviewer")
+
+_IMPORT_RE = re.compile(r"^\s*(?:import\s+\w|from\s+[\w.]+\s+import\s)", re.MULTILINE)
+
+
+@dataclass
+class NotebookStats:
+    """Size and complexity measures of a notebook."""
+    cells: int = 0
+    code_cells: int = 0
+    code_tokens: int = 0
+    imports: int = 0
+
+    def scaled(self, factor: float) -> "NotebookStats":
+        return NotebookStats(
+            cells=int(self.cells * factor),
+            code_cells=int(self.code_cells * factor),
+            code_tokens=int(self.code_tokens * factor),
+            imports=int(self.imports * factor),
+        )
+
+
+@dataclass
+class ModelTier:
+    """
+    A model and the largest notebook it is used for. A limit of None means
+    no limit; the last tier should have none.
+    """
+    name: str
+    model: str
+    max_cells: Optional[int] = None
+    max_code_tokens: Optional[int] = None
+    max_imports: Optional[int] = None
+
+    def fits(self, stats: NotebookStats) -> bool:
+        return all(
+            limit is None or value <= limit
+            for value, limit in (
+                (stats.cells, self.max_cells),
+                (stats.code_tokens, self.max_code_tokens),
+                (stats.imports, self.max_imports),
+            )
+        )
+
+
+@dataclass
+class RoutingConfig:
+    """
+    Attributes:
+        tiers (list): ModelTiers, fastest first.
+        agent_load (dict): Role -> share of the notebook the agent works on.
+            The notebook stats are multiplied by it before picking a tier.
+        pinned (dict): Role -> model name used regardless of size.
+    """
+    tiers: List[ModelTier] = field(default_factory=lambda: [
+        ModelTier("fast", "gemini-2.0-flash", max_cells=200, max_code_tokens=100_000, max_imports=80),
+        ModelTier("large", "gemini-1.5-pro"),
+    ])
+    agent_load: Dict[str, float] = field(default_factory=lambda: {
+        "parser": 1.0, "architect": 0.5, "refactorer": 1.0, "devops": 0.25, "reviewer": 1.0,
+    })
+    pinned: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.tiers:
+            raise ValueError("Routing config needs at least one tier")
+        models = [tier.model for tier in self.tiers] + list(self.pinned.values())
+        unknown = [m for m in models if m not in SUPPORTED_MODELS]
+        if unknown:
+            raise ValueError(
+                f"Unsupported model(s) in routing config: {', '.join(unknown)}. "
+                f"Supported models: {', '.join(SUPPORTED_MODELS)}"
+            )
+        unknown_roles = (set(self.agent_load) | set(self.pinned)) - set(ROLES)
+        if unknown_roles:
+            raise ValueError(f"Unknown agent role(s) in routing config: {', '.join(sorted(unknown_roles))}")
+
+
+@dataclass
+class RoutingDecision:
+    """The model chosen for one agent, and why."""
+    role: str
+    model: str
+    tier: str
+    reason: str
+
+
+def load_routing_config(path: str) -> RoutingConfig:
+    """Reads a JSON routing config; omitted keys keep their defaults."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data: Dict[str, Any] = json.load(f)
+    config = RoutingConfig()
+    tiers = [ModelTier(**tier) for tier in data["tiers"]] if "tiers" in data else config.tiers
+    agent_load = {**config.agent_load, **data.get("agent_load", {})}
+    return RoutingConfig(tiers=tiers, agent_load=agent_load, pinned=data.get("pinned", {}))
+
+
+def measure_notebook(path: str) -> NotebookStats:
+    """
+    Counts the cells, code tokens (estimated at 4 characters per token) and
+    import statements of a notebook.
+    """
+    stats = NotebookStats()
+    for cell_type, source in read_cells(path):
+        stats.cells += 1
+        if cell_type != "code":
+            continue
+        stats.code_cells += 1
+        stats.code_tokens += len(source) // 4
+        stats.imports += len(_IMPORT_RE.findall(source))
+    return stats
+
+
+def route_models(stats: NotebookStats, config: Optional[RoutingConfig] = None) -> Dict[str, RoutingDecision]:
+    """
+    Picks a model for every agent role.
+
+    Returns:
+        dict: Role -> RoutingDecision.
+    """
+    config = config or RoutingConfig()
+    decisions = {}
+    for role in ROLES:
+        if role in config.pinned:
+            decisions[role] = RoutingDecision(role, config.pinned[role], "pinned", "pinned in routing config")
+            continue
+        load = config.agent_load.get(role, 1.0)
+        effective = stats.scaled(load)
+        tier = next((t for t in config.tiers if t.fits(effective)), config.tiers[-1])
+        reason = (f"{stats.cells} cells, {stats.code_tokens} code tokens, {stats.imports} imports"
+                  f" x load {load:g}")
+        decisions[role] = RoutingDecision(role, tier.model, tier.name, reason)
+    for decision in decisions.values():
+        logger.info(f"Routing {decision.role} -> {decision.model} ({decision.tier}: {decision.reason})")
+    return decisions
+
+
+def format_routing(decisions: Dict[str, RoutingDecision]) -> str:
+    """One line per agent: role, model and tier."""
+    return "\n".join(f"  {d.role:10} {d.model:18} [{d.tier}]" for d in decisions.values())
@@ -0,0 +1,164 @@
+"""
+Compact, text-only view of a notebook for the PII pre-check.
+
+The raw ``.ipynb`` file is mostly JSON structure, metadata and base64 output
+data. Scanning it with the PII patterns costs time in proportion to the
+images, and their long digit runs match the phone and credit card patterns,
+so plot-heavy notebooks are blocked for data nobody can read.
+
+``build_scan_view`` streams the notebook once and keeps only what a person
+could have typed or printed: cell sources and the text of their outputs
+(printed text, ``text/*`` results, error messages). The pieces are joined
+into one string, and a segment map records which cell, and which output of
+it, every offset belongs to, so a match can be reported as "cell 3, output 1"
+instead of a byte offset in the JSON.
+
+Files the streaming reader does not understand (cell-marked scripts, v3
+notebooks, damaged JSON) are scanned as raw text, as before, streamed from
+disk in chunks. Large views and files are scanned in parallel chunks (see
+``src.utils.security.scan_pii_blocks``), and verdicts are cached by content
+hash. A clean notebook also caches the verdict for its ``read_notebook``
+text, so the guardrail on that tool's output costs a lookup.
+"""
+
+import bisect
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from src.pipeline.notebook_stream import NotebookFormatError, iter_cells
+from src.tools.notebook_tools import format_code_cells
+from src.utils.security import PiiMatch, content_key, first_matches, get_pii_cache, scan_pii_file, scan_pii_text
+
+# Joins the segments, so that no pattern matches across two cells or outputs.
+SEPARATOR = "\n\n"
+
+
+@dataclass
+class Segment:
+    """
+    One cell source or cell output inside a ``ScanView``.
+
+    Attributes:
+        start (int): Offset of the segment in the view's text.
+        end (int): Offset just past the segment.
+        cell (int): Position of the cell in the notebook, from 0 (as in the
+            parser's ``# Cell N`` markers); None for a raw-text view.
+        output (int): Position of the output in the cell, from 0; None for
+            the cell source.
+    """
+    start: int
+    end: int
+    cell: Optional[int] = None
+    output: Optional[int] = None
+
+    def describe(self) -> str:
+        if self.cell is None:
+            return "notebook file"
+        if self.output is None:
+            return f"cell {self.cell} source"
+        return f"cell {self.cell} output {self.output}"
+
+
+@dataclass
+class ScanView:
+    """
+    Cell sources and text outputs of a notebook, joined into one string.
+
+    Attributes:
+        text (str): The text to scan.
+        segments (list): ``Segment`` entries in offset order.
+        code_sources (list): Sources of the code cells, empty ones included.
+    """
+    text: str
+    segments: List[Segment] = field(default_factory=list)
+    code_sources: List[str] = field(default_factory=list)
+
+    def locate(self, offset: int) -> Optional[Segment]:
+        """The segment containing ``offset``, or None for a separator."""
+        index = bisect.bisect_right([segment.start for segment in self.segments], offset) - 1
+        if index >= 0 and offset < self.segments[index].end:
+            return self.segments[index]
+        return None
+
+    def check_pii(self, first_only: bool = False, workers: Optional[int] = None) -> List[str]:
+        """
+        PII warnings for the view, each with where its first match is. Large
+        views are scanned in parallel chunks; with ``first_only`` the scan
+        stops at the first match, which is enough to block the notebook.
+        """
+        warnings = []
+        for match in first_matches(scan_pii_text(self.text, first_only=first_only, workers=workers)):
+            segment = self.locate(match.start)
+            warnings.append(_warning(match, segment.describe() if segment else None))
+        return warnings
+
+
+def _warning(match: PiiMatch, where: Optional[str]) -> str:
+    return f"{match.warning} ({where})" if where else match.warning
+
+
+def _raw_view(path: str) -> ScanView:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    return ScanView(text=text, segments=[Segment(start=0, end=len(text))])
+
+
+def build_scan_view(path: str) -> ScanView:
+    """
+    Builds the scan view of the notebook at ``path``.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    try:
+        return _notebook_view(path)
+    except (NotebookFormatError, UnicodeDecodeError):
+        return _raw_view(path)
+
+
+def _notebook_view(path: str) -> ScanView:
+    parts: List[str] = []
+    segments: List[Segment] = []
+    code_sources: List[str] = []
+    offset = 0
+    for cell in iter_cells(path, text_outputs=True):
+        if cell.cell_type == "code":
+            code_sources.append(cell.source)
+        pieces = [(None, cell.source)] + list(enumerate(cell.outputs))
+        for output, text in pieces:
+            if not text:
+                continue
+            if parts:
+                parts.append(SEPARATOR)
+                offset += len(SEPARATOR)
+            parts.append(text)
+            segments.append(Segment(start=offset, end=offset + len(text), cell=cell.index, output=output))
+            offset += len(text)
+    return ScanView(text="".join(parts), segments=segments, code_sources=code_sources)
+
+
+def check_notebook_pii(path: str, first_only: bool = False, workers: Optional[int] = None) -> List[str]:
+    """
+    PII warnings for the cell sources and text outputs of a notebook. Other
+    files are streamed through the scanner in chunks instead of being read
+    into memory.
+
+    Args:
+        path (str): The notebook.
+        first_only (bool): Stop at the first match (at most one warning).
+        workers (int): Processes for scanning large inputs (default: CPU count).
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    try:
+        view = _notebook_view(path)
+    except (NotebookFormatError, UnicodeDecodeError):
+        matches = scan_pii_file(path, first_only=first_only, workers=workers)
+        return [_warning(match, "notebook file") for match in first_matches(matches)]
+    warnings = view.check_pii(first_only=first_only, workers=workers)
+    if not warnings:
+        # What read_notebook returns is part of the scanned text, so it is clean too:
+        # the guardrail on its output gets a cache hit.
+        get_pii_cache().store(content_key(format_code_cells(view.code_sources)), [])
+    return warnings
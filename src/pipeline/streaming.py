@@ -0,0 +1,165 @@
+"""
+Live progress events for the CLI and the Streamlit UI.
+
+With streaming enabled, the engine runs every agent with server-sent events
+(SSE), so the model's text arrives as partial chunks while it is generated.
+Each ADK event is turned into ``StreamEvent`` objects (text chunks, tool calls
+and tool results) that are handed to an ``on_event`` callback as they arrive.
+
+Partial text events carry only the new chunk. The non-partial text event that
+ends a model turn carries the full text of the turn, so a consumer that has
+shown the chunks can replace them by it, and a consumer of a non-streaming
+model still sees every turn once.
+"""
+
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, TextIO
+
+# Tool arguments longer than this are shortened in tool-call events.
+MAX_ARG_CHARS = 60
+
+
+@dataclass
+class StreamEvent:
+    """
+    One piece of live agent output.
+
+    Attributes:
+        stage (str): Name of the stage that produced it.
+        kind (str): "text", "tool_call" or "tool_result".
+        text (str): Text chunk (partial), full turn text, or a one-line
+            description of the tool call or result.
+        partial (bool): True for an incremental text chunk.
+    """
+    stage: str
+    kind: str
+    text: str
+    partial: bool = False
+
+
+def _short(value: Any) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    text = text.replace("\n", " ")
+    return text if len(text) <= MAX_ARG_CHARS else text[:MAX_ARG_CHARS] + f"... ({len(text)} chars)"
+
+
+def to_stream_events(stage: str, event) -> List[StreamEvent]:
+    """
+    Converts one ADK event into stream events.
+    """
+    content = getattr(event, "content", None)
+    if content is None or not content.parts:
+        return []
+    partial = bool(getattr(event, "partial", False))
+    events = []
+    text = "".join(part.text for part in content.parts if part.text and not part.thought)
+    if text:
+        events.append(StreamEvent(stage, "text", text, partial=partial))
+    if partial:
+        # Partial function calls are not executed; their final event follows.
+        return events
+    for part in content.parts:
+        if part.function_call:
+            args = ", ".join(f"{k}={_short(v)}" for k, v in (part.function_call.args or {}).items())
+            events.append(StreamEvent(stage, "tool_call", f"{part.function_call.name}({args})"))
+        elif part.function_response:
+            events.append(StreamEvent(
+                stage, "tool_result", f"{part.function_response.name} -> {_short(part.function_response.response or {})}"
+            ))
+    return events
+
+
+class ConsolePrinter:
+    """
+    ``on_event`` callback that writes agent output to a terminal as it arrives.
+
+    Output of concurrently running stages is interleaved; a ``[stage]`` prefix
+    starts a new line whenever the writing stage changes.
+
+    Args:
+        stream (TextIO): Where to write. Defaults to stdout.
+        show_text (bool): Also show the model text, not only tool calls.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, show_text: bool = True):
+        self.stream = stream or sys.stdout
+        self.show_text = show_text
+        self._current: Optional[str] = None
+        self._streamed: Dict[str, bool] = {}
+
+    def _switch(self, stage: str):
+        if self._current != stage:
+            if self._current is not None:
+                self.stream.write("\n")
+            self.stream.write(f"[{stage}] ")
+            self._current = stage
+
+    def __call__(self, event: StreamEvent):
+        if event.kind == "text":
+            if not self.show_text:
+                return
+            if event.partial:
+                self._switch(event.stage)
+                self.stream.write(event.text)
+                self._streamed[event.stage] = True
+            elif not self._streamed.pop(event.stage, False):
+                # Nothing was streamed for this turn (e.g. a cache hit).
+                self._switch(event.stage)
+                self.stream.write(event.text)
+        else:
+            self._switch(event.stage)
+            marker = "->" if event.kind == "tool_call" else "<-"
+            self.stream.write(f"{marker} {event.text}")
+            self._current = None
+            self.stream.write("\n")
+        self.stream.flush()
+
+    def status(self, message: str):
+        """``on_status`` callback that prints a progress line on its own line."""
+        self.close()
+        self.stream.write(message + "\n")
+        self.stream.flush()
+
+    def close(self):
+        """Ends the current line."""
+        if self._current is not None:
+            self.stream.write("\n")
+            self.stream.flush()
+            self._current = None
+
+
+class StageTranscript:
+    """
+    Accumulates the live output of each stage for display, e.g. in one
+    Streamlit placeholder per stage.
+
+    Completed lines are kept in a list and the text of the model turn that is
+    still being generated in a separate list of chunks, so appending a chunk
+    never copies the text received so far.
+    """
+
+    def __init__(self):
+        self._lines: Dict[str, List[str]] = {}
+        self._chunks: Dict[str, List[str]] = {}
+
+    def add(self, event: StreamEvent) -> str:
+        """Records an event and returns the stage that changed."""
+        lines = self._lines.setdefault(event.stage, [])
+        if event.kind == "text" and event.partial:
+            self._chunks.setdefault(event.stage, []).append(event.text)
+        elif event.kind == "text":
+            self._chunks.pop(event.stage, None)
+            lines.append(event.text)
+        else:
+            marker = "🔧" if event.kind == "tool_call" else "↩️"
+            lines.append(f"{marker} `{event.text}`")
+        return event.stage
+
+    def render(self, stage: str) -> str:
+        """Markdown for one stage: completed lines, then the text in progress."""
+        parts = list(self._lines.get(stage, []))
+        if self._chunks.get(stage):
+            parts.append("".join(self._chunks[stage]) + " ▌")
+        return "\n\n".join(parts)
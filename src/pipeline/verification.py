@@ -0,0 +1,303 @@
+"""
+Local static checks of a generated project.
+
+Runs between the code-writing agents and the reviewer. Every generated Python
+file is byte-compiled, its imports are resolved against the generated
+project, the standard library, the installed packages and the project's
+declared requirements, and it is linted for errors such as undefined names
+(with pyflakes if it is installed, else with a simpler built-in check of
+names that are never bound). Failures are rendered as reviewer-style
+feedback ("1. In file OUTPUT/src/train.py, line 3: ...") so they can go
+straight back to the Refactorer without a reviewer model call.
+"""
+
+import ast
+import builtins
+import importlib.util
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Set
+
+try:
+    from pyflakes import checker as pyflakes_checker
+    PYFLAKES_AVAILABLE = True
+except ImportError:
+    PYFLAKES_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Output of a verification that found no problems.
+VERIFIED = "VERIFIED"
+
+# pyflakes messages that indicate code that fails at run time. Style warnings
+# such as unused imports are left to the reviewer.
+LINT_ERRORS = (
+    "UndefinedName", "UndefinedLocal", "UndefinedExport", "DuplicateArgument",
+    "ReturnOutsideFunction", "YieldOutsideFunction", "ContinueOutsideLoop",
+    "BreakOutsideLoop", "DefaultExceptNotLast", "TwoStarredExpressions",
+)
+
+# Distribution names whose import name differs.
+DISTRIBUTION_MODULES = {
+    "scikit-learn": "sklearn",
+    "pyyaml": "yaml",
+    "pillow": "PIL",
+    "opencv-python": "cv2",
+    "opencv-python-headless": "cv2",
+    "beautifulsoup4": "bs4",
+    "python-dotenv": "dotenv",
+    "protobuf": "google",
+    "google-adk": "google",
+    "google-genai": "google",
+}
+
+_REQUIREMENT_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+# Generated files are never checked below these directories.
+_SKIP_DIRS = {"__pycache__", ".git", ".venv", "venv", ".ipynb_checkpoints"}
+
+# Names every module has without binding them.
+_MODULE_NAMES = set(dir(builtins)) | {
+    "__file__", "__name__", "__doc__", "__builtins__", "__spec__", "__loader__", "__package__", "__path__",
+}
+
+
+@dataclass
+class VerificationIssue:
+    """A problem found in one file."""
+    path: str
+    line: int
+    kind: str  # "syntax", "import" or "lint"
+    message: str
+
+
+@dataclass
+class VerificationReport:
+    """Result of checking a generated project."""
+    files_checked: int = 0
+    issues: List[VerificationIssue] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def to_feedback(self) -> str:
+        """
+        The issues as a numbered feedback list, or ``VERIFIED`` if there are none.
+        """
+        if self.ok:
+            return VERIFIED
+        lines = ["Static checks failed. Fix these issues:"]
+        for n, issue in enumerate(self.issues, 1):
+            lines.append(f"{n}. In file {issue.path}, line {issue.line}: {issue.message}")
+        return "\n".join(lines)
+
+
+def python_files(output_dir: str) -> List[str]:
+    """Generated ``.py`` files below ``output_dir``, sorted."""
+    files = []
+    for root, dirs, names in os.walk(output_dir):
+        dirs[:] = [d for d in dirs if d not in _SKIP_DIRS]
+        files.extend(os.path.join(root, name) for name in names if name.endswith(".py"))
+    return sorted(files)
+
+
+def declared_modules(output_dir: str) -> Set[str]:
+    """
+    Top-level import names of the dependencies declared in the project's
+    ``requirements.txt``.
+    """
+    modules: Set[str] = set()
+    path = os.path.join(output_dir, "requirements.txt")
+    if not os.path.exists(path):
+        return modules
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            match = _REQUIREMENT_RE.match(line)
+            if not match or line.lstrip().startswith(("#", "-")):
+                continue
+            name = match.group(1).lower()
+            modules.add(DISTRIBUTION_MODULES.get(name, name.replace("-", "_")))
+    return modules
+
+
+def _is_guarded(node: ast.AST, parents: dict) -> bool:
+    """True for imports inside ``try`` blocks that handle ImportError."""
+    parent = parents.get(node)
+    while parent is not None:
+        if isinstance(parent, ast.Try):
+            for handler in parent.handlers:
+                names = [handler.type] if not isinstance(handler.type, ast.Tuple) else handler.type.elts
+                if handler.type is None or any(
+                    isinstance(n, ast.Name) and n.id in ("ImportError", "ModuleNotFoundError", "Exception")
+                    for n in names
+                ):
+                    return True
+        parent = parents.get(parent)
+    return False
+
+
+class ImportResolver:
+    """
+    Decides whether a module can be imported by the generated project.
+
+    Local modules are looked up below ``output_dir``, ``output_dir/src`` and
+    the importing file's own directory.
+    """
+
+    def __init__(self, output_dir: str, extra_modules: Iterable[str] = ()):
+        self.output_dir = output_dir
+        self.extra_modules = set(extra_modules) | declared_modules(output_dir)
+        self._installed: dict = {}
+
+    def _local(self, module: str, roots: Iterable[str]) -> bool:
+        parts = module.split(".")
+        for root in roots:
+            base = os.path.join(root, *parts)
+            if os.path.isfile(base + ".py") or os.path.isdir(base):
+                return True
+        return False
+
+    def _installed_top_level(self, name: str) -> bool:
+        if name not in self._installed:
+            if name in sys.builtin_module_names or name in getattr(sys, "stdlib_module_names", ()):
+                self._installed[name] = True
+            else:
+                try:
+                    self._installed[name] = importlib.util.find_spec(name) is not None
+                except (ImportError, ValueError):
+                    self._installed[name] = False
+        return self._installed[name]
+
+    def resolves(self, module: str, importer: str) -> bool:
+        roots = [self.output_dir, os.path.join(self.output_dir, "src"), os.path.dirname(importer)]
+        if self._local(module, roots):
+            return True
+        top = module.split(".")[0]
+        if self._local(top, roots):
+            # A missing submodule of a generated package is not looked up elsewhere.
+            return False
+        return top in self.extra_modules or self._installed_top_level(top)
+
+    def resolves_relative(self, module: Optional[str], level: int, importer: str) -> bool:
+        base = os.path.dirname(importer)
+        for _ in range(level - 1):
+            base = os.path.dirname(base)
+        if not module:
+            return os.path.isdir(base)
+        return self._local(module, [base])
+
+
+def _bound_names(tree: ast.AST) -> Set[str]:
+    """Every name the module binds anywhere, in any scope."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update(alias.asname or alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(node, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+    return names
+
+
+def undefined_names(tree: ast.AST, path: str) -> List[VerificationIssue]:
+    """
+    Lint fallback without pyflakes: names that are read but bound nowhere in
+    the module. Scopes are not told apart, so it only finds names that are
+    missing entirely; modules with a star import are not checked.
+    """
+    if any(isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names)
+           for node in ast.walk(tree)):
+        return []
+    known = _bound_names(tree) | _MODULE_NAMES
+    issues, reported = [], set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in known:
+            if node.id not in reported:
+                reported.add(node.id)
+                issues.append(VerificationIssue(path, node.lineno, "lint", f"undefined name '{node.id}'"))
+    return sorted(issues, key=lambda issue: issue.line)
+
+
+def check_file(path: str, resolver: ImportResolver) -> List[VerificationIssue]:
+    """
+    Byte-compiles one file, resolves its imports and lints it.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return [VerificationIssue(path, 1, "syntax", f"cannot read file: {e}")]
+    try:
+        tree = ast.parse(source, filename=path)
+        compile(tree, path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return [VerificationIssue(path, e.lineno or 1, "syntax", f"SyntaxError: {e.msg}")]
+
+    issues = []
+    parents = {child: node for node in ast.walk(tree) for child in ast.iter_child_nodes(node)}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [(alias.name, 0) for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules = [(node.module, node.level)]
+        else:
+            continue
+        if _is_guarded(node, parents):
+            continue
+        for module, level in modules:
+            ok = (resolver.resolves_relative(module, level, path) if level
+                  else resolver.resolves(module, path))
+            if not ok:
+                name = "." * level + (module or "")
+                issues.append(VerificationIssue(
+                    path, node.lineno, "import",
+                    f"import '{name}' cannot be resolved (not part of the generated project, "
+                    f"not installed and not a declared dependency)",
+                ))
+
+    if PYFLAKES_AVAILABLE:
+        for message in pyflakes_checker.Checker(tree, filename=path).messages:
+            if type(message).__name__ in LINT_ERRORS:
+                issues.append(VerificationIssue(
+                    path, message.lineno, "lint", message.message % message.message_args
+                ))
+    else:
+        issues.extend(undefined_names(tree, path))
+    return issues
+
+
+def verify_project(output_dir: str, extra_modules: Iterable[str] = ()) -> VerificationReport:
+    """
+    Runs all static checks on the Python files of a generated project.
+
+    Args:
+        output_dir (str): Directory of the generated project.
+        extra_modules (Iterable[str]): Additional top-level modules that count as available.
+
+    Returns:
+        VerificationReport: Files checked and issues found.
+    """
+    report = VerificationReport()
+    if not os.path.isdir(output_dir):
+        return report
+    resolver = ImportResolver(output_dir, extra_modules)
+    for path in python_files(output_dir):
+        report.files_checked += 1
+        report.issues.extend(check_file(path, resolver))
+    if not PYFLAKES_AVAILABLE and report.files_checked:
+        logger.warning("pyflakes is not installed; linting only checks for undefined names")
+    logger.info(f"Verified {report.files_checked} files in {output_dir}: {len(report.issues)} issues")
+    return report
@@ -0,0 +1,168 @@
+"""
+Deterministic offline stand-in for the Gemini models used by the agents.
+
+``ReplayLlm`` answers model calls from a fixed list of recorded turns, so the
+agents built by ``create_*_agent`` can run without network access, e.g. to
+measure the orchestration overhead of the pipeline on its own. Recordings are
+produced from real runs with ``RecordingPlugin``.
+
+A recording is a JSON object mapping agent names to lists of turns. A turn is
+a dict with an optional ``"text"`` and an optional ``"function_calls"`` list of
+``{"name": ..., "args": {...}}`` entries:
+
+    {
+        "parser_agent": [
+            {"function_calls": [{"name": "read_notebook", "args": {"path": "nb.ipynb"}}]},
+            {"text": "{\"code\": \"...\", \"documentation\": \"...\"}"}
+        ],
+        "reviewer_agent": [{"text": "APPROVED"}]
+    }
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+
+Turn = Dict[str, Any]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (4 characters per token) used for replayed usage metadata."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _request_text(llm_request: LlmRequest) -> str:
+    chunks = []
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                chunks.append(part.text)
+            elif part.function_call:
+                chunks.append(json.dumps(part.function_call.args or {}))
+            elif part.function_response:
+                chunks.append(json.dumps(part.function_response.response or {}, default=str))
+    return "".join(chunks)
+
+
+def turn_to_response(turn: Turn, prompt_tokens: int = 0) -> LlmResponse:
+    """
+    Builds the LlmResponse for a recorded turn.
+    """
+    parts = []
+    if turn.get("text"):
+        parts.append(types.Part(text=turn["text"]))
+    for call in turn.get("function_calls", []):
+        parts.append(types.Part(function_call=types.FunctionCall(name=call["name"], args=call.get("args", {}))))
+    completion_tokens = estimate_tokens(turn.get("text", "")) + sum(
+        estimate_tokens(json.dumps(call.get("args", {}))) for call in turn.get("function_calls", [])
+    )
+    return LlmResponse(
+        content=types.Content(role="model", parts=parts),
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=completion_tokens,
+            total_token_count=prompt_tokens + completion_tokens,
+        ),
+    )
+
+
+def response_to_turn(llm_response: LlmResponse) -> Turn:
+    """
+    Converts a model response into a recorded turn.
+    """
+    turn: Turn = {}
+    parts = llm_response.content.parts if llm_response.content else None
+    text = "".join(part.text for part in parts or [] if part.text and not part.thought)
+    if text:
+        turn["text"] = text
+    calls = [
+        {"name": part.function_call.name, "args": dict(part.function_call.args or {})}
+        for part in parts or [] if part.function_call
+    ]
+    if calls:
+        turn["function_calls"] = calls
+    return turn
+
+
+def load_recording(path: str) -> Dict[str, List[Turn]]:
+    """Loads a recording file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ReplayLlm(BaseLlm):
+    """
+    Model that replays a scripted list of turns.
+
+    Every call returns the next turn; after the last one it starts over, so a
+    short script can serve any number of feedback rounds. Requests are never
+    inspected beyond estimating their token count. In streaming mode the text
+    of a turn is first yielded in partial chunks of ``chunk_chars`` characters,
+    followed by the complete response, like the Gemini SSE stream.
+
+    Attributes:
+        turns (list): The turns to replay, in order.
+        latency (float): Seconds to wait before each response, to simulate
+            network and generation time.
+    """
+    turns: List[Turn]
+    latency: float = 0.0
+    chunk_chars: int = 16
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        if not self.turns:
+            raise ValueError(f"ReplayLlm '{self.model}' has no turns to replay")
+        turn = self.turns[self.calls % len(self.turns)]
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        text = turn.get("text", "")
+        if stream and text:
+            for start in range(0, len(text), self.chunk_chars):
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=text[start:start + self.chunk_chars])]),
+                    partial=True,
+                )
+        yield turn_to_response(turn, prompt_tokens=estimate_tokens(_request_text(llm_request)))
+
+
+def replay_models(recording: Dict[str, List[Turn]], latency: float = 0.0) -> Dict[str, ReplayLlm]:
+    """
+    Creates one ReplayLlm per pipeline role from a recording keyed by agent name.
+    """
+    return {
+        role: ReplayLlm(model=f"replay-{role}", turns=recording.get(f"{role}_agent", []), latency=latency)
+        for role in ("parser", "architect", "refactorer", "devops", "reviewer")
+    }
+
+
+class RecordingPlugin(BasePlugin):
+    """
+    ADK runner plugin that records every final model response per agent.
+
+    Use ``save(path)`` after the run to write a recording that ReplayLlm can load.
+    """
+
+    def __init__(self, name: str = "response_recorder"):
+        super().__init__(name=name)
+        self.recording: Dict[str, List[Turn]] = {}
+        self._lock = threading.Lock()
+
+    async def after_model_callback(self, *, callback_context, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        if llm_response.partial or not llm_response.content:
+            return None
+        with self._lock:
+            self.recording.setdefault(callback_context.agent_name, []).append(response_to_turn(llm_response))
+        return None
+
+    def save(self, path: str):
+        """Writes the recording as JSON."""
+        with self._lock, open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.recording, f, indent=2)
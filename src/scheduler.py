@@ -0,0 +1,320 @@
+"""
+Shared, rate-limit-aware scheduler for model calls.
+
+Every Gemini call made through the model registry is admitted by one
+process-wide ``RateLimitScheduler`` before it is sent:
+
+* Requests-per-minute and tokens-per-minute token buckets, one pair per model,
+  keep concurrent agents, batch conversions and evaluations under the quota
+  instead of finding the limit through errors.
+* Waiting calls to a model are admitted by priority, then in arrival order,
+  so the interactive Streamlit job is not stuck behind a batch of
+  conversions. Each model has its own queue, so a model that is out of quota
+  or paused does not hold up calls to other models.
+* Retryable errors (429 and transient 5xx) are retried with jittered
+  exponential backoff. A 429 also pauses every caller of that model for the
+  backoff delay (or the server's ``retryDelay``), so concurrent calls do not
+  all run into the same limit.
+
+The priority of a call is taken from the caller's context; see
+``priority_scope``. Calls default to ``INTERACTIVE``; batch conversions run
+with ``BATCH``.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Call priorities; lower values are admitted first.
+INTERACTIVE = 0
+BATCH = 10
+
+# HTTP status codes that are retried.
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+
+# How often callers that are not first in line check whether it is their turn.
+_POLL_INTERVAL = 0.05
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("model_call_priority", default=INTERACTIVE)
+
+_RETRY_DELAY_RE = re.compile(r"^(\d+(?:\.\d+)?)s$")
+
+
+def current_priority() -> int:
+    """Priority of model calls made from the current context."""
+    return _priority.get()
+
+
+@contextmanager
+def priority_scope(priority: int):
+    """Runs the model calls made inside the block with ``priority``."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_request_tokens(llm_request) -> int:
+    """
+    Rough token count of a model request (4 characters per token): the system
+    instruction and every text, function call and function response part.
+    """
+    chars = 0
+    config = getattr(llm_request, "config", None)
+    instruction = getattr(config, "system_instruction", None) if config else None
+    if isinstance(instruction, str):
+        chars += len(instruction)
+    for content in getattr(llm_request, "contents", None) or []:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(str(part.function_call.args or {}))
+            elif part.function_response:
+                chars += len(str(part.function_response.response or {}))
+    return max(1, chars // 4)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for rate limit and transient server errors."""
+    return getattr(error, "code", None) in RETRYABLE_STATUS or isinstance(error, ConnectionError)
+
+
+def retry_delay_hint(error: BaseException) -> Optional[float]:
+    """The ``retryDelay`` a 429 response asks for, in seconds, if any."""
+    details = getattr(error, "details", None)
+    if not isinstance(details, dict):
+        return None
+    for detail in details.get("error", {}).get("details", []) or []:
+        if isinstance(detail, dict) and "retryDelay" in detail:
+            match = _RETRY_DELAY_RE.match(str(detail["retryDelay"]))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to ``per_minute`` tokens, refilled continuously.
+
+    The level may go negative when a call turns out to use more than was
+    reserved for it; later calls then wait until it is paid back.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` tokens (at most a full bucket) are available."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def give_back(self, amount: float, now: float):
+        """Returns unused tokens; a negative amount takes more."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimitScheduler:
+    """
+    Admits, retries and paces model calls. Safe to share between threads and
+    event loops.
+
+    Args:
+        rpm (float, optional): Requests per minute per model. None means no limit.
+        tpm (float, optional): Tokens per minute per model. None means no limit.
+        max_retries (int): Retries of a call after a retryable error.
+        base_delay (float): Backoff delay after the first error, in seconds.
+        max_delay (float): Upper bound of the backoff delay.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        if (rpm is not None and rpm <= 0) or (tpm is not None and tpm <= 0):
+            raise ValueError("rpm and tpm must be positive")
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+        self._paused_until: Dict[str, float] = {}
+        self._queues: Dict[str, list] = {}
+        self._sequence = itertools.count()
+        self._stats = {"calls": 0, "retries": 0, "rate_limited": 0, "wait_s": 0.0}
+
+    def _buckets_for(self, model: str) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        if model not in self._buckets:
+            self._buckets[model] = (
+                TokenBucket(self.rpm) if self.rpm else None,
+                TokenBucket(self.tpm) if self.tpm else None,
+            )
+        return self._buckets[model]
+
+    def _try_admit(self, ticket: Tuple[int, int], model: str, tokens: int) -> float:
+        """Admits the call if it is first in line for its model and within quota; else returns the wait."""
+        now = time.monotonic()
+        with self._lock:
+            queue = self._queues[model]
+            if queue[0] != ticket:
+                return _POLL_INTERVAL
+            requests, token_bucket = self._buckets_for(model)
+            wait = max(
+                self._paused_until.get(model, 0.0) - now,
+                requests.wait_time(1, now) if requests else 0.0,
+                token_bucket.wait_time(tokens, now) if token_bucket else 0.0,
+            )
+            if wait > 0:
+                return wait
+            if requests:
+                requests.take(1, now)
+            if token_bucket:
+                token_bucket.take(tokens, now)
+            heapq.heappop(queue)
+            if not queue:
+                del self._queues[model]
+            self._stats["calls"] += 1
+            return 0.0
+
+    async def acquire(self, model: str, tokens: int, priority: Optional[int] = None):
+        """
+        Waits until a call of ``tokens`` estimated tokens to ``model`` may be sent.
+        """
+        ticket = (current_priority() if priority is None else priority, next(self._sequence))
+        with self._lock:
+            heapq.heappush(self._queues.setdefault(model, []), ticket)
+        start = time.monotonic()
+        try:
+            while True:
+                wait = self._try_admit(ticket, model, tokens)
+                if wait == 0.0:
+                    break
+                await asyncio.sleep(min(wait, 1.0))
+        except BaseException:
+            with self._lock:
+                queue = self._queues.get(model, [])
+                if ticket in queue:
+                    queue.remove(ticket)
+                    heapq.heapify(queue)
+                if not queue:
+                    self._queues.pop(model, None)
+            raise
+        waited = time.monotonic() - start
+        with self._lock:
+            self._stats["wait_s"] += waited
+        if waited >= 1.0:
+            logger.info(f"Model call to {model} waited {waited:.1f}s for rate limits")
+
+    def settle(self, model: str, reserved: int, used: int):
+        """Corrects the token bucket once the actual token usage of a call is known."""
+        with self._lock:
+            _, token_bucket = self._buckets_for(model)
+            if token_bucket:
+                token_bucket.give_back(reserved - used, time.monotonic())
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Jittered exponential delay before retry ``attempt`` (0-based)."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        hint = retry_delay_hint(error) if error is not None else None
+        return max(delay, min(hint, self.max_delay)) if hint else delay
+
+    def _pause(self, model: str, delay: float):
+        with self._lock:
+            until = time.monotonic() + delay
+            self._paused_until[model] = max(self._paused_until.get(model, 0.0), until)
+            self._stats["rate_limited"] += 1
+
+    async def stream(self, model: str, tokens: int,
+                     start: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Runs a model call under the scheduler and yields its responses.
+
+        Args:
+            model (str): Model name; quotas are tracked per model.
+            tokens (int): Estimated prompt tokens of the call.
+            start (callable): Returns a fresh async iterator of responses for
+                each attempt.
+
+        A call is only retried if it failed before yielding anything, so a
+        streaming consumer never sees a response twice.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(model, tokens)
+            yielded = False
+            used = None
+            try:
+                async for response in start():
+                    yielded = True
+                    usage = getattr(response, "usage_metadata", None)
+                    if usage is not None and usage.total_token_count:
+                        used = usage.total_token_count
+                    yield response
+                if used is not None:
+                    self.settle(model, tokens, used)
+                return
+            except Exception as e:
+                if yielded or not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt, e)
+                if getattr(e, "code", None) == 429:
+                    self._pause(model, delay)
+                with self._lock:
+                    self._stats["retries"] += 1
+                logger.warning(
+                    f"Model call to {model} failed ({e.__class__.__name__}: {getattr(e, 'code', '')}); "
+                    f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+                )
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """Admitted calls, retries, 429 pauses and total seconds spent waiting."""
+        with self._lock:
+            return dict(self._stats, wait_s=round(self._stats["wait_s"], 3))
+
+
+_scheduler = RateLimitScheduler()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """The process-wide scheduler."""
+    return _scheduler
+
+
+def configure_scheduler(rpm: Optional[float] = None, tpm: Optional[float] = None,
+                        **kwargs) -> RateLimitScheduler:
+    """Replaces the process-wide scheduler, e.g. with the limits given on the command line."""
+    global _scheduler
+    _scheduler = RateLimitScheduler(rpm=rpm, tpm=tpm, **kwargs)
+    return _scheduler
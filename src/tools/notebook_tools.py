@@ -1,5 +1,15 @@
-import nbformat
 import os
+from typing import Iterable
+
+from src.pipeline.notebook_parser import read_cells
+
+def format_code_cells(sources: Iterable[str]) -> str:
+    """
+    The ``read_notebook`` representation of code cell sources: each under a
+    ``# Cell N`` marker, numbered from 1.
+    """
+    return "\n".join(f"# Cell {number}\n{source}\n" for number, source in enumerate(sources, start=1))
+
 
 def read_notebook(path: str) -> str:
     """
@@ -12,15 +22,8 @@ def read_notebook(path: str) -> str:
         str: A string containing the code from the notebook cells.
     """
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            nb = nbformat.read(f, as_version=4)
-            
-        code_content = []
-        for cell in nb.cells:
-            if cell.cell_type == 'code':
-                code_content.append(f"# Cell {len(code_content) + 1}\n{cell.source}\n")
-                
-        return "\n".join(code_content)
+        # Streams the cells; outputs (plots, widget state) are never loaded.
+        return format_code_cells(source for cell_type, source in read_cells(path) if cell_type == 'code')
     except Exception as e:
         return f"Error reading notebook: {str(e)}"
 
@@ -0,0 +1,236 @@
+"""
+Non-blocking, structured logging for pipeline runs.
+
+``configure_logging`` routes every log record through a ``QueueHandler``: the
+calling thread (e.g. the event loop running the model calls) only formats the
+message and puts it on an in-memory queue, and a ``QueueListener`` thread does
+the file I/O. Records are written as one JSON object per line with the
+``run``, ``round`` and ``stage`` they belong to, taken from ``log_context``
+blocks opened by the pipeline engine.
+
+Log files rotate at a size limit, and the oldest files in the log directory
+(logs and traces of earlier runs) are deleted once the directory exceeds its
+retention budget. Chatty libraries (the ADK, google-genai, HTTP clients) are
+kept at WARNING unless their level is set explicitly, so their DEBUG output
+is dropped before a record is even created.
+"""
+
+import atexit
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+DEFAULT_LOG_DIR = "logs"
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_RETAIN_BYTES = 200 * 1024 * 1024
+
+# Levels of third-party loggers unless overridden.
+DEFAULT_LIBRARY_LEVELS = {
+    "google_adk": logging.WARNING,
+    "google_genai": logging.WARNING,
+    "google.auth": logging.WARNING,
+    "httpx": logging.WARNING,
+    "httpcore": logging.WARNING,
+    "urllib3": logging.WARNING,
+    "asyncio": logging.WARNING,
+}
+
+# Fields added to every record from the current log context.
+CONTEXT_FIELDS = ("run", "round", "stage")
+
+_log_context: contextvars.ContextVar = contextvars.ContextVar("log_context", default={})
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Adds ``fields`` (e.g. ``run``, ``round``, ``stage``) to the records logged
+    inside the block, including from tasks and threads started in it.
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Copies the log context onto the record. Must run in the thread that logs,
+    i.e. on the queue handler, since the listener thread has no context.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        for name in CONTEXT_FIELDS:
+            if not hasattr(record, name):
+                setattr(record, name, context.get(name))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that hands the listener a copy of the record with the
+    message merged and the traceback rendered, keeping the traceback out of
+    the message text.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec: Optional[str]) -> Dict[str, int]:
+    """
+    Parses ``"google_adk=DEBUG,httpx=INFO"`` into logger name -> level.
+
+    Raises:
+        ValueError: For malformed entries or unknown level names.
+    """
+    levels: Dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, sep, level = item.partition("=")
+        value = logging.getLevelName(level.strip().upper())
+        if not sep or not name.strip() or not isinstance(value, int):
+            raise ValueError(f"Invalid log level setting '{item}', expected LOGGER=LEVEL")
+        levels[name.strip()] = value
+    return levels
+
+
+def prune_logs(log_dir: str, retain_bytes: int, keep: Optional[List[str]] = None) -> List[str]:
+    """
+    Deletes the oldest files in ``log_dir`` until it holds at most
+    ``retain_bytes``. Files in ``keep`` are never deleted. Returns the deleted paths.
+    """
+    keep_paths = {os.path.abspath(path) for path in keep or []}
+    entries = []
+    for entry in os.scandir(log_dir):
+        if entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    deleted = []
+    for _, size, path in sorted(entries):
+        if total <= retain_bytes:
+            break
+        if os.path.abspath(path) in keep_paths:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        deleted.append(path)
+    return deleted
+
+
+@dataclass
+class LoggingSession:
+    """
+    Handle of the logging set up by ``configure_logging``.
+
+    Attributes:
+        path (str): The JSONL log file of this run.
+        timestamp (str): Run timestamp, also used for other per-run files.
+    """
+    path: str
+    timestamp: str
+    listener: logging.handlers.QueueListener
+    handler: logging.Handler
+    stopped: bool = False
+
+    def stop(self):
+        """Flushes the queue and detaches the handlers. Safe to call twice."""
+        if self.stopped:
+            return
+        self.stopped = True
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+def configure_logging(log_dir: str = DEFAULT_LOG_DIR, level: int = logging.DEBUG,
+                      library_levels: Optional[Dict[str, int]] = None,
+                      max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT,
+                      retain_bytes: Optional[int] = DEFAULT_RETAIN_BYTES) -> LoggingSession:
+    """
+    Sends all logging to a rotating JSONL file through a background queue.
+
+    Args:
+        log_dir (str): Directory of the log file; created if needed.
+        level (int): Level of the root logger.
+        library_levels (dict, optional): Logger name -> level, applied on top
+            of ``DEFAULT_LIBRARY_LEVELS``.
+        max_bytes (int): Size at which the log file is rotated.
+        backup_count (int): Rotated files kept per run.
+        retain_bytes (int, optional): Size budget of ``log_dir``; the oldest
+            files are deleted beyond it. None keeps everything.
+
+    Returns:
+        LoggingSession: The log file path; call ``stop()`` to flush (also
+        done at interpreter exit).
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(log_dir, f"exec_log_{timestamp}.jsonl")
+    if retain_bytes is not None:
+        prune_logs(log_dir, retain_bytes)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+    )
+    file_handler.setFormatter(JsonFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(records)
+    queue_handler.addFilter(ContextFilter())
+    listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    for name, library_level in {**DEFAULT_LIBRARY_LEVELS, **(library_levels or {})}.items():
+        logging.getLogger(name).setLevel(library_level)
+
+    listener.start()
+    session = LoggingSession(path=path, timestamp=timestamp, listener=listener, handler=queue_handler)
+    atexit.register(session.stop)
+    return session
@@ -1,33 +1,541 @@
+"""
+PII (Personally Identifiable Information) detection.
+
+The scanner makes one pass over the text with a single precompiled token
+pattern that only finds ``@`` signs and chains of digit runs; each token is
+then checked with bounded work:
+
+- an ``@`` is an email address if at least one local-part character precedes
+  it (at most 64 are looked at) and a domain with a dot and a top-level
+  domain follows (at most 255 characters are looked at);
+- digit runs separated by short gaps (spaces, dashes, dots, parentheses)
+  form chains, and windows of consecutive runs in a chain are checked as
+  IPv4 addresses (four dotted octets up to 255), phone numbers (10 digits
+  split 3-3-4, optionally after a leading 1) and credit card numbers (13 to
+  19 digits, in one run or in groups of three or more separated by spaces
+  or dashes, that pass the Luhn check).
+
+A window never spans more than 19 digits, so the work per character is
+bounded and the scan is linear in the length of the text, whatever the
+input. Free-running patterns such as ``[a-zA-Z0-9._%+-]+@`` restart their
+scan at every position of a long run and take quadratic time, which made
+the pre-check a denial-of-service vector on uploaded files.
+
+No match is longer than ``PII_OVERLAP`` characters, so very large inputs
+can be scanned in chunks (``scan_pii_blocks``, ``scan_pii_file``): every
+chunk is scanned together with ``PII_OVERLAP`` characters of context on
+each side, and keeps the matches that start inside it. Above
+``DEFAULT_PARALLEL_THRESHOLD`` characters the chunks are spread over a
+process pool, and with ``first_only`` the scan stops at the first match,
+for when only a block/allow decision is needed.
+
+Scan results are kept in a bounded, process-wide LRU cache keyed by the
+SHA-256 of the content (``get_pii_cache``), shared by the pre-check, the
+agent guardrails and the scan view: the same notebook submitted again, or
+the same text checked by several entry points, costs a hash and a dictionary
+lookup.
+"""
+
+import bisect
+import collections
+import hashlib
+import os
 import re
-from typing import List
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+EMAIL = "email"
+PHONE = "phone"
+IP_ADDRESS = "ip_address"
+CREDIT_CARD = "credit_card"
+
+# Warning of every PII kind, in the order the warnings are reported.
+PII_WARNINGS: Dict[str, str] = {
+    EMAIL: "Detected potential Email Address",
+    PHONE: "Detected potential Phone Number",
+    IP_ADDRESS: "Detected potential IP Address",
+    CREDIT_CARD: "Detected potential Credit Card Number",
+}
+
+MAX_LOCAL_PART = 64
+MAX_DOMAIN = 255
+MAX_TLD = 63
+MAX_CARD_DIGITS = 19
+MIN_CARD_DIGITS = 13
+# Card numbers are written in one run or in groups of at least three digits.
+MIN_CARD_GROUP = 3
+
+# Longer than any match (an email address: local part, "@", domain, TLD) plus its context.
+PII_OVERLAP = 512
+DEFAULT_SCAN_CHUNK = 1 << 20
+DEFAULT_PARALLEL_THRESHOLD = 8 << 20
+DEFAULT_CACHE_ENTRIES = 1024
+
+# An ``@`` or a chain of digit runs joined by short separators.
+_TOKEN_RE = re.compile(r"@|\d+(?:[ .()+-]{1,4}\d+)*")
+_DIGITS_RE = re.compile(r"\d+")
+_LOCAL_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-")
+# Domain up to its last dot followed by letters; the bounded prefix keeps backtracking bounded.
+_DOMAIN_RE = re.compile(r"[a-zA-Z0-9.-]{1,%d}\.[a-zA-Z]{2,%d}" % (MAX_DOMAIN, MAX_TLD))
+_PHONE_GAP_RE = re.compile(r"\)?[-. ]?\(?")
+_CARD_GAP_RE = re.compile(r"[ -]+")
+
+
+@dataclass(frozen=True)
+class PiiMatch:
+    """
+    One PII finding.
+
+    Attributes:
+        kind (str): ``EMAIL``, ``PHONE``, ``IP_ADDRESS`` or ``CREDIT_CARD``.
+        start (int): Offset of the match in the scanned text.
+        end (int): Offset just past the match.
+    """
+    kind: str
+    start: int
+    end: int
+
+    @property
+    def warning(self) -> str:
+        return PII_WARNINGS[self.kind]
+
+
+def _is_word(text: str, pos: int) -> bool:
+    """Whether ``text[pos]`` exists and is a word character (as in ``\\b``)."""
+    if pos < 0 or pos >= len(text):
+        return False
+    char = text[pos]
+    return char.isalnum() or char == "_"
+
+
+def luhn_valid(digits: str) -> bool:
+    """The Luhn checksum of card numbers."""
+    total = 0
+    for i, char in enumerate(reversed(digits)):
+        value = ord(char) - 48
+        if i % 2:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return total % 10 == 0
+
+
+def _email_at(text: str, at: int):
+    """The email address around the ``@`` at ``at`` as (start, end), or None."""
+    start = at
+    while start > 0 and at - start < MAX_LOCAL_PART and text[start - 1] in _LOCAL_CHARS:
+        start -= 1
+    if start == at:
+        return None
+    domain = _DOMAIN_RE.match(text, at + 1)
+    return (start, domain.end()) if domain is not None else None
+
+
+def _phone_digits(lengths: List[int]) -> bool:
+    """Whether runs of these lengths split a phone number at its 3-3-4 (or 1-3-3-4) boundaries."""
+    total = sum(lengths)
+    if total == 10:
+        allowed = {3, 6}
+    elif total == 11:
+        allowed = {1, 4, 7}
+    else:
+        return False
+    cut = 0
+    for length in lengths[:-1]:
+        cut += length
+        if cut not in allowed:
+            return False
+    return True
+
+
+def _scan_short(text: str, runs: List[Tuple[int, int]], word_before: bool, word_after: bool,
+                found: List[PiiMatch]):
+    """
+    IPv4 addresses and phone numbers, windows of at most four runs. A phone
+    number ends in a run of at least four digits and an address in four
+    runs of at most three, so only those windows are looked at.
+    """
+    count = len(runs)
+    ip_end = phone_end = -1
+    for last in range(count):
+        run_start, run_end = runs[last]
+        length = run_end - run_start
+        if last == count - 1 and word_after:
+            break
+        if 4 <= length <= 11:
+            for first in range(max(0, last - 3), last + 1):
+                start = runs[first][0]
+                if start <= phone_end or (first == 0 and word_before):
+                    continue
+                lengths = [e - s for s, e in runs[first:last + 1]]
+                if (_phone_digits(lengths) and (sum(lengths) == 10 or text[start] == "1")
+                        and all(_PHONE_GAP_RE.fullmatch(text, runs[i][1], runs[i + 1][0])
+                                for i in range(first, last))):
+                    found.append(PiiMatch(PHONE, start, run_end))
+                    phone_end = run_end
+                    break
+        elif length <= 3 and last >= 3:
+            first = last - 3
+            # The whole dotted sequence: not part of a longer one such as a version number.
+            if ((first == 0 or text[runs[first - 1][1]:runs[first][0]] != ".")
+                    and (last == count - 1 or text[run_end:runs[last + 1][0]] != ".")
+                    and runs[first][0] > ip_end and not (first == 0 and word_before)
+                    and all(runs[i][1] + 1 == runs[i + 1][0] and text[runs[i][1]] == "." for i in range(first, last))
+                    and all(e - s <= 3 and int(text[s:e]) <= 255 for s, e in runs[first:last + 1])):
+                found.append(PiiMatch(IP_ADDRESS, runs[first][0], run_end))
+                ip_end = run_end
+
+
+def _scan_cards(text: str, runs: List[Tuple[int, int]], word_before: bool, word_after: bool,
+                found: List[PiiMatch]):
+    """
+    Card numbers in runs separated by spaces or dashes, each at most 19
+    digits long. Prefix sums give the digit count and Luhn sum of any window
+    in constant time.
+    """
+    count = len(runs)
+    digits = "".join(text[s:e] for s, e in runs)
+    cum = [0]
+    for s, e in runs:
+        cum.append(cum[-1] + e - s)
+    # even[k]: Luhn sum of digits[:k] doubling odd indices; odd[k]: doubling even indices.
+    even, odd = [0], [0]
+    for k, char in enumerate(digits):
+        value = ord(char) - 48
+        doubled = value * 2 - 9 if value > 4 else value * 2
+        even.append(even[-1] + (doubled if k % 2 else value))
+        odd.append(odd[-1] + (value if k % 2 else doubled))
+    first = 0
+    while first < count:
+        if first == 0 and word_before:
+            first += 1
+            continue
+        low = bisect.bisect_left(cum, cum[first] + MIN_CARD_DIGITS)
+        high = bisect.bisect_right(cum, cum[first] + MAX_CARD_DIGITS)
+        matched = False
+        for end in range(low, high):
+            # runs[first:end]
+            if end == count and word_after:
+                break
+            p, q = cum[first], cum[end]
+            total = (even[q] - even[p]) if (q - 1) % 2 == 0 else (odd[q] - odd[p])
+            if total % 10 == 0:
+                found.append(PiiMatch(CREDIT_CARD, runs[first][0], runs[end - 1][1]))
+                first, matched = end, True
+                break
+        if not matched:
+            first += 1
+
+
+def _scan_chain(text: str, runs: List[Tuple[int, int]], found: List[PiiMatch]):
+    """Checks the windows of consecutive digit runs of one chain."""
+    word_before = _is_word(text, runs[0][0] - 1)
+    word_after = _is_word(text, runs[-1][1])
+    longest = max(end - start for start, end in runs)
+    if longest >= 4 or "." in text[runs[0][0]:runs[-1][1]]:
+        _scan_short(text, runs, word_before, word_after, found)
+    if longest < MIN_CARD_GROUP:
+        return
+    # Card windows: split at gaps other than spaces and dashes, and at runs
+    # too short or too long to be a group of a card number.
+    segment: List[Tuple[int, int]] = []
+    for run in runs + [None]:
+        breaks = (run is None or not MIN_CARD_GROUP <= run[1] - run[0] <= MAX_CARD_DIGITS
+                  or (segment and _CARD_GAP_RE.fullmatch(text, segment[-1][1], run[0]) is None))
+        if breaks and segment:
+            _scan_cards(text, segment, word_before and segment[0] is runs[0],
+                        word_after and segment[-1] is runs[-1], found)
+            segment = []
+        if run is not None and MIN_CARD_GROUP <= run[1] - run[0] <= MAX_CARD_DIGITS:
+            segment.append(run)
+
+
+def _scan(content: str, low: int = 0, high: Optional[int] = None, first_only: bool = False) -> List[PiiMatch]:
+    """The matches of ``content`` that start in ``[low, high)``; the rest is context."""
+    high = len(content) if high is None else high
+    found: List[PiiMatch] = []
+    email_end = -1
+    for token in _TOKEN_RE.finditer(content):
+        start, end = token.span()
+        if start >= high + MAX_LOCAL_PART:
+            # No later token can start a match before ``high`` (an email starts before its "@").
+            break
+        if content[start] == "@":
+            email = _email_at(content, start)
+            if email is not None and email[0] >= email_end:
+                found.append(PiiMatch(EMAIL, *email))
+                email_end = email[1]
+        elif token.group().isdigit():
+            # A single run, the common case.
+            length = end - start
+            if length < 10 or length > MAX_CARD_DIGITS or _is_word(content, start - 1) or _is_word(content, end):
+                continue
+            if length == 10 or (length == 11 and content[start] == "1"):
+                found.append(PiiMatch(PHONE, start, end))
+            elif length >= MIN_CARD_DIGITS and luhn_valid(token.group()):
+                found.append(PiiMatch(CREDIT_CARD, start, end))
+        else:
+            _scan_chain(content, [run.span() for run in _DIGITS_RE.finditer(content, start, end)], found)
+        if first_only and any(low <= match.start < high for match in found):
+            break
+    found = [match for match in found if low <= match.start < high]
+    found.sort(key=lambda match: match.start)
+    return found[:1] if first_only else found
+
+
+class PiiCache:
+    """
+    Bounded LRU cache of scan results by content hash; thread-safe.
+
+    An entry from a ``first_only`` scan that found a match only answers
+    ``first_only`` lookups; one that found nothing, or from a full scan,
+    answers both.
+
+    Args:
+        max_entries (int): Entries kept; the least recently used are evicted.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "collections.OrderedDict[str, Tuple[Tuple[PiiMatch, ...], bool]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: str, first_only: bool = False) -> Optional[List[PiiMatch]]:
+        """The cached matches for ``key``, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] or first_only):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                matches, _ = entry
+                return list(matches[:1] if first_only else matches)
+            self.misses += 1
+            return None
+
+    def store(self, key: str, matches: List[PiiMatch], complete: bool = True):
+        """Caches a scan result; ``complete`` is False for a ``first_only`` scan that stopped at a match."""
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None and existing[1] and not complete:
+                return
+            self._entries[key] = (tuple(matches), complete)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+_cache = PiiCache()
+
+
+def get_pii_cache() -> PiiCache:
+    """The process-wide cache of scan results."""
+    return _cache
+
+
+def content_key(content: str) -> str:
+    """The cache key of a text."""
+    return hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _cached(key: str, first_only: bool, scan: Callable[[], List[PiiMatch]]) -> List[PiiMatch]:
+    matches = _cache.lookup(key, first_only)
+    if matches is None:
+        matches = scan()
+        _cache.store(key, matches, complete=not first_only or not matches)
+    return matches
+
+
+def scan_pii(content: str, first_only: bool = False) -> List[PiiMatch]:
+    """
+    Scans the provided content for Personally Identifiable Information (PII)
+    in one linear pass. Returns every match, ordered by position, or with
+    ``first_only`` just the first one found. Results are cached.
+    """
+    return _cached(content_key(content), first_only, lambda: _scan(content, first_only=first_only))
+
+
+@dataclass(frozen=True)
+class _Window:
+    """A chunk at ``offset`` with context: its matches start in ``text[low:high]``."""
+    offset: int
+    text: str
+    low: int
+    high: int
+
+
+def _windows(blocks: Iterable[str], overlap: int) -> Iterator[_Window]:
+    """Windows over consecutive blocks of text, each with ``overlap`` characters of context on both sides."""
+    tail, pending, ahead, offset = "", None, [], 0
+    blocks = iter(blocks)
+
+    def emit(block: str, following: str) -> _Window:
+        return _Window(offset=offset - len(tail), text=tail + block + following,
+                       low=len(tail), high=len(tail) + len(block))
+
+    for block in blocks:
+        if not block:
+            continue
+        if pending is None:
+            pending = block
+            continue
+        ahead.append(block)
+        if sum(map(len, ahead)) < overlap:
+            continue
+        following = "".join(ahead)
+        yield emit(pending, following[:overlap])
+        tail = (tail + pending)[-overlap:]
+        offset += len(pending)
+        pending = following
+        ahead = []
+    if pending is not None:
+        following = "".join(ahead)
+        yield emit(pending, following[:overlap])
+        if following:
+            tail = (tail + pending)[-overlap:]
+            offset += len(pending)
+            yield emit(following, "")
+
+
+def _scan_window(window: _Window, first_only: bool = False) -> List[PiiMatch]:
+    return [PiiMatch(match.kind, match.start + window.offset, match.end + window.offset)
+            for match in _scan(window.text, window.low, window.high, first_only)]
+
+
+def scan_pii_blocks(blocks: Iterable[str], first_only: bool = False, workers: Optional[int] = None,
+                    parallel: bool = False, overlap: int = PII_OVERLAP) -> List[PiiMatch]:
+    """
+    Scans text given as consecutive blocks (e.g. chunks read from a file)
+    without joining them. Matches across block boundaries are found as in
+    ``scan_pii``, with offsets into the whole text.
+
+    Args:
+        blocks (iterable): The text, in order.
+        first_only (bool): Stop at the first match found and return only it.
+        workers (int): Processes for ``parallel`` (default: CPU count).
+        parallel (bool): Scan the blocks in a process pool.
+        overlap (int): Context on each side of a block; at least ``PII_OVERLAP``.
+    """
+    if overlap < PII_OVERLAP:
+        raise ValueError(f"overlap must be at least {PII_OVERLAP}")
+    windows = _windows(blocks, overlap)
+    found: List[PiiMatch] = []
+    if not parallel:
+        for window in windows:
+            found.extend(_scan_window(window, first_only))
+            if first_only and found:
+                return found[:1]
+        return found
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # Windows are submitted as results come back, so only a few are held at a time.
+        futures: collections.deque = collections.deque()
+        for window in windows:
+            futures.append(executor.submit(_scan_window, window, first_only))
+            if len(futures) >= 2 * workers:
+                if first_only:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    hits = [match for future in done for match in future.result()]
+                    if hits:
+                        return hits[:1]
+                    for future in done:
+                        futures.remove(future)
+                else:
+                    found.extend(futures.popleft().result())
+        for future in futures:
+            found.extend(future.result())
+            if first_only and found:
+                return found[:1]
+        return found
+    finally:
+        executor.shutdown(wait=not first_only, cancel_futures=True)
+
+
+def _read_blocks(path: str, chunk_size: int) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for block in iter(lambda: f.read(chunk_size), ""):
+            yield block
+
+
+def _should_parallelize(size: int, workers: Optional[int], parallel_threshold: int) -> bool:
+    return size > parallel_threshold and (workers or os.cpu_count() or 1) > 1
+
+
+def scan_pii_text(content: str, first_only: bool = False, workers: Optional[int] = None,
+                  chunk_size: int = DEFAULT_SCAN_CHUNK,
+                  parallel_threshold: int = DEFAULT_PARALLEL_THRESHOLD) -> List[PiiMatch]:
+    """
+    ``scan_pii`` for large strings: scanned in chunks of ``chunk_size``
+    characters, in a process pool above ``parallel_threshold`` characters.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if not _should_parallelize(len(content), workers, parallel_threshold):
+        return scan_pii(content, first_only)
+    blocks = (content[i:i + chunk_size] for i in range(0, len(content), chunk_size))
+    return _cached(content_key(content), first_only,
+                   lambda: scan_pii_blocks(blocks, first_only=first_only, workers=workers, parallel=True))
+
+
+def scan_pii_file(path: str, first_only: bool = False, workers: Optional[int] = None,
+                  chunk_size: int = DEFAULT_SCAN_CHUNK,
+                  parallel_threshold: int = DEFAULT_PARALLEL_THRESHOLD) -> List[PiiMatch]:
+    """
+    Scans a text file without reading it into memory: it is streamed in
+    chunks of ``chunk_size`` characters, scanned in a process pool when the
+    file is larger than ``parallel_threshold`` bytes. Results are cached by
+    the hash of the file's bytes.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    parallel = _should_parallelize(os.path.getsize(path), workers, parallel_threshold)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return _cached("file:" + digest.hexdigest(), first_only,
+                   lambda: scan_pii_blocks(_read_blocks(path, chunk_size), first_only=first_only,
+                                           workers=workers, parallel=parallel))
+
+
+def first_matches(matches: Iterable[PiiMatch]) -> List[PiiMatch]:
+    """The first match of every PII kind, in the order the warnings are reported."""
+    first: Dict[str, PiiMatch] = {}
+    for match in sorted(matches, key=lambda match: match.start):
+        first.setdefault(match.kind, match)
+    return [first[kind] for kind in PII_WARNINGS if kind in first]
+
+
+def find_pii(content: str) -> List[Tuple[str, int]]:
+    """
+    Scans the provided content for Personally Identifiable Information (PII).
+    Returns (warning, offset of the first match) for every PII type found.
+    """
+    return [(match.warning, match.start) for match in first_matches(scan_pii(content))]
+
 
 def check_pii(content: str) -> List[str]:
     """
     Scans the provided content for Personally Identifiable Information (PII).
     Returns a list of detected PII types/warnings.
     """
-    warnings = []
-    
-    # Email Regex
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    if re.search(email_pattern, content):
-        warnings.append("Detected potential Email Address")
-        
-    # Phone Number Regex (Simple US/International format)
-    phone_pattern = r'\b(?:\+?1[-.]?)?\(?([0-9]{3})\)?[-. ]?([0-9]{3})[-. ]?([0-9]{4})\b'
-    if re.search(phone_pattern, content):
-        warnings.append("Detected potential Phone Number")
-        
-    # IPv4 Address Regex
-    ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-    if re.search(ip_pattern, content):
-        warnings.append("Detected potential IP Address")
-        
-    # Credit Card Regex (Simple check for 13-19 digits)
-    cc_pattern = r'\b(?:\d[ -]*?){13,16}\b'
-    # Refine to avoid matching simple long numbers if possible, but keeping it simple for now
-    # This is a broad check
-    if re.search(cc_pattern, content):
-        warnings.append("Detected potential Credit Card Number")
-        
-    return warnings
+    return [warning for warning, _ in find_pii(content)]
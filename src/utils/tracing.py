@@ -0,0 +1,162 @@
+"""
+Lightweight span tracing for pipeline runs.
+
+A ``Tracer`` records nested spans (run, round, stage, model call, tool call)
+with wall-clock timings and attributes such as token counts, exports them as a
+JSON trace file and renders a per-agent summary table.
+"""
+
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """A timed unit of work."""
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: str
+    start: float
+    end: Optional[float] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+
+class Tracer:
+    """
+    Collects spans for one run.
+
+    Spans opened with ``span()`` become the parent of spans started inside
+    them, including spans started in asyncio tasks created within the block.
+
+    Args:
+        run_id (str, optional): Identifier written to the trace file.
+    """
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, kind: str, parent: Optional[Span] = None, **attrs) -> Span:
+        """
+        Starts a span without making it current. The parent defaults to the current span.
+        """
+        parent = parent if parent is not None else _current_span.get()
+        span = Span(
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent is not None else None,
+            name=name,
+            kind=kind,
+            start=time.perf_counter(),
+            attrs=dict(attrs),
+        )
+        with self._lock:
+            self._spans.append(span)
+        return span
+
+    def end_span(self, span: Span, **attrs):
+        """Ends a span, adding ``attrs`` to it."""
+        span.attrs.update(attrs)
+        if span.end is None:
+            span.end = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, kind: str, **attrs) -> Iterator[Span]:
+        """
+        Context manager that starts a span, makes it current and ends it on exit.
+        """
+        span = self.start_span(name, kind, **attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The trace as a JSON-serializable dict. Times are milliseconds since the trace started."""
+        spans = []
+        for span in self.spans:
+            record = asdict(span)
+            record["start_ms"] = round((span.start - self._origin) * 1000, 3)
+            record["end_ms"] = round((span.end - self._origin) * 1000, 3) if span.end is not None else None
+            record["duration_ms"] = round(span.duration_ms, 3)
+            del record["start"], record["end"]
+            spans.append(record)
+        return {"run_id": self.run_id, "started_at": self.started_at, "spans": spans}
+
+    def export(self, path: str):
+        """Writes the trace as JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregates the spans per agent: stage runs and time, model calls,
+        model time, tokens and tool calls by tool name.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+
+        def row(agent: str) -> Dict[str, Any]:
+            return rows.setdefault(agent, {
+                "stages": 0, "stage_ms": 0.0, "model_calls": 0, "model_ms": 0.0, "cached_calls": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "tool_calls": {}, "tool_ms": 0.0,
+            })
+
+        for span in self.spans:
+            agent = span.attrs.get("agent")
+            if not agent:
+                continue
+            r = row(agent)
+            if span.kind == "stage":
+                r["stages"] += 1
+                r["stage_ms"] += span.duration_ms
+            elif span.kind == "model":
+                r["model_calls"] += 1
+                r["model_ms"] += span.duration_ms
+                r["cached_calls"] += 1 if span.attrs.get("cached") else 0
+                r["prompt_tokens"] += span.attrs.get("prompt_tokens", 0)
+                r["completion_tokens"] += span.attrs.get("completion_tokens", 0)
+            elif span.kind == "tool":
+                tool = span.attrs.get("tool", span.name)
+                r["tool_calls"][tool] = r["tool_calls"].get(tool, 0) + 1
+                r["tool_ms"] += span.duration_ms
+        return rows
+
+    def format_summary(self) -> str:
+        """Renders ``summary()`` as a fixed-width table."""
+        header = (f"{'agent':18} {'stages':>6} {'stage s':>8} {'calls':>5} {'cached':>6} {'model s':>8} "
+                  f"{'tok in':>8} {'tok out':>8} {'tool s':>7}  tools")
+        lines = [header, "-" * len(header)]
+        for agent, r in sorted(self.summary().items(), key=lambda item: -item[1]["stage_ms"]):
+            tools = ", ".join(f"{name}={count}" for name, count in sorted(r["tool_calls"].items())) or "-"
+            lines.append(
+                f"{agent:18} {r['stages']:>6} {r['stage_ms'] / 1000:>8.2f} {r['model_calls']:>5} "
+                f"{r['cached_calls']:>6} {r['model_ms'] / 1000:>8.2f} {r['prompt_tokens']:>8} "
+                f"{r['completion_tokens']:>8} {r['tool_ms'] / 1000:>7.2f}  {tools}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,23 @@
+"""
+Shared test fixtures.
+"""
+
+import nbformat
+import pytest
+
+
+@pytest.fixture
+def write_notebook():
+    """
+    Writes an nbformat v4 notebook and returns its path as a string.
+
+    ``cells`` are nbformat cells; plain strings become code cells.
+    """
+    def write(path, cells=("x = 1",), metadata=None):
+        cells = [nbformat.v4.new_code_cell(cell) if isinstance(cell, str) else cell for cell in cells]
+        notebook = nbformat.v4.new_notebook(cells=cells, metadata=metadata or {})
+        with open(path, 'w', encoding='utf-8') as f:
+            nbformat.write(notebook, f)
+        return str(path)
+
+    return write
@@ -0,0 +1,124 @@
+"""
+Unit tests for the local architecture planner.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.pipeline.architecture_planner import (
+    analyze_code, extract_code, local_plan_or_none, plan_architecture,
+)
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.replay_llm import replay_models
+
+STANDARD_CODE = """# Cell 0
+import pandas as pd
+import joblib
+from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+
+# Cell 1
+df = pd.read_csv("data.csv")
+df = df.dropna()
+
+# Cell 2
+def split(frame):
+    return train_test_split(frame.drop(columns=["y"]), frame["y"], test_size=0.2)
+
+X_train, X_test, y_train, y_test = split(df)
+
+# Cell 3
+model = LogisticRegression(max_iter=200)
+model.fit(X_train, y_train)
+joblib.dump(model, "model.joblib")
+
+# Cell 4
+print(accuracy_score(y_test, model.predict(X_test)))
+"""
+
+TORCH_CODE = """# Cell 0
+import torch
+from torch import nn
+
+# Cell 1
+model = nn.Linear(4, 1)
+optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+"""
+
+
+def parsed(code):
+    return json.dumps({"code": code, "documentation": ""})
+
+
+def test_standard_notebook_is_planned_confidently():
+    plan = plan_architecture(parsed(STANDARD_CODE), "OUT")
+    assert plan.confidence >= 0.9, plan.reasons
+    src = plan.plan["OUT/src"]
+    assert {"data_loader.py", "preprocessing.py", "model.py", "train.py", "evaluate.py"} <= set(src)
+    assert "LogisticRegression" in src["model.py"]
+    assert "split" in src["preprocessing.py"]
+    assert plan.plan["OUT/requirements.txt"].endswith("joblib, pandas, scikit-learn")
+    assert all(key.startswith("OUT/") for key in plan.plan)
+
+
+def test_analysis_finds_steps_and_functions():
+    analysis = analyze_code(STANDARD_CODE)
+    assert {"load", "preprocess", "model", "train", "evaluate"} <= set(analysis.steps)
+    assert analysis.functions == {"split": "preprocess"}
+    assert analysis.estimators == ["LogisticRegression"]
+
+
+def test_tied_function_steps_are_assigned_deterministically():
+    code = ("import pandas as pd\nfrom sklearn.linear_model import LogisticRegression\n\n"
+            "def run(path):\n    df = pd.read_csv(path)\n    LogisticRegression().fit(df, df)\n")
+    assert analyze_code(code).functions["run"] == "load"
+
+
+def test_unusual_notebooks_fall_back_to_the_agent():
+    assert local_plan_or_none(parsed(TORCH_CODE)) is None
+    assert local_plan_or_none(parsed("x = 1")) is None
+    assert local_plan_or_none(parsed(STANDARD_CODE.replace("model.fit(", "model.fit(("))) is None
+    assert local_plan_or_none("I could not read the notebook.") is None
+
+
+def test_parser_agent_output_in_a_code_fence():
+    fenced = f"```json\n{parsed(STANDARD_CODE)}\n```"
+    assert extract_code(fenced) == STANDARD_CODE
+    assert json.loads(local_plan_or_none(fenced)) == plan_architecture(parsed(STANDARD_CODE)).plan
+
+
+def run_engine(tmp_path, code, **options):
+    notebook = tmp_path / "nb.ipynb"
+    notebook.write_text(code)
+    recording = {
+        "architect_agent": [{"text": '{"OUTPUT/src": {"main.py": "Everything"}}'}],
+        "refactorer_agent": [{"text": "Written."}],
+        "devops_agent": [{"text": "Written."}],
+        "reviewer_agent": [{"text": "APPROVED"}],
+    }
+    models = replay_models(recording)
+    output_dir = str(tmp_path / "out")
+    engine = PipelineEngine(agents=create_pipeline_agents(output_dir=output_dir, models=models),
+                            output_dir=output_dir, verify=False, **options)
+    return models, asyncio.run(engine.run(str(notebook))), output_dir
+
+
+def test_engine_plans_standard_notebooks_without_the_architect(tmp_path):
+    models, result, output_dir = run_engine(tmp_path, STANDARD_CODE)
+    assert result.approved
+    assert models["architect"].calls == 0
+    assert f"{output_dir}/src" in json.loads(result.outputs["architect_agent"])
+
+
+def test_engine_asks_the_architect_when_unsure_or_told_to(tmp_path):
+    models, result, _ = run_engine(tmp_path, TORCH_CODE)
+    assert models["architect"].calls == 1
+    assert json.loads(result.outputs["architect_agent"]) == {"OUTPUT/src": {"main.py": "Everything"}}
+
+    models, _, _ = run_engine(tmp_path, STANDARD_CODE, llm_architect=True)
+    assert models["architect"].calls == 1
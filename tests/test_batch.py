@@ -0,0 +1,95 @@
+"""
+Unit tests for batch notebook conversion.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk import Agent
+
+from main import candidate_factory_for
+from src.pipeline.batch import discover_notebooks, output_dirs_for, run_batch
+from src.pipeline.engine import create_pipeline_agents
+from src.pipeline.routing import ROLES
+from tests.test_engine import EchoLlm, make_agent
+
+
+def fake_agents(output_dir):
+    return {
+        "parser": make_agent("parser_agent", "{}"),
+        "architect": make_agent("architect_agent", "{}"),
+        "refactorer": make_agent("refactorer_agent", "done"),
+        "devops": make_agent("devops_agent", "done"),
+        "reviewer": make_agent("reviewer_agent", "APPROVED"),
+    }
+
+
+def test_discover_notebooks_skips_checkpoints(tmp_path, write_notebook):
+    write_notebook(tmp_path / "a.ipynb")
+    (tmp_path / "sub").mkdir()
+    write_notebook(tmp_path / "sub" / "b.ipynb")
+    (tmp_path / ".ipynb_checkpoints").mkdir()
+    write_notebook(tmp_path / ".ipynb_checkpoints" / "a-checkpoint.ipynb")
+
+    found = discover_notebooks(str(tmp_path))
+    assert [os.path.basename(p) for p in found] == ["a.ipynb", "b.ipynb"]
+
+
+def test_output_dirs_are_unique():
+    dirs = output_dirs_for(["x/nb.ipynb", "y/nb.ipynb"], "OUT")
+    assert dirs == {"x/nb.ipynb": os.path.join("OUT", "nb"), "y/nb.ipynb": os.path.join("OUT", "nb_2")}
+
+
+def test_run_batch_writes_summary(tmp_path, write_notebook):
+    write_notebook(tmp_path / "clean.ipynb")
+    write_notebook(tmp_path / "leaky.ipynb", ["contact = 'someone@example.com'"])
+    summary = tmp_path / "summary.jsonl"
+
+    records = asyncio.run(run_batch(
+        discover_notebooks(str(tmp_path)), output_root=str(tmp_path / "out"),
+        summary_path=str(summary), concurrency=2, agent_factory=fake_agents,
+    ))
+
+    statuses = {os.path.basename(r["notebook"]): r["status"] for r in records}
+    assert statuses == {"clean.ipynb": "approved", "leaky.ipynb": "pii_blocked"}
+    lines = [json.loads(line) for line in summary.read_text().splitlines()]
+    assert len(lines) == 2
+    assert all("latency_s" in line and "tokens" in line for line in lines)
+
+
+def test_candidates_use_each_notebooks_refactorer_model(tmp_path, write_notebook):
+    write_notebook(tmp_path / "a.ipynb")
+    write_notebook(tmp_path / "b.ipynb")
+    built = []
+
+    def routed_agents(output_dir):
+        agents = fake_agents(output_dir)
+        model = EchoLlm(model=f"model-{os.path.basename(output_dir)}", reply="done")
+        agents["refactorer"] = Agent(model=model, name="refactorer_agent", instruction="test")
+        return agents
+
+    def candidates_for(agents):
+        def make_candidate(staging_dir):
+            built.append(agents["refactorer"].model.model)
+            return Agent(model=agents["refactorer"].model, name="refactorer_agent", instruction="test")
+        return make_candidate
+
+    records = asyncio.run(run_batch(
+        discover_notebooks(str(tmp_path)), output_root=str(tmp_path / "out"),
+        summary_path=str(tmp_path / "summary.jsonl"), agent_factory=routed_agents,
+        engine_options={"candidates": 2, "candidate_tests": False}, candidate_factory_for=candidates_for,
+    ))
+    assert [r["status"] for r in records] == ["approved", "approved"]
+    assert sorted(built) == ["model-a", "model-a", "model-b", "model-b"]
+
+
+def test_cli_candidates_follow_the_model_option(tmp_path):
+    # --model routes every role to the given model; candidates must use it too.
+    agents = create_pipeline_agents(api_key="key", output_dir=str(tmp_path),
+                                    model_names={role: "gemini-1.5-pro" for role in ROLES})
+    candidate = candidate_factory_for(agents, api_key="key")(str(tmp_path / "staging"))
+    assert candidate.model.model == "gemini-1.5-pro"
@@ -0,0 +1,136 @@
+"""
+Unit tests for speculative refactorer candidates.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.refactorer_agent import create_refactorer_agent
+from src.pipeline.candidates import pick_best, promote, score_candidate, staging_root
+from src.pipeline.checkpoint import CheckpointStore
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.replay_llm import ReplayLlm, replay_models
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_best_candidate_compiles_and_passes_tests(tmp_path):
+    broken, passing, failing = tmp_path / "broken", tmp_path / "passing", tmp_path / "failing"
+    write(broken / "train.py", "def fit(:\n")
+    write(passing / "train.py", "def fit():\n    return 1\n")
+    write(passing / "test_train.py", "from train import fit\n\ndef test_fit():\n    assert fit() == 1\n")
+    write(failing / "train.py", "def fit():\n    return 2\n")
+    write(failing / "test_train.py", "from train import fit\n\ndef test_fit():\n    assert fit() == 1\n")
+
+    best, scores = pick_best([str(broken), str(failing), str(passing)])
+    assert best == 2
+    assert [s.tests for s in scores] == ["none", "failed", "passed"]
+    assert scores[0].issues == 1
+
+
+def test_smaller_candidate_wins_ties(tmp_path):
+    write(tmp_path / "a" / "train.py", "x = 1\n" * 10)
+    write(tmp_path / "b" / "train.py", "x = 1\n")
+    write(tmp_path / "empty" / "notes.txt", "no code")
+    best, _ = pick_best([str(tmp_path / "empty"), str(tmp_path / "a"), str(tmp_path / "b")], run_candidate_tests=False)
+    assert best == 2
+    assert score_candidate(str(tmp_path / "empty")).files == 0
+
+
+def test_promote_copies_relative_layout(tmp_path):
+    write(tmp_path / "stage" / "src" / "train.py", "x = 1\n")
+    write(tmp_path / "out" / "src" / "train.py", "old\n")
+    promote(str(tmp_path / "stage"), str(tmp_path / "out"))
+    assert (tmp_path / "out" / "src" / "train.py").read_text() == "x = 1\n"
+
+
+def test_engine_reviews_only_the_best_candidate(tmp_path):
+    output_dir = tmp_path / "OUTPUT"
+    contents = iter(["def fit(:\n", "def fit():\n    return 1\n", "import nonexistent_pkg_xyz\n"])
+    staging_dirs = []
+
+    def candidate_factory(staging_dir):
+        staging_dirs.append(staging_dir)
+        turns = [
+            {"function_calls": [{"name": "write_file", "args": {
+                "path": os.path.join(staging_dir, "src", "train.py"), "content": next(contents)}}]},
+            {"text": f"Wrote draft {len(staging_dirs)}."},
+        ]
+        return create_refactorer_agent(output_dir=staging_dir, model=ReplayLlm(model="replay", turns=turns))
+
+    models = replay_models({
+        "parser_agent": [{"text": '{"code": "x = 1", "documentation": ""}'}],
+        "architect_agent": [{"text": '{"OUTPUT/src": {"train.py": "Training"}}'}],
+        "devops_agent": [{"text": "Nothing to do."}],
+        "reviewer_agent": [{"text": "APPROVED"}],
+    })
+    agents = create_pipeline_agents(output_dir=str(output_dir), models=models)
+    engine = PipelineEngine(agents=agents, output_dir=str(output_dir), candidates=3,
+                            candidate_factory=candidate_factory, llm_parser=True)
+    result = asyncio.run(engine.run("notebook.ipynb"))
+
+    assert result.approved and result.rounds == 1
+    assert result.outputs["refactorer_agent"] == "Wrote draft 2."
+    assert (output_dir / "src" / "train.py").read_text() == "def fit():\n    return 1\n"
+    assert models["reviewer"].calls == 1
+    assert not any(os.path.exists(d) for d in staging_dirs)
+
+
+class SlowFailingLlm(ReplayLlm):
+    """Fails every call after ``latency`` seconds."""
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        yield
+
+
+def test_resume_regenerates_all_candidates(tmp_path):
+    output_dir = tmp_path / "OUTPUT"
+    notebook = tmp_path / "notebook.ipynb"
+    notebook.write_text('{"cells": []}')
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    models = replay_models({
+        "parser_agent": [{"text": '{"code": "x = 1", "documentation": ""}'}],
+        "architect_agent": [{"text": '{"OUTPUT/src": {"train.py": "Training"}}'}],
+        "devops_agent": [{"text": "Nothing to do."}],
+        "reviewer_agent": [{"text": "APPROVED"}],
+    })
+    agents = create_pipeline_agents(output_dir=str(output_dir), models=models)
+    candidate_models = []
+
+    def candidate_factory(staging_dir, fail=False):
+        turns = [
+            {"function_calls": [{"name": "write_file", "args": {
+                "path": os.path.join(staging_dir, "src", "train.py"), "content": "def fit():\n    return 1\n"}}]},
+            {"text": "Wrote draft."},
+        ]
+        model = SlowFailingLlm(model="failing", turns=turns, latency=0.5) if fail else ReplayLlm(
+            model="replay", turns=turns)
+        candidate_models.append(model)
+        return create_refactorer_agent(output_dir=staging_dir, model=model)
+
+    def engine(factory, resume=False):
+        return PipelineEngine(agents=agents, output_dir=str(output_dir), candidates=2, candidate_factory=factory,
+                              checkpoints=store, resume=resume, candidate_tests=False, llm_parser=True)
+
+    # The first candidate finishes, the second one fails.
+    interrupted = engine(lambda d: candidate_factory(d, fail=len(candidate_models) == 1))
+    with pytest.raises(Exception, match="429"):
+        asyncio.run(interrupted.run(str(notebook)))
+    assert candidate_models[0].calls == 2
+    assert not os.listdir(staging_root(interrupted.run_id))
+
+    result = asyncio.run(engine(candidate_factory, resume=True).run(str(notebook)))
+    assert result.approved
+    assert [model.calls for model in candidate_models[2:]] == [2, 2]
+    assert (output_dir / "src" / "train.py").read_text() == "def fit():\n    return 1\n"
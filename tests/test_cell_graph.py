@@ -0,0 +1,171 @@
+"""
+Unit tests for the cell def-use graph and per-file refactoring.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.genai import types
+
+from src.pipeline.cell_graph import CellGraph, file_step
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.replay_llm import replay_models
+
+CODE = """# Cell 0
+import pandas as pd
+import matplotlib.pyplot as plt
+from sklearn.model_selection import train_test_split
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+
+# Cell 1
+df = pd.read_csv("data.csv")
+
+# Cell 2
+plt.hist(df["age"])
+plt.show()
+
+# Cell 3
+df["ratio"] = df["a"] / df["b"]
+df.dropna(inplace=True)
+
+# Cell 5
+def split(frame, size=0.2):
+    return train_test_split(frame.drop(columns=["y"]), frame["y"], test_size=size)
+
+X_train, X_test, y_train, y_test = split(df)
+
+# Cell 6
+clf = RandomForestClassifier(n_estimators=10)
+
+# Cell 7
+clf.fit(X_train, y_train)
+
+# Cell 8
+print(accuracy_score(y_test, clf.predict(X_test)))
+"""
+
+
+def numbers(graph, positions):
+    return [graph.cells[p].number for p in positions]
+
+
+def closure(graph, *cell_numbers):
+    positions = [p for p, cell in enumerate(graph.cells) if cell.number in cell_numbers]
+    return numbers(graph, graph.closure(positions))
+
+
+def test_defines_and_reads():
+    graph = CellGraph.from_code(CODE)
+    cells = {cell.number: cell for cell in graph.cells}
+    assert cells[0].import_only and cells[0].imports["pd"] == "import pandas as pd"
+    assert {"df"} <= cells[3].defines and "df" in cells[3].reads
+    assert "split" in cells[5].defines and "X_train" in cells[5].defines
+    assert "frame" not in cells[5].reads and "size" not in cells[5].reads
+    assert "clf" in cells[7].defines
+    assert "print" not in cells[8].reads
+
+
+def test_uses_depend_on_the_latest_definition():
+    graph = CellGraph.from_code(CODE)
+    # Evaluation reads the fitted model (cell 7), which reads the constructed one (cell 6).
+    assert closure(graph, 8) == [0, 1, 3, 5, 6, 7, 8]
+    assert closure(graph, 6) == [0, 6]
+    # Plotting is not needed by anything else.
+    assert closure(graph, 3) == [0, 1, 3]
+
+
+def test_slices_per_planned_file():
+    graph = CellGraph.from_code(CODE)
+    loader = graph.context_for("OUTPUT/src/data_loader.py", "Functions for loading the dataset")
+    assert loader == 'import pandas as pd\n\n# Cell 1\ndf = pd.read_csv("data.csv")\n'
+
+    preprocessing = graph.context_for("OUTPUT/src/preprocessing.py", "functions from the notebook: split")
+    assert "# Cell 5" in preprocessing and "RandomForestClassifier" not in preprocessing
+    assert "plt" not in preprocessing
+
+    plots = graph.context_for("OUTPUT/src/visualization.py")
+    assert "import matplotlib.pyplot as plt" in plots and "# Cell 2" in plots and "# Cell 7" not in plots
+
+    assert graph.context_for("OUTPUT/main.py", "Entry point") is None
+    assert "# Cell 6" in graph.context_for("OUTPUT/tests/test_model.py", "Unit tests for src/model.py")
+
+
+def test_file_steps():
+    assert file_step("OUTPUT/src/data_loader.py") == "load"
+    assert file_step("src/feature_engineering.py") == "preprocess"
+    assert file_step("src/metrics.py") == "evaluate"
+    assert file_step("src/utils.py") is None
+
+
+def test_unparseable_cells_stay_connected():
+    graph = CellGraph.from_code("# Cell 0\nx = 1\n\n# Cell 1\nprint(x\n")
+    assert graph.depends[1] == {0}
+
+
+def test_star_imports_are_kept_in_slices():
+    code = CODE.replace("from sklearn.metrics import accuracy_score", "from sklearn.metrics import *")
+    graph = CellGraph.from_code(code)
+    cells = {cell.number: cell for cell in graph.cells}
+    assert cells[0].star_imports == ["from sklearn.metrics import *"]
+    assert 0 in graph.depends[-1]
+    assert "from sklearn.metrics import *" in graph.context_for("OUTPUT/src/evaluate.py")
+    assert "from sklearn.metrics import *" in graph.context_for("OUTPUT/src/train.py")
+
+
+def test_nested_imports_are_definitions():
+    graph = CellGraph.from_code(
+        "# Cell 0\nimport sys\nif sys.version_info >= (3, 8):\n    import xgboost as xgb\n\n"
+        "# Cell 1\nmodel = xgb.XGBClassifier()\n"
+    )
+    assert graph.cells[0].imports["xgb"] == "import xgboost as xgb"
+    assert graph.depends[1] == {0}
+
+
+class FileLlm(BaseLlm):
+    """Refactorer that records the prompts it gets and answers 'Written.'."""
+    prompts: list = []
+    active: int = 0
+    peak: int = 0
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        self.prompts.append(llm_request.contents[-1].parts[0].text)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.02)
+        self.active -= 1
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="Written.")]))
+
+
+def test_engine_writes_planned_files_in_parallel_with_slices(tmp_path):
+    notebook = tmp_path / "nb.ipynb"
+    notebook.write_text(CODE)
+    plan = {
+        "OUTPUT/src": {"data_loader.py": "Loads data", "train.py": "Fits the model"},
+        "OUTPUT/main.py": "Entry point",
+        "OUTPUT/Dockerfile": "Container",
+    }
+    recording = {
+        "architect_agent": [{"text": json.dumps(plan)}],
+        "devops_agent": [{"text": "Written."}],
+        "reviewer_agent": [{"text": "APPROVED"}],
+    }
+    models = replay_models(recording)
+    models["refactorer"] = FileLlm(model="files", prompts=[])
+    engine = PipelineEngine(agents=create_pipeline_agents(models=models), verify=False,
+                            llm_architect=True, per_file=True)
+    result = asyncio.run(engine.run(str(notebook)))
+
+    assert result.approved
+    refactorer = models["refactorer"]
+    assert len(refactorer.prompts) == 3 and refactorer.peak == 3
+    loader = next(p for p in refactorer.prompts if "- OUTPUT/src/data_loader.py" in p)
+    assert "read_csv" in loader and "RandomForestClassifier" not in loader
+    rest = next(p for p in refactorer.prompts if "- OUTPUT/main.py" in p)
+    assert "Parsed notebook" in rest and "- OUTPUT/Dockerfile" not in rest
+    assert result.outputs["refactorer_agent"] == "Written.\n\nWritten.\n\nWritten."
@@ -0,0 +1,139 @@
+"""
+Unit tests for stage checkpoints and resuming interrupted runs.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+from src.pipeline.checkpoint import CheckpointStore, StageCheckpoint
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.replay_llm import ReplayLlm, replay_models
+
+RECORDING = {
+    "parser_agent": [{"text": '{"code": "x = 1", "documentation": "PARSED-DOCS"}'}],
+    "architect_agent": [{"text": '{"OUTPUT": {"train.py": "Training"}}'}],
+    "refactorer_agent": [{"text": "Written."}],
+    "devops_agent": [{"text": "Written."}],
+    "reviewer_agent": [{"text": "1. In file train.py, add docstrings."}, {"text": "APPROVED"}],
+}
+
+
+class FailingLlm(ReplayLlm):
+    """Replays turns, but raises on the call with index ``fail_at``."""
+    fail_at: int = 1
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        if self.calls == self.fail_at:
+            self.calls += 1
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+class RequestPlugin(BasePlugin):
+    """Records the text of every request per agent."""
+
+    def __init__(self):
+        super().__init__(name="requests")
+        self.requests = {}
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        text = " ".join(part.text for content in llm_request.contents for part in content.parts or [] if part.text)
+        self.requests.setdefault(callback_context.agent_name, []).append(text)
+        return None
+
+
+def make_engine(tmp_path, models, resume=False, plugins=None):
+    output_dir = tmp_path / "OUTPUT"
+    output_dir.mkdir(exist_ok=True)
+    (output_dir / "train.py").write_text("x = 1\n")
+    agents = create_pipeline_agents(output_dir=str(output_dir), models=models)
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    return PipelineEngine(agents=agents, output_dir=str(output_dir), checkpoints=store, resume=resume,
+                          plugins=plugins, max_rounds=3, llm_parser=True)
+
+
+@pytest.fixture
+def notebook(tmp_path):
+    path = tmp_path / "notebook.ipynb"
+    path.write_text('{"cells": []}')
+    return str(path)
+
+
+def crash_in_round_two(tmp_path, notebook):
+    models = replay_models(RECORDING)
+    models["reviewer"] = FailingLlm(model="failing", turns=RECORDING["reviewer_agent"], fail_at=1)
+    with pytest.raises(Exception, match="429"):
+        asyncio.run(make_engine(tmp_path, models).run(notebook))
+
+
+def test_resume_continues_after_last_finished_stage(tmp_path, notebook):
+    crash_in_round_two(tmp_path, notebook)
+
+    models = replay_models({**RECORDING, "reviewer_agent": [{"text": "APPROVED"}]})
+    requests = RequestPlugin()
+    result = asyncio.run(make_engine(tmp_path, models, resume=True, plugins=[requests]).run(notebook))
+
+    assert result.approved and result.rounds == 2
+    assert result.outputs["parser_agent"] == RECORDING["parser_agent"][0]["text"]
+    # Only the reviewer call of round 2 was repeated.
+    assert {role: model.calls for role, model in models.items()} == {
+        "parser": 0, "architect": 0, "refactorer": 0, "devops": 0, "reviewer": 1,
+    }
+    # The restored session gives the reviewer the earlier outputs as context.
+    assert "PARSED-DOCS" in requests.requests["reviewer_agent"][0]
+
+
+def test_without_resume_checkpoints_are_discarded(tmp_path, notebook):
+    crash_in_round_two(tmp_path, notebook)
+
+    models = replay_models(RECORDING)
+    result = asyncio.run(make_engine(tmp_path, models).run(notebook))
+    assert result.approved
+    assert models["parser"].calls == 1
+
+
+def test_changed_notebook_is_not_resumed(tmp_path, notebook):
+    crash_in_round_two(tmp_path, notebook)
+    with open(notebook, 'w') as f:
+        f.write('{"cells": [{"cell_type": "code", "source": "y = 2"}]}')
+
+    models = replay_models(RECORDING)
+    asyncio.run(make_engine(tmp_path, models, resume=True).run(notebook))
+    assert models["parser"].calls == 1
+
+
+def test_finished_run_is_replayed_without_model_calls(tmp_path, notebook):
+    asyncio.run(make_engine(tmp_path, replay_models(RECORDING)).run(notebook))
+
+    models = replay_models(RECORDING)
+    result = asyncio.run(make_engine(tmp_path, models, resume=True).run(notebook))
+    assert result.approved and result.rounds == 2
+    assert sum(model.calls for model in models.values()) == 0
+
+
+def test_store_snapshots_and_restores_missing_files(tmp_path, notebook):
+    crash_in_round_two(tmp_path, notebook)
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    run_id, _, status = store.runs()[0]
+    assert status == "running"
+    stored = store.load(run_id)
+    assert [(c.round, c.stage) for c in stored.stages][:2] == [(0, "parser_agent"), (0, "architect_agent")]
+    train = str(tmp_path / "OUTPUT" / "train.py")
+    assert stored.latest_files()[train] == "x = 1\n"
+
+    store.save_stage(run_id, StageCheckpoint(round=2, stage="devops_agent", prompt="p", output="o",
+                                             files={train: "restored\n"}))
+    models = replay_models({**RECORDING, "reviewer_agent": [{"text": "APPROVED"}]})
+    engine = make_engine(tmp_path, models, resume=True)
+    os.remove(train)  # make_engine writes a fresh train.py
+    asyncio.run(engine.run(notebook))
+    with open(train) as f:
+        assert f.read() == "restored\n"
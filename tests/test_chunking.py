@@ -0,0 +1,162 @@
+"""
+Unit tests for map-reduce processing of large notebooks.
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.genai import types
+
+from src.evaluation.evaluator import Evaluator
+from src.pipeline.chunking import chunk_sections, chunk_text, map_chunks, merge_parsed, split_sections
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.replay_llm import replay_models
+
+
+class PromptLlm(BaseLlm):
+    """Answers with ``reply(prompt)`` and counts the calls running at once."""
+    reply: object = None
+    active: int = 0
+    peak: int = 0
+    prompts: list = []
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        prompt = llm_request.contents[-1].parts[0].text
+        self.prompts.append(prompt)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.02)
+        self.active -= 1
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.reply(prompt))]))
+
+
+def cells(count, lines=5):
+    return [f"# Cell {i}\n" + "".join(f"value_{i}_{j} = {j}\n" for j in range(lines)) for i in range(count)]
+
+
+def test_sections_are_packed_in_order_within_the_budget():
+    sections = cells(10)
+    chunks = chunk_sections(sections, token_budget=60)
+    assert len(chunks) > 1
+    assert all(chunk.tokens <= 60 for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks) == "".join(sections)
+    assert [i for chunk in chunks for i in chunk.sections] == list(range(10))
+
+
+def test_oversized_sections_are_split_at_lines():
+    big = cells(1, lines=200)[0]
+    chunks = chunk_sections(["# Cell 0\nx = 1\n", big, "# Cell 2\ny = 2\n"], token_budget=100)
+    assert all(chunk.tokens <= 100 for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks) == "# Cell 0\nx = 1\n" + big + "# Cell 2\ny = 2\n"
+    assert all(chunk.text.endswith("\n") for chunk in chunks)
+    with pytest.raises(ValueError):
+        chunk_sections(["x"], token_budget=0)
+
+
+def test_text_is_split_at_cell_markers():
+    text = "<!-- Cell 0 -->\n# Title\n\n# Cell 1\nimport os\n# Cell 2\nx = 1\n"
+    assert split_sections(text) == ["<!-- Cell 0 -->\n# Title\n\n", "# Cell 1\nimport os\n", "# Cell 2\nx = 1\n"]
+    assert [chunk.sections for chunk in chunk_text(text, token_budget=8)] == [[0], [1, 2]]
+
+
+def test_map_keeps_order_and_bounds_concurrency():
+    active = peak = 0
+
+    async def work(item):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01 * (5 - item))
+        active -= 1
+        return item * 2
+
+    assert asyncio.run(map_chunks(range(5), work, concurrency=2)) == [0, 2, 4, 6, 8]
+    assert peak == 2
+
+
+def test_merge_parsed():
+    merged = merge_parsed(['```json\n{"code": "# Cell 0\\na = 1", "documentation": "Intro"}\n```',
+                           '{"code": "# Cell 1\\nb = 2", "documentation": ""}'])
+    assert json.loads(merged) == {"code": "# Cell 0\na = 1\n\n# Cell 1\nb = 2", "documentation": "Intro"}
+    assert merge_parsed(['{"code": "a"}', "SECURITY ALERT"]) == '{"code": "a"}\n\nSECURITY ALERT'
+
+
+def parse_chunk(prompt):
+    found = re.findall(r"^# Cell (\d+) \(code\)\n(.*)$", prompt, re.MULTILINE)
+    return json.dumps({"code": "\n".join(f"# Cell {i}\n{line}" for i, line in found), "documentation": ""})
+
+
+def test_engine_parses_large_notebooks_in_parallel_chunks(tmp_path):
+    notebook = tmp_path / "nb.ipynb"
+    notebook.write_text("".join(f"# Cell {i}\nvalue_{i} = {i}\n\n" for i in range(40)))
+    recording = {
+        "architect_agent": [{"text": '{"OUTPUT/src": {"main.py": "Everything"}}'}],
+        "refactorer_agent": [{"text": "Written."}],
+        "devops_agent": [{"text": "Written."}],
+        "reviewer_agent": [{"text": "APPROVED"}],
+    }
+    models = replay_models(recording)
+    models["parser"] = PromptLlm(model="prompt", reply=parse_chunk, prompts=[])
+    engine = PipelineEngine(agents=create_pipeline_agents(models=models), verify=False,
+                            llm_parser=True, chunk_tokens=50)
+    result = asyncio.run(engine.run(str(notebook)))
+
+    assert result.approved
+    parser = models["parser"]
+    assert len(parser.prompts) > 2 and parser.peak > 1
+    code = json.loads(result.outputs["parser_agent"])["code"]
+    assert re.findall(r"^value_\d+", code, re.MULTILINE) == [f"value_{i}" for i in range(40)]
+
+
+def test_engine_keeps_small_notebooks_in_one_parser_call(tmp_path):
+    notebook = tmp_path / "nb.ipynb"
+    notebook.write_text("# Cell 1\nx = 1\n")
+    recording = {
+        "parser_agent": [{"text": '{"code": "x = 1", "documentation": ""}'}],
+        "architect_agent": [{"text": '{"OUTPUT/src": {"main.py": "Everything"}}'}],
+    }
+    engine = PipelineEngine(agents=create_pipeline_agents(models=replay_models(recording)), llm_parser=True)
+    assert [stage.name for stage in engine.planning_stages(str(notebook))] == ["parser_agent", "architect_agent"]
+
+
+def verdict(prompt):
+    score = 0.2 if "os.system" in prompt else 1.0
+    return json.dumps({"score": score, "reason": "unsafe" if score < 1 else "fine"})
+
+
+def test_evaluator_scores_every_chunk_instead_of_truncating():
+    files = "".join(f"\n# File: module_{i}.py\n" + "x = 1\n" * 50 for i in range(8))
+    files += "\n# File: last.py\nimport os\nos.system('rm -rf /tmp/x')\n"
+    model = PromptLlm(model="prompt", reply=verdict, prompts=[])
+    evaluator = Evaluator(google_api_key=None, model=model, chunk_tokens=200)
+    result = evaluator.evaluate_safety(files)
+    assert result["score"] == 0.2
+    assert "unsafe" in result["reason"]
+    assert len(model.prompts) > 1 and model.peak > 1
+    assert "".join(model.prompts).count("# File: ") == 9
+
+
+def test_evaluator_summarizes_long_notebooks_once():
+    notebook = "".join(f"# Cell {i}\n" + "y = 2\n" * 30 for i in range(10))
+
+    def reply(prompt):
+        if prompt.strip().startswith("Summarize"):
+            return "A summary."
+        return json.dumps({"score": 0.8, "reason": "ok"})
+
+    model = PromptLlm(model="prompt", reply=reply, prompts=[])
+    evaluator = Evaluator(google_api_key=None, model=model, chunk_tokens=200)
+    assert evaluator.evaluate_response_match(notebook, "x = 1\n")["score"] == 0.8
+    assert evaluator.evaluate_hallucinations(notebook, "x = 1\n")["score"] == 0.8
+    summaries = [p for p in model.prompts if p.strip().startswith("Summarize")]
+    assert len(summaries) > 1
+    assert all("A summary." in p for p in model.prompts if "Generated Code" in p)
+    assert len(model.prompts) == len(summaries) + 2
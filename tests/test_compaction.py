@@ -0,0 +1,88 @@
+"""
+Unit tests for session history compaction.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk.events import Event
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+
+from src.pipeline.compaction import compact_events, summarize_payload
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.replay_llm import estimate_tokens, replay_models
+
+
+class PromptSizePlugin(BasePlugin):
+    """Records the size of every refactorer request."""
+
+    def __init__(self):
+        super().__init__(name="prompt_size")
+        self.sizes = []
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        if callback_context.agent_name == "refactorer_agent":
+            self.sizes.append(len(str([c.model_dump() for c in llm_request.contents])))
+        return None
+
+
+def run_pipeline(tmp_path, history_budget):
+    big_file = "x = 1\n" * 2000
+    recording = {
+        "parser_agent": [{"text": '{"code": "x = 1", "documentation": ""}'}],
+        "architect_agent": [{"text": '{"OUTPUT/src": {"train.py": "Training"}}'}],
+        "refactorer_agent": [
+            {"function_calls": [{"name": "write_file", "args": {"path": str(tmp_path / "train.py"), "content": big_file}}]},
+            {"text": "Written."},
+        ],
+        "devops_agent": [{"text": "Nothing to do."}],
+        "reviewer_agent": [{"text": "1. In file train.py, add docstrings."}],
+    }
+    agents = create_pipeline_agents(output_dir=str(tmp_path), models=replay_models(recording))
+    sizes = PromptSizePlugin()
+    engine = PipelineEngine(agents=agents, plugins=[sizes], history_budget=history_budget, max_rounds=3,
+                            llm_parser=True)
+    result = asyncio.run(engine.run("notebook.ipynb"))
+    return result, sizes.sizes, engine
+
+
+def test_prompt_size_stops_growing_with_compaction(tmp_path):
+    _, uncompacted, _ = run_pipeline(tmp_path, history_budget=None)
+    _, compacted, _ = run_pipeline(tmp_path, history_budget=4000)
+
+    # Two refactorer model calls per round; compare the first call of rounds 2 and 3.
+    assert uncompacted[4] > uncompacted[2]
+    assert compacted[4] <= compacted[2] * 1.05
+    assert compacted[4] < uncompacted[4] / 4
+
+
+def test_only_latest_reviewer_feedback_is_kept(tmp_path):
+    result, _, engine = run_pipeline(tmp_path, history_budget=100000)
+    assert not result.approved
+
+    session = asyncio.run(engine.session_service.get_session(
+        app_name="notebook_to_code_pipeline", user_id=engine.user_id, session_id=engine.session_id))
+    reviewer_invocations = {e.invocation_id for e in session.events if e.author == "reviewer_agent"}
+    # Compaction ran before round 3, so only round 2's review and round 3's review remain.
+    assert len(reviewer_invocations) == 2
+    refactorer_invocations = {e.invocation_id for e in session.events if e.author == "refactorer_agent"}
+    assert len(refactorer_invocations) == 2
+
+
+def test_only_latest_verifier_feedback_is_kept():
+    events = [
+        Event(invocation_id=f"verifier-{n}", author="verifier",
+              content=types.Content(role="model", parts=[types.Part(text=f"Static checks failed ({n})")]))
+        for n in range(3)
+    ]
+    assert [e.invocation_id for e in compact_events(events, token_budget=100000)] == ["verifier-2"]
+
+
+def test_summarize_payload_is_short():
+    summary = summarize_payload("import os\n" + "y = 2\n" * 10000)
+    assert "sha256:" in summary
+    assert estimate_tokens(summary) < 50
@@ -0,0 +1,80 @@
+"""
+Unit tests for the async pipeline engine.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from typing import AsyncGenerator
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk import Agent
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai import types
+
+from src.pipeline.engine import PipelineEngine, Stage, run_stage_graph
+
+
+class EchoLlm(BaseLlm):
+    """Answers every request with a fixed text after a short delay."""
+    reply: str = "ok"
+    delay: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.delay)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.reply)]))
+
+
+def make_agent(name, reply="ok", delay=0.0):
+    return Agent(model=EchoLlm(model="echo", reply=reply, delay=delay), name=name, instruction="test")
+
+
+def test_independent_stages_run_concurrently():
+    async def run():
+        service = InMemorySessionService()
+        await service.create_session(app_name="test_app", user_id="u", session_id="s")
+        stages = [
+            Stage("first", make_agent("first", "a", delay=0.2), "go"),
+            Stage("second", make_agent("second", "b", delay=0.2), "go"),
+            Stage("third", make_agent("third", "c"), lambda results: results["first"] + results["second"],
+                  depends_on=("first", "second")),
+        ]
+        # Warm up the ADK runner machinery so the timing below only covers the stages.
+        await run_stage_graph([Stage("warmup", make_agent("warmup"), "go")], service, "u", "s", app_name="test_app")
+        start = time.perf_counter()
+        results = await run_stage_graph(stages, service, "u", "s", app_name="test_app")
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+    assert {k: results[k] for k in ("first", "second", "third")} == {"first": "a", "second": "b", "third": "c"}
+    assert elapsed < 0.35
+
+
+def test_cycle_is_rejected():
+    stages = [
+        Stage("a", None, "x", depends_on=("b",)),
+        Stage("b", None, "x", depends_on=("a",)),
+    ]
+    try:
+        asyncio.run(run_stage_graph(stages, InMemorySessionService(), "u", "s"))
+    except ValueError as e:
+        assert "cycle" in str(e)
+    else:
+        raise AssertionError("Expected a ValueError for a dependency cycle")
+
+
+def test_engine_stops_on_approval():
+    engine = PipelineEngine(agents={
+        "parser": make_agent("parser_agent", '{"code": "", "documentation": ""}'),
+        "architect": make_agent("architect_agent", "{}"),
+        "refactorer": make_agent("refactorer_agent", "done"),
+        "devops": make_agent("devops_agent", "done"),
+        "reviewer": make_agent("reviewer_agent", "APPROVED"),
+    })
+    result = asyncio.run(engine.run("sample_notebook.ipynb"))
+    assert result.approved
+    assert result.rounds == 1
+    assert result.outputs["devops_agent"] == "done"
@@ -0,0 +1,104 @@
+"""
+Unit tests for reviewer feedback parsing and targeted regeneration.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.pipeline.feedback import build_regeneration_prompt, is_devops_file, parse_feedback, split_items
+from src.replay_llm import replay_models
+
+FEEDBACK = """Here is my feedback:
+1. In file OUTPUT/src/train.py, function fit has no docstring.
+2. train.py and model.py duplicate the preprocessing code.
+3. In Dockerfile, pin the base image version.
+4. Add tests in OUTPUT/tests/test_model.py.
+5. Consider adding type hints everywhere.
+"""
+
+
+class RequestPlugin(BasePlugin):
+    """Records the contents of every request per agent."""
+
+    def __init__(self):
+        super().__init__(name="requests")
+        self.requests = {}
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        text = " ".join(part.text for content in llm_request.contents for part in content.parts or [] if part.text)
+        self.requests.setdefault(callback_context.agent_name, []).append(text)
+        return None
+
+
+def test_parse_feedback_groups_items_by_file():
+    known = ["OUTPUT/src/train.py", "OUTPUT/src/model.py", "OUTPUT/Dockerfile", "OUTPUT/README.md"]
+    plan = parse_feedback(FEEDBACK, "OUTPUT", known)
+
+    assert [len(plan.work_items[p]) for p in ("OUTPUT/src/train.py", "OUTPUT/src/model.py")] == [2, 1]
+    assert plan.work_items["OUTPUT/Dockerfile"][0].startswith("3.")
+    assert os.path.join("OUTPUT", "tests", "test_model.py") in plan.work_items
+    assert "OUTPUT/README.md" not in plan.work_items
+    assert plan.general == ["5. Consider adding type hints everywhere."]
+
+
+def test_split_items_without_list():
+    assert split_items("APPROVED") == ["APPROVED"]
+    assert split_items("") == []
+
+
+def test_is_devops_file():
+    assert is_devops_file("OUTPUT/Dockerfile")
+    assert is_devops_file("OUTPUT/.github/workflows/ci.yml")
+    assert not is_devops_file("OUTPUT/src/train.py")
+
+
+def test_regeneration_prompt_contains_current_content(tmp_path):
+    path = tmp_path / "train.py"
+    path.write_text("def fit():\n    pass\n")
+    prompt = build_regeneration_prompt({str(path): ["1. Add a docstring."], str(tmp_path / "new.py"): ["2. Add it."]})
+    assert "def fit():" in prompt
+    assert "does not exist yet" in prompt
+
+
+def run_pipeline(tmp_path, incremental):
+    for name in ("train.py", "model.py"):
+        (tmp_path / name).write_text(f"# {name}\nx = 1\n")
+    recording = {
+        "parser_agent": [{"text": '{"code": "x = 1", "documentation": ""}'}],
+        "architect_agent": [{"text": '{"OUTPUT": {"train.py": "Training", "model.py": "Model"}}'}],
+        "refactorer_agent": [{"text": "Written."}],
+        "devops_agent": [{"text": "Written."}],
+        "reviewer_agent": [{"text": "1. In file train.py, add docstrings."}, {"text": "APPROVED"}],
+    }
+    agents = create_pipeline_agents(output_dir=str(tmp_path), models=replay_models(recording))
+    requests = RequestPlugin()
+    engine = PipelineEngine(agents=agents, plugins=[requests], max_rounds=2,
+                            output_dir=str(tmp_path), incremental=incremental, llm_parser=True)
+    result = asyncio.run(engine.run("notebook.ipynb"))
+    return result, requests.requests
+
+
+def test_second_round_regenerates_only_flagged_file(tmp_path):
+    result, requests = run_pipeline(tmp_path, incremental=True)
+    assert result.approved and result.rounds == 2
+
+    round_two = requests["refactorer_agent"][1]
+    assert "# train.py" in round_two
+    assert "# model.py" not in round_two
+    # Isolated session: none of the parser or round 1 history is re-sent.
+    assert "x = 1\", \"documentation\"" not in round_two
+    # DevOps had no flagged files, so it only ran in round 1.
+    assert len(requests["devops_agent"]) == 1
+
+
+def test_full_regeneration_reruns_every_agent(tmp_path):
+    result, requests = run_pipeline(tmp_path, incremental=False)
+    assert result.approved
+    assert len(requests["devops_agent"]) == 2
+    assert "# train.py" not in requests["refactorer_agent"][1]
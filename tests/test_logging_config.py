@@ -0,0 +1,141 @@
+"""
+Unit tests for the queued JSONL logging setup.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk import Agent
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai import types
+
+from src.pipeline.engine import Stage, run_stage_graph
+from src.utils.logging_config import (
+    DEFAULT_LIBRARY_LEVELS, configure_logging, log_context, parse_levels, prune_logs,
+)
+
+
+class EchoLlm(BaseLlm):
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        logging.getLogger("tests.model").info("model called")
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="ok")]))
+
+
+@pytest.fixture
+def logging_session(tmp_path):
+    root = logging.getLogger()
+    saved_level = root.level
+    sessions = []
+
+    def start(**kwargs):
+        session = configure_logging(str(tmp_path / "logs"), **kwargs)
+        sessions.append(session)
+        return session
+
+    yield start
+    for session in sessions:
+        session.stop()
+    root.setLevel(saved_level)
+    for name in DEFAULT_LIBRARY_LEVELS:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+
+def read_records(session):
+    session.stop()
+    with open(session.path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_are_json_lines_with_context(logging_session):
+    session = logging_session()
+    logger = logging.getLogger("tests.pipeline")
+
+    async def run():
+        with log_context(run="r1", round=2):
+            with log_context(stage="refactorer_agent"):
+                await asyncio.to_thread(logger.info, "from a thread %s", "x")
+            logger.warning("round level")
+        logger.info("outside")
+
+    asyncio.run(run())
+    records = read_records(session)
+    assert records[0]["msg"] == "from a thread x"
+    assert (records[0]["run"], records[0]["round"], records[0]["stage"]) == ("r1", 2, "refactorer_agent")
+    assert records[1]["level"] == "WARNING" and "stage" not in records[1]
+    assert "run" not in records[2]
+
+
+def test_exceptions_are_kept_out_of_the_message(logging_session):
+    session = logging_session()
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logging.getLogger("tests").exception("failed")
+    record = read_records(session)[0]
+    assert record["msg"] == "failed"
+    assert "RuntimeError: boom" in record["exc"]
+
+
+def test_library_debug_records_are_dropped(logging_session):
+    session = logging_session(library_levels=parse_levels("httpx=INFO"))
+    logging.getLogger("google_adk.runners").debug("noise")
+    logging.getLogger("google_adk.runners").warning("adk warning")
+    logging.getLogger("httpx").info("request sent")
+    logging.getLogger("src.pipeline").debug("own debug")
+    messages = [r["msg"] for r in read_records(session)]
+    assert messages == ["adk warning", "request sent", "own debug"]
+
+
+def test_log_file_rotates(logging_session):
+    session = logging_session(max_bytes=2000, backup_count=2)
+    for i in range(200):
+        logging.getLogger("tests").info("line %d %s", i, "x" * 50)
+    session.stop()
+    names = sorted(os.listdir(os.path.dirname(session.path)))
+    assert os.path.basename(session.path) + ".1" in names
+    assert os.path.basename(session.path) + ".3" not in names
+    assert os.path.getsize(session.path) <= 2000
+
+
+def test_prune_logs_removes_oldest_files(tmp_path):
+    for i, name in enumerate(["old.jsonl", "mid.json", "new.jsonl"]):
+        path = tmp_path / name
+        path.write_text("x" * 100)
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    deleted = prune_logs(str(tmp_path), retain_bytes=200, keep=[str(tmp_path / "old.jsonl")])
+    assert [os.path.basename(p) for p in deleted] == ["mid.json"]
+    assert sorted(os.listdir(tmp_path)) == ["new.jsonl", "old.jsonl"]
+
+
+def test_parse_levels():
+    assert parse_levels("google_adk=debug, httpx=INFO") == {"google_adk": logging.DEBUG, "httpx": logging.INFO}
+    assert parse_levels(None) == {}
+    with pytest.raises(ValueError):
+        parse_levels("google_adk")
+    with pytest.raises(ValueError):
+        parse_levels("httpx=LOUD")
+
+
+def test_stage_records_carry_stage_and_round(logging_session):
+    session = logging_session()
+
+    async def run():
+        service = InMemorySessionService()
+        await service.create_session(app_name="test_app", user_id="u", session_id="s")
+        agent = Agent(model=EchoLlm(model="echo"), name="parser_agent", instruction="test")
+        with log_context(run="run-1", round=0):
+            await run_stage_graph([Stage("parser_agent", agent, "go")], service, "u", "s", app_name="test_app")
+
+    asyncio.run(run())
+    records = [r for r in read_records(session) if r["msg"] == "model called"]
+    assert records and records[0]["stage"] == "parser_agent"
+    assert (records[0]["run"], records[0]["round"]) == ("run-1", 0)
@@ -0,0 +1,65 @@
+"""
+Unit tests for the shared model registry.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.architect_agent import create_architect_agent
+from agents.reviewer_agent import create_reviewer_agent
+from src.model_registry import ModelRegistry, get_registry
+
+
+def test_same_model_is_shared():
+    registry = ModelRegistry()
+    model = registry.get("gemini-2.0-flash", api_key="key-a")
+    assert registry.get("gemini-2.0-flash", api_key="key-a") is model
+    assert registry.get("gemini-2.0-flash", api_key="key-b") is not model
+    assert registry.get("gemini-1.5-pro", api_key="key-a") is not model
+    assert len(registry) == 3
+
+
+def test_concurrent_get_creates_one_model():
+    registry = ModelRegistry()
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        models = list(pool.map(lambda _: registry.get(api_key="key"), range(64)))
+    assert all(model is models[0] for model in models)
+    assert len(registry) == 1
+
+
+def test_api_key_is_not_written_to_environment(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    first = create_architect_agent(api_key="secret-key")
+    second = create_reviewer_agent(api_key="secret-key")
+    assert "GOOGLE_API_KEY" not in os.environ
+    assert first.model is second.model
+    assert first.model.api_client is second.model.api_client
+    get_registry().clear()
+
+
+def test_missing_api_key_raises(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    with pytest.raises(ValueError):
+        ModelRegistry().get()
+
+
+def test_run_sync_reuses_one_loop():
+    registry = ModelRegistry()
+
+    async def current():
+        return asyncio.get_running_loop(), threading.current_thread()
+
+    first = registry.run_sync(current())
+    second = registry.run_sync(current())
+    assert first == second
+    assert first[1] is not threading.current_thread()
+    registry.clear()
+    assert registry.run_sync(current())[0] is not first[0]
+    registry.clear()
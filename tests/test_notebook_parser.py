@@ -0,0 +1,113 @@
+"""
+Unit tests for the local notebook parser.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import nbformat
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.pipeline.notebook_parser import parse_notebook, parse_notebook_json
+from src.replay_llm import replay_models
+
+
+class RequestPlugin(BasePlugin):
+    """Records the contents of every request per agent."""
+
+    def __init__(self):
+        super().__init__(name="requests")
+        self.requests = {}
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        text = " ".join(part.text for content in llm_request.contents for part in content.parts or [] if part.text)
+        self.requests.setdefault(callback_context.agent_name, []).append(text)
+        return None
+
+
+@pytest.fixture
+def notebook(tmp_path, write_notebook):
+    return write_notebook(tmp_path / "nb.ipynb", [
+        nbformat.v4.new_markdown_cell("# Title\nSome context."),
+        nbformat.v4.new_code_cell("%matplotlib inline\n!pip install pandas\nimport pandas as pd"),
+        nbformat.v4.new_code_cell(""),
+        nbformat.v4.new_raw_cell("raw text"),
+        nbformat.v4.new_markdown_cell("## Training"),
+        nbformat.v4.new_code_cell("df = pd.DataFrame()\nprint(df)"),
+    ])
+
+
+def test_code_and_documentation_keep_cell_indices(notebook):
+    parsed = parse_notebook(notebook)
+    assert parsed["code"] == (
+        "# Cell 1\n# %matplotlib inline\n# !pip install pandas\nimport pandas as pd\n\n"
+        "# Cell 5\ndf = pd.DataFrame()\nprint(df)\n"
+    )
+    assert parsed["documentation"] == "<!-- Cell 0 -->\n# Title\nSome context.\n\n<!-- Cell 4 -->\n## Training\n"
+    assert "raw text" not in parsed["code"] + parsed["documentation"]
+
+
+def test_extracted_code_compiles(notebook):
+    compile(parse_notebook(notebook)["code"], "nb", "exec")
+
+
+def test_cell_magics_are_commented_out(tmp_path, write_notebook):
+    path = write_notebook(tmp_path / "magic.ipynb", [nbformat.v4.new_code_cell("%%bash\necho hi")])
+    assert parse_notebook(path)["code"] == "# Cell 0\n# %%bash\n# echo hi\n"
+
+
+def test_json_matches_parser_agent_format(notebook):
+    assert set(json.loads(parse_notebook_json(notebook))) == {"code", "documentation"}
+
+
+def test_unreadable_notebook_raises(tmp_path):
+    path = tmp_path / "broken.ipynb"
+    path.write_text("not json")
+    with pytest.raises(ValueError):
+        parse_notebook(str(path))
+    with pytest.raises(ValueError):
+        parse_notebook(str(tmp_path / "missing.ipynb"))
+
+
+def test_engine_parses_locally_without_a_model_call(notebook, tmp_path):
+    recording = {
+        "architect_agent": [{"text": '{"OUTPUT": {"train.py": "Training"}}'}],
+        "refactorer_agent": [{"text": "Written."}],
+        "devops_agent": [{"text": "Written."}],
+        "reviewer_agent": [{"text": "APPROVED"}],
+    }
+    models = replay_models(recording)
+    requests = RequestPlugin()
+    engine = PipelineEngine(agents=create_pipeline_agents(output_dir=str(tmp_path / "out"), models=models),
+                            plugins=[requests], verify=False)
+    result = asyncio.run(engine.run(notebook))
+
+    assert result.approved
+    assert "parser_agent" not in requests.requests
+    assert models["parser"].calls == 0
+    assert json.loads(result.outputs["parser_agent"]) == parse_notebook(notebook)
+    # The architect sees the parsed notebook in the shared session history.
+    assert "df = pd.DataFrame()" in requests.requests["architect_agent"][0]
+
+
+def test_cell_marked_scripts_are_read(tmp_path):
+    path = tmp_path / "script.ipynb"
+    path.write_text("# Cell 1\nimport os\n\n# %% [markdown]\n# ## Notes\n# Plain text.\n\n# %%\n%time x = 1\n")
+    parsed = parse_notebook(str(path))
+    assert parsed["code"] == "# Cell 0\nimport os\n\n# Cell 2\n# %time x = 1\n"
+    assert parsed["documentation"] == "<!-- Cell 1 -->\n## Notes\nPlain text.\n"
+
+
+@pytest.mark.parametrize("name", ["original_notebook.ipynb", "logistic_regression_experiment.ipynb"])
+def test_repository_notebooks_parse(name):
+    path = os.path.join(os.path.dirname(__file__), '..', 'notebooks', name)
+    code = parse_notebook(path)["code"]
+    assert code.startswith("# Cell 0\n")
+    compile(code, name, "exec")
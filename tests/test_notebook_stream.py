@@ -0,0 +1,99 @@
+"""
+Unit tests for the streaming notebook reader.
+"""
+
+import base64
+import json
+import os
+import sys
+import tracemalloc
+
+import nbformat
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.pipeline.notebook_parser import read_cells
+from src.pipeline.notebook_stream import NotebookFormatError, NotJSONError, iter_cells
+from src.tools.notebook_tools import read_notebook
+
+
+def image_output(size):
+    png = base64.b64encode(os.urandom(size)).decode("ascii")
+    return nbformat.v4.new_output("display_data", data={"image/png": png, "text/plain": "<Figure>"})
+
+
+@pytest.fixture
+def notebook(tmp_path, write_notebook):
+    code = nbformat.v4.new_code_cell('s = "quote \\" and backslash \\\\"\nprint(s)  # {[', execution_count=1)
+    code.outputs = [image_output(3000), nbformat.v4.new_output("stream", text='"}]\\')]
+    markdown = nbformat.v4.new_markdown_cell("# Title ✓")
+    markdown["attachments"] = {"a.png": {"image/png": base64.b64encode(b"x" * 500).decode()}}
+    return write_notebook(tmp_path / "nb.ipynb", [
+        markdown, code, nbformat.v4.new_raw_cell("raw"), nbformat.v4.new_code_cell(""),
+    ], metadata={"widgets": {"state": {"x": "]}"}}})
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64, 1 << 20])
+def test_cells_match_nbformat(notebook, block_size):
+    expected = [(cell.cell_type, cell.source) for cell in nbformat.read(notebook, as_version=4).cells]
+    cells = list(iter_cells(notebook, block_size=block_size))
+    assert [(cell.cell_type, cell.source) for cell in cells] == expected
+    assert [cell.index for cell in cells] == [0, 1, 2, 3]
+
+
+def test_cells_after_metadata_and_list_sources(tmp_path):
+    path = tmp_path / "nb.ipynb"
+    path.write_text(json.dumps({
+        "metadata": {"kernelspec": {"name": "python3"}}, "nbformat": 4, "nbformat_minor": 5,
+        "cells": [{"cell_type": "code", "source": ["import os\n", "print(1.5e3)"], "outputs": [],
+                   "metadata": {}, "execution_count": 12345678901234567890}],
+    }, indent=1))
+    assert [(c.cell_type, c.source) for c in iter_cells(str(path), block_size=3)] == [
+        ("code", "import os\nprint(1.5e3)")
+    ]
+
+
+def test_cells_are_yielded_lazily(tmp_path):
+    path = tmp_path / "nb.ipynb"
+    path.write_text('{"cells": [{"cell_type": "code", "source": "x = 1"}, {"cell_type": ')
+    cells = iter_cells(str(path), block_size=16)
+    assert next(cells).source == "x = 1"
+    with pytest.raises(NotebookFormatError):
+        next(cells)
+
+
+def test_invalid_notebooks(tmp_path):
+    path = tmp_path / "nb.ipynb"
+    path.write_text("# Cell 1\nx = 1")
+    with pytest.raises(NotJSONError):
+        list(iter_cells(str(path)))
+    path.write_text('{"worksheets": [], "nbformat": 3}')
+    with pytest.raises(NotebookFormatError):
+        list(iter_cells(str(path)))
+    # nbformat is the fallback for what the streaming reader does not handle, and rejects this too.
+    with pytest.raises(ValueError):
+        read_cells(str(path))
+
+
+def test_outputs_are_not_held_in_memory(tmp_path, write_notebook):
+    cells = [nbformat.v4.new_code_cell(f"plot({i})") for i in range(20)]
+    for cell in cells:
+        cell.outputs = [image_output(1 << 20)]
+    path = write_notebook(tmp_path / "plots.ipynb", cells)
+    assert os.path.getsize(path) > 25 * (1 << 20)
+
+    tracemalloc.start()
+    try:
+        sources = [cell.source for cell in iter_cells(path)]
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert sources == [f"plot({i})" for i in range(20)]
+    assert peak < 8 * (1 << 20)
+
+
+def test_read_notebook_tool_uses_the_stream(notebook):
+    text = read_notebook(notebook)
+    assert text.startswith('# Cell 1\ns = "quote \\" and backslash \\\\"')
+    assert "image/png" not in text and "# Cell 2\n\n" in text
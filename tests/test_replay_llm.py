@@ -0,0 +1,51 @@
+"""
+Unit tests for the offline replay model.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+
+from agents.refactorer_agent import create_refactorer_agent
+from src.pipeline.engine import run_agent
+from src.replay_llm import RecordingPlugin, ReplayLlm
+
+
+def run_refactorer(model, plugins=None):
+    async def run():
+        service = InMemorySessionService()
+        await service.create_session(app_name="test_app", user_id="u", session_id="s")
+        agent = create_refactorer_agent(model=model)
+        return await run_agent(agent, "Generate the code.", service, "u", "s", app_name="test_app", plugins=plugins)
+    return asyncio.run(run())
+
+
+def test_replays_tool_calls_and_text(tmp_path):
+    target = str(tmp_path / "out" / "train.py")
+    model = ReplayLlm(model="replay", turns=[
+        {"function_calls": [{"name": "write_file", "args": {"path": target, "content": "print('hi')\n"}}]},
+        {"text": "Done."},
+    ])
+    recorder = RecordingPlugin()
+
+    text = run_refactorer(model, plugins=[recorder])
+
+    assert text == "Done."
+    assert model.calls == 2
+    with open(target) as f:
+        assert f.read() == "print('hi')\n"
+    assert recorder.recording["refactorer_agent"] == model.turns
+
+
+def test_turns_cycle_and_latency_applies():
+    model = ReplayLlm(model="replay", turns=[{"text": "first"}, {"text": "second"}], latency=0.05)
+    start = time.perf_counter()
+    assert run_refactorer(model) == "first"
+    assert time.perf_counter() - start >= 0.05
+    assert run_refactorer(model) == "second"
+    assert run_refactorer(model) == "first"
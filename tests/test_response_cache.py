@@ -0,0 +1,70 @@
+"""
+Unit tests for the on-disk LLM response cache.
+"""
+
+import asyncio
+import os
+import sys
+from typing import AsyncGenerator
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk import Agent
+from google.adk.models import BaseLlm, LlmResponse
+from google.genai import types
+
+from src.callbacks.response_cache import ResponseCache, ResponseCachePlugin
+from src.pipeline.engine import PipelineEngine
+
+
+class CountingLlm(BaseLlm):
+    """Returns a fixed text and counts how often it was called."""
+    reply: str = "ok"
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.reply)]))
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path), max_bytes=25)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    assert cache.get("a") == "x" * 10  # "a" is now the most recently used entry
+    cache.put("c", "z" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_disabled_cache_never_hits(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path / "off"), enabled=False)
+    cache.put("a", "x")
+    assert cache.get("a") is None
+    assert not os.path.exists(tmp_path / "off")
+
+
+def test_rerun_is_served_from_cache(tmp_path):
+    models = {}
+
+    def run_once():
+        for role in ("parser", "architect", "refactorer", "devops", "reviewer"):
+            models[role] = CountingLlm(model="counting", reply="APPROVED" if role == "reviewer" else "done")
+        agents = {
+            role: Agent(model=model, name=f"{role}_agent", instruction=f"You are the {role}.")
+            for role, model in models.items()
+        }
+        cache = ResponseCache(cache_dir=str(tmp_path))
+        engine = PipelineEngine(agents=agents, plugins=[ResponseCachePlugin(cache)], llm_parser=True)
+        asyncio.run(engine.run("sample_notebook.ipynb"))
+        return cache
+
+    first = run_once()
+    assert first.stats()["hits"] == 0
+    second = run_once()
+    assert second.stats()["hits"] == 5
+    assert all(model.calls == 0 for model in models.values())
@@ -0,0 +1,74 @@
+"""
+Unit tests for per-agent model routing.
+"""
+
+import json
+import os
+import sys
+
+import nbformat
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.pipeline.engine import create_pipeline_agents
+from src.pipeline.routing import (
+    ModelTier, NotebookStats, RoutingConfig, load_routing_config, measure_notebook, route_models,
+)
+
+SAMPLE_NOTEBOOK = os.path.join(os.path.dirname(__file__), '..', 'sample_notebook.ipynb')
+
+
+def test_measure_notebook(tmp_path, write_notebook):
+    path = tmp_path / "nb.ipynb"
+    write_notebook(path, [nbformat.v4.new_markdown_cell("# Title"), "import os\nfrom sys import argv\n",
+                          "x = 1  # import nothing\n"])
+    stats = measure_notebook(str(path))
+    assert (stats.cells, stats.code_cells, stats.imports) == (3, 2, 2)
+    assert stats.code_tokens > 0
+
+
+def test_small_notebook_uses_fastest_tier_everywhere():
+    decisions = route_models(measure_notebook(SAMPLE_NOTEBOOK))
+    assert {d.model for d in decisions.values()} == {"gemini-2.0-flash"}
+    assert {d.tier for d in decisions.values()} == {"fast"}
+
+
+def test_large_notebook_uses_bigger_model_only_where_needed():
+    stats = NotebookStats(cells=300, code_cells=250, code_tokens=150_000, imports=50)
+    decisions = route_models(stats)
+    assert decisions["refactorer"].model == "gemini-1.5-pro"
+    assert decisions["parser"].model == "gemini-1.5-pro"
+    # DevOps only sees a quarter of the notebook, which fits the fast tier.
+    assert decisions["devops"].model == "gemini-2.0-flash"
+
+
+def test_config_file_overrides_defaults(tmp_path):
+    path = tmp_path / "routing.json"
+    path.write_text(json.dumps({
+        "tiers": [{"name": "tiny", "model": "gemini-2.0-flash", "max_cells": 1},
+                  {"name": "rest", "model": "gemini-1.5-flash"}],
+        "pinned": {"reviewer": "gemini-1.5-pro"},
+    }))
+    config = load_routing_config(str(path))
+    decisions = route_models(NotebookStats(cells=5), config)
+    assert decisions["parser"].model == "gemini-1.5-flash"
+    assert decisions["reviewer"].model == "gemini-1.5-pro"
+    assert decisions["reviewer"].tier == "pinned"
+    assert config.agent_load["devops"] == 0.25
+
+
+def test_unsupported_model_is_rejected():
+    with pytest.raises(ValueError):
+        RoutingConfig(tiers=[ModelTier("x", "gpt-4")])
+    with pytest.raises(ValueError):
+        RoutingConfig(pinned={"tester": "gemini-2.0-flash"})
+
+
+def test_routed_models_are_used_by_agents():
+    agents = create_pipeline_agents(api_key="test-key", model_names={
+        "parser": "gemini-1.5-pro", "reviewer": "gemini-2.0-flash",
+    })
+    assert agents["parser"].model.model == "gemini-1.5-pro"
+    assert agents["reviewer"].model.model == "gemini-2.0-flash"
+    assert agents["reviewer"].model is agents["architect"].model
@@ -0,0 +1,151 @@
+"""
+Unit tests for the PII scan view of a notebook and the notebook guardrails.
+"""
+
+import asyncio
+import base64
+import os
+import sys
+from types import SimpleNamespace
+
+import nbformat
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai import types
+
+from agents.parser_agent import create_parser_agent
+from src.callbacks.pii_guardrail import pii_tool_guardrail
+from src.pipeline.engine import run_agent
+from src.pipeline.notebook_stream import iter_cells
+from src.pipeline.scan_view import build_scan_view, check_notebook_pii
+from src.tools.notebook_tools import read_notebook
+from src.utils.security import check_pii, get_pii_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    get_pii_cache().clear()
+
+
+def digit_image():
+    # Digit runs between "/" and "+" in base64 data look like phone and card numbers.
+    png = base64.b64encode(os.urandom(3000)).decode("ascii") + "/5551234567+4111111111111111/AAAA"
+    assert check_pii(png)
+    return nbformat.v4.new_output("display_data", data={"image/png": png, "text/plain": "<Figure>"})
+
+
+def test_text_outputs_are_read_and_binary_skipped(tmp_path, write_notebook):
+    cell = nbformat.v4.new_code_cell("df.head()")
+    cell.outputs = [
+        digit_image(),
+        nbformat.v4.new_output("stream", text=["a\n", "b\n"]),
+        nbformat.v4.new_output("execute_result", data={"text/plain": "plain", "text/html": "<b>html</b>"}),
+        nbformat.v4.new_output("error", ename="KeyError", evalue="'x'", traceback=["\x1b[31mKeyError"]),
+    ]
+    path = write_notebook(tmp_path / "nb.ipynb", [cell])
+    assert list(iter_cells(path))[0].outputs == []
+    outputs = list(iter_cells(path, block_size=5, text_outputs=True))[0].outputs
+    assert outputs == ["<Figure>", "a\nb\n", "plain", "KeyError\n'x'"]
+
+
+def test_images_do_not_trigger_pii(tmp_path, write_notebook):
+    cell = nbformat.v4.new_code_cell("plt.plot(x)")
+    cell.outputs = [digit_image()]
+    path = write_notebook(tmp_path / "plots.ipynb", [cell])
+    with open(path) as f:
+        assert check_pii(f.read())
+    assert check_notebook_pii(path) == []
+    assert len(build_scan_view(path).text) < 100
+
+
+def test_pii_is_located_in_sources_and_outputs(tmp_path, write_notebook):
+    printed = nbformat.v4.new_code_cell("print(users.email[0])")
+    printed.outputs = [digit_image(), nbformat.v4.new_output("stream", text="someone@example.com\n")]
+    path = write_notebook(tmp_path / "nb.ipynb", [
+        nbformat.v4.new_markdown_cell("# Users"),
+        printed,
+        nbformat.v4.new_code_cell("server = '10.0.0.1'"),
+    ])
+    view = build_scan_view(path)
+    assert view.check_pii() == [
+        "Detected potential Email Address (cell 1 output 1)",
+        "Detected potential IP Address (cell 2 source)",
+    ]
+    segment = view.locate(view.text.index("server"))
+    assert (segment.cell, segment.output) == (2, None)
+    assert view.locate(view.text.index("# Users") + len("# Users")) is None
+
+
+def test_other_files_are_scanned_raw(tmp_path):
+    path = tmp_path / "script.ipynb"
+    path.write_text("# Cell 1\nphone = '555-123-4567'\n")
+    assert check_notebook_pii(str(path)) == ["Detected potential Phone Number (notebook file)"]
+    path.write_text('{"worksheets": [{"cells": []}], "metadata": {"author": "a@b.org"}}')
+    assert check_notebook_pii(str(path)) == ["Detected potential Email Address (notebook file)"]
+
+
+def test_first_only_reports_one_warning(tmp_path, write_notebook):
+    path = write_notebook(tmp_path / "nb.ipynb", [
+        nbformat.v4.new_code_cell("server = '10.0.0.1'"),
+        nbformat.v4.new_code_cell("owner = 'a@b.org'"),
+    ])
+    assert len(check_notebook_pii(path, first_only=True)) == 1
+    assert len(check_notebook_pii(path)) == 2
+
+
+def read_notebook_tool(path):
+    return SimpleNamespace(name="read_notebook"), {"result": read_notebook(path)}
+
+
+def test_clean_pre_check_makes_the_tool_guardrail_a_lookup(tmp_path, write_notebook):
+    cells = [nbformat.v4.new_markdown_cell("Notes"), nbformat.v4.new_code_cell("x = 1"), nbformat.v4.new_code_cell("")]
+    path = write_notebook(tmp_path / "nb.ipynb", cells)
+    assert check_notebook_pii(path) == []
+    cache = get_pii_cache()
+    misses = cache.misses
+
+    tool, response = read_notebook_tool(path)
+    assert pii_tool_guardrail(tool, {"path": path}, None, response) is None
+    assert cache.misses == misses and cache.hits == 1
+
+
+def test_tool_guardrail_withholds_pii(tmp_path, write_notebook):
+    path = write_notebook(tmp_path / "nb.ipynb", [nbformat.v4.new_code_cell("owner = 'a@b.org'")])
+    tool, response = read_notebook_tool(path)
+    blocked = pii_tool_guardrail(tool, {"path": path}, None, response)
+    assert "PII Detected" in blocked["result"] and "a@b.org" not in blocked["result"]
+    assert pii_tool_guardrail(tool, {"path": path}, None, response["result"]) == blocked
+    assert pii_tool_guardrail(SimpleNamespace(name="read_file"), {}, None, response) is None
+
+
+class ReadingLlm(BaseLlm):
+    """Calls read_notebook once, then records the tool result it is given."""
+    path: str = ""
+    seen: list = []
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        last = llm_request.contents[-1].parts[0]
+        if last.function_response is None:
+            call = types.FunctionCall(name="read_notebook", args={"path": self.path})
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+            return
+        self.seen.append(last.function_response.response["result"])
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="{}")]))
+
+
+def test_parser_agent_never_sees_pii_from_the_tool(tmp_path, write_notebook):
+    path = write_notebook(tmp_path / "nb.ipynb", [nbformat.v4.new_code_cell("owner = 'a@b.org'")])
+    model = ReadingLlm(model="reader", path=path, seen=[])
+
+    async def run():
+        service = InMemorySessionService()
+        await service.create_session(app_name="test_app", user_id="u", session_id="s")
+        agent = create_parser_agent(model=model)
+        return await run_agent(agent, "Parse the notebook.", service, "u", "s", app_name="test_app")
+
+    asyncio.run(run())
+    assert len(model.seen) == 1 and model.seen[0].startswith("SECURITY ALERT")
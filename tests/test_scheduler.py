@@ -0,0 +1,206 @@
+"""
+Unit tests for the shared rate-limit scheduler.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from google.genai.errors import ClientError, ServerError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.model_registry import ModelRegistry, ScheduledGemini
+from src.scheduler import (
+    _POLL_INTERVAL, BATCH, INTERACTIVE, RateLimitScheduler, TokenBucket, current_priority, priority_scope,
+    retry_delay_hint,
+)
+
+
+def _rate_limited(retry_delay=None):
+    details = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": retry_delay}] if retry_delay else []
+    return ClientError(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED",
+                                       "message": "quota", "details": details}})
+
+
+def _flaky(failures, error_factory=_rate_limited):
+    """A call that raises ``failures`` times, then yields one response."""
+    attempts = []
+
+    async def start():
+        attempts.append(1)
+        if len(attempts) <= failures:
+            raise error_factory()
+        yield "response"
+
+    return start, attempts
+
+
+async def _collect(scheduler, start, model="m", tokens=1):
+    return [response async for response in scheduler.stream(model, tokens, start)]
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(60)  # one token per second
+    bucket._updated = 0.0
+    bucket.take(60, now=0.0)
+    assert bucket.wait_time(1, now=0.0) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now=1.0) == 0.0
+    # More than a full bucket only waits for a full bucket.
+    assert bucket.wait_time(1000, now=1.0) == pytest.approx(59.0)
+
+
+def test_retries_rate_limit_errors_with_backoff():
+    scheduler = RateLimitScheduler(base_delay=0.01, max_delay=0.02)
+    start, attempts = _flaky(2)
+    assert asyncio.run(_collect(scheduler, start)) == ["response"]
+    assert len(attempts) == 3
+    stats = scheduler.stats()
+    assert stats["retries"] == 2
+    assert stats["rate_limited"] == 2
+    assert stats["calls"] == 3
+
+
+def test_retries_transient_server_errors():
+    scheduler = RateLimitScheduler(base_delay=0.01, max_delay=0.02)
+    start, attempts = _flaky(1, lambda: ServerError(503, {"error": {"code": 503, "message": "busy"}}))
+    assert asyncio.run(_collect(scheduler, start)) == ["response"]
+    assert scheduler.stats()["rate_limited"] == 0
+
+
+def test_gives_up_after_max_retries():
+    scheduler = RateLimitScheduler(max_retries=1, base_delay=0.01, max_delay=0.02)
+    start, attempts = _flaky(5)
+    with pytest.raises(ClientError):
+        asyncio.run(_collect(scheduler, start))
+    assert len(attempts) == 2
+
+
+def test_does_not_retry_other_errors():
+    scheduler = RateLimitScheduler(base_delay=0.01)
+    start, attempts = _flaky(1, lambda: ClientError(400, {"error": {"code": 400, "message": "bad request"}}))
+    with pytest.raises(ClientError):
+        asyncio.run(_collect(scheduler, start))
+    assert len(attempts) == 1
+
+
+def test_does_not_retry_after_partial_output():
+    scheduler = RateLimitScheduler(base_delay=0.01)
+    attempts = []
+
+    async def start():
+        attempts.append(1)
+        yield "chunk"
+        raise _rate_limited()
+
+    seen = []
+
+    async def consume():
+        async for response in scheduler.stream("m", 1, start):
+            seen.append(response)
+
+    with pytest.raises(ClientError):
+        asyncio.run(consume())
+    assert seen == ["chunk"]
+    assert len(attempts) == 1
+
+
+def test_backoff_honours_retry_delay_hint():
+    error = _rate_limited("3s")
+    assert retry_delay_hint(error) == 3.0
+    scheduler = RateLimitScheduler(base_delay=0.1, max_delay=10)
+    assert scheduler.backoff(0, error) >= 3.0
+    for attempt in range(10):
+        delay = scheduler.backoff(attempt)
+        assert 0 < delay <= 10
+
+
+def test_requests_per_minute_paces_calls():
+    scheduler = RateLimitScheduler(rpm=600)  # burst of 600, then 10 per second
+
+    async def run():
+        bucket, _ = scheduler._buckets_for("m")
+        bucket.level = 0
+        start = time.monotonic()
+        for _ in range(3):
+            await scheduler.acquire("m", tokens=1)
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.25
+
+
+def test_interactive_calls_are_admitted_before_batch_calls():
+    scheduler = RateLimitScheduler(rpm=600)
+    order = []
+
+    async def call(name, priority):
+        with priority_scope(priority):
+            await scheduler.acquire("m", tokens=1)
+        order.append(name)
+
+    async def run():
+        bucket, _ = scheduler._buckets_for("m")
+        bucket.level = 0
+        batch = [asyncio.create_task(call(f"batch{i}", BATCH)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(call("interactive", INTERACTIVE))
+        await asyncio.gather(*batch, interactive)
+
+    asyncio.run(run())
+    # The first batch call was already at the head of the queue.
+    assert order.index("interactive") <= 1
+
+
+def test_paused_model_does_not_delay_other_models():
+    scheduler = RateLimitScheduler(rpm=600)
+    scheduler._pause("a", 5.0)
+
+    async def run():
+        paused = asyncio.create_task(scheduler.acquire("a", tokens=1))
+        await asyncio.sleep(0.01)
+        start = time.monotonic()
+        await asyncio.wait_for(scheduler.acquire("b", tokens=1), timeout=1.0)
+        waited = time.monotonic() - start
+        assert not paused.done()
+        paused.cancel()
+        return waited
+
+    assert asyncio.run(run()) < _POLL_INTERVAL * 2
+    assert scheduler._queues == {}
+
+
+def test_priority_scope_restores_previous_priority():
+    assert current_priority() == INTERACTIVE
+    with priority_scope(BATCH):
+        assert current_priority() == BATCH
+    assert current_priority() == INTERACTIVE
+
+
+def test_token_usage_is_settled():
+    scheduler = RateLimitScheduler(tpm=1000)
+    asyncio.run(scheduler.acquire("m", tokens=400))
+    _, tokens = scheduler._buckets_for("m")
+    assert tokens.level == pytest.approx(600, abs=1)
+    scheduler.settle("m", reserved=400, used=100)
+    assert tokens.level == pytest.approx(900, abs=1)
+
+
+def test_registry_models_are_scheduled():
+    model = ModelRegistry().get("gemini-2.0-flash", api_key="key")
+    assert isinstance(model, ScheduledGemini)
+
+
+def test_run_sync_keeps_caller_priority():
+    registry = ModelRegistry()
+
+    async def priority():
+        return current_priority()
+
+    try:
+        with priority_scope(BATCH):
+            assert registry.run_sync(priority()) == BATCH
+        assert registry.run_sync(priority()) == INTERACTIVE
+    finally:
+        registry.clear()
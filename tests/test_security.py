@@ -0,0 +1,171 @@
+"""
+Unit tests for the PII scanner.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils.security import (
+    CREDIT_CARD, EMAIL, IP_ADDRESS, PHONE, PiiCache, PiiMatch, check_pii, get_pii_cache, luhn_valid,
+    scan_pii, scan_pii_blocks, scan_pii_file, scan_pii_text,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    get_pii_cache().clear()
+
+
+def kinds(text):
+    return [(match.kind, text[match.start:match.end]) for match in scan_pii(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("mail jane.doe+nb@example.co.uk now", [(EMAIL, "jane.doe+nb@example.co.uk")]),
+    ("call (555) 123-4567", [(PHONE, "555) 123-4567")]),
+    ("call +1-555-123-4567.", [(PHONE, "1-555-123-4567")]),
+    ("call 5551234567", [(PHONE, "5551234567")]),
+    ("host 192.168.0.12:80", [(IP_ADDRESS, "192.168.0.12")]),
+    ("card 4111 1111 1111 1111", [(CREDIT_CARD, "4111 1111 1111 1111")]),
+    ("card 4111-1111-1111-1111!", [(CREDIT_CARD, "4111-1111-1111-1111")]),
+])
+def test_detects_each_kind(text, expected):
+    assert kinds(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "user@localhost",
+    "version 1.2.3.4.5.6 and 999.1.1.1",
+    "id abc5551234567 and 5551234567xyz",
+    "order 4111 1111 1111 1112",
+    "np.random.seed(1234567890123456789012)",
+    "lr = 0.001, epochs = 100",
+])
+def test_ignores_lookalikes(text):
+    assert scan_pii(text) == []
+
+
+def test_luhn():
+    assert luhn_valid("4111111111111111") and luhn_valid("79927398713")
+    assert not luhn_valid("4111111111111112")
+
+
+def test_check_pii_keeps_its_warnings():
+    text = "10.0.0.1 4111111111111111 555.123.4567 a@b.org"
+    assert check_pii(text) == [
+        "Detected potential Email Address", "Detected potential Phone Number",
+        "Detected potential IP Address", "Detected potential Credit Card Number",
+    ]
+    assert scan_pii(text)[0] == PiiMatch(IP_ADDRESS, 0, 8)
+    assert check_pii("no personal data here") == []
+
+
+@pytest.mark.parametrize("text", [
+    "1-" * 50000,
+    "a" * 100000 + "@",
+    "a@" * 50000,
+    "1 " * 50000 + "x",
+    "123 " * 25000,
+    ("1" * 12 + "x ") * 7000,
+    "@" + "a." * 50000,
+    "1.1.1.1." * 12000,
+])
+def test_adversarial_inputs_scan_in_linear_time(text):
+    # The previous patterns took over 10 s on the first of these.
+    start = time.perf_counter()
+    scan_pii(text)
+    assert time.perf_counter() - start < 1.0
+
+
+def pii_text():
+    filler = "x = model.fit(X_train, y_train)  # epoch 12\n"
+    pieces = ["mail jane.doe@example.com", "call 555-123-4567", "host 10.0.0.12", "card 4111 1111 1111 1111"]
+    parts = []
+    for i in range(40):
+        parts.append(filler * (i % 7) + "z" * (i * 13 % 31))
+        parts.append(pieces[i % len(pieces)] + " ")
+    return "".join(parts)
+
+
+def blocks_of(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 37, 600, 5000])
+def test_chunked_scan_matches_single_pass(size):
+    text = pii_text()
+    expected = scan_pii(text)
+    assert len(expected) == 40
+    assert scan_pii_blocks(blocks_of(text, size)) == expected
+
+
+def test_parallel_scan_matches_single_pass(tmp_path):
+    text = pii_text()
+    assert scan_pii_blocks(blocks_of(text, 300), parallel=True, workers=2) == scan_pii(text)
+    assert scan_pii_text(text, chunk_size=300, workers=2, parallel_threshold=0) == scan_pii(text)
+    path = tmp_path / "notebook.txt"
+    path.write_text(text)
+    assert scan_pii_file(str(path), chunk_size=300, workers=2, parallel_threshold=0) == scan_pii(text)
+    assert len(scan_pii_file(str(path), first_only=True, chunk_size=300, workers=2, parallel_threshold=0)) == 1
+
+
+def test_first_only_stops_early():
+    consumed = []
+
+    def blocks():
+        for i in range(1000):
+            consumed.append(i)
+            yield ("a@b.org " if i == 3 else "no data here. ") * 50
+
+    assert scan_pii_blocks(blocks(), first_only=True) == [PiiMatch(EMAIL, 3 * 700, 3 * 700 + 7)]
+    assert len(consumed) < 10
+    assert scan_pii("a@b.org 10.0.0.1", first_only=True) == [PiiMatch(EMAIL, 0, 7)]
+
+
+def test_overlap_must_cover_a_match():
+    with pytest.raises(ValueError):
+        scan_pii_blocks(["text"], overlap=10)
+
+
+def test_repeated_scans_hit_the_cache(tmp_path):
+    cache = get_pii_cache()
+    text = pii_text()
+    first = scan_pii(text)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert check_pii(text) and scan_pii(text) == first
+    assert scan_pii_text(text, chunk_size=300, workers=2, parallel_threshold=0) == first
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    path = tmp_path / "notebook.txt"
+    path.write_text(text)
+    assert scan_pii_file(str(path)) == first
+    assert scan_pii_file(str(path)) == first
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_first_only_results_are_partial():
+    cache = get_pii_cache()
+    text = "a@b.org and 10.0.0.1"
+    assert scan_pii(text, first_only=True) == [PiiMatch(EMAIL, 0, 7)]
+    assert len(scan_pii(text)) == 2
+    assert cache.misses == 2
+    assert scan_pii(text, first_only=True) == [PiiMatch(EMAIL, 0, 7)]
+    # A clean first-only scan is a complete answer.
+    assert scan_pii("nothing here", first_only=True) == [] and scan_pii("nothing here") == []
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_cache_is_bounded_lru():
+    cache = PiiCache(max_entries=2)
+    cache.store("a", [])
+    cache.store("b", [PiiMatch(EMAIL, 0, 7)])
+    assert cache.lookup("a") == []
+    cache.store("c", [])
+    assert len(cache) == 2 and cache.lookup("b") is None and cache.lookup("a") == []
+    with pytest.raises(ValueError):
+        PiiCache(max_entries=0)
@@ -0,0 +1,101 @@
+"""
+Unit tests for streaming agent output.
+"""
+
+import asyncio
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.adk import Agent
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents, run_agent
+from src.pipeline.streaming import ConsolePrinter, StageTranscript, StreamEvent
+from src.replay_llm import ReplayLlm, replay_models
+
+TEXT = "The quick brown fox jumps over the lazy dog, twice over."
+
+
+def run_streaming_agent(on_event):
+    async def run():
+        service = InMemorySessionService()
+        await service.create_session(app_name="test_app", user_id="u", session_id="s")
+        model = ReplayLlm(model="replay", turns=[{"text": TEXT}], chunk_chars=8)
+        agent = Agent(model=model, name="writer_agent", instruction="test")
+        usage = {}
+        text = await run_agent(agent, "go", service, "u", "s", app_name="test_app", usage=usage, on_event=on_event)
+        return text, usage
+
+    return asyncio.run(run())
+
+
+def test_partial_chunks_arrive_before_final_text():
+    events = []
+    text, usage = run_streaming_agent(events.append)
+
+    partial = [e for e in events if e.partial]
+    assert len(partial) == -(-len(TEXT) // 8)
+    assert "".join(e.text for e in partial) == TEXT
+    assert events[-1] == StreamEvent("writer_agent", "text", TEXT)
+    # The streamed chunks are not counted twice.
+    assert text == TEXT
+    assert usage["completion_tokens"] == len(TEXT) // 4
+
+
+def test_no_streaming_without_callback():
+    text, _ = run_streaming_agent(None)
+    assert text == TEXT
+
+
+def test_engine_streams_tool_calls(tmp_path):
+    recording = {
+        "parser_agent": [
+            {"function_calls": [{"name": "read_notebook", "args": {"path": "missing.ipynb"}}]},
+            {"text": '{"code": "x = 1", "documentation": ""}'},
+        ],
+        "architect_agent": [{"text": '{"OUTPUT": {"train.py": "Training"}}'}],
+        "refactorer_agent": [{"text": "Written."}],
+        "devops_agent": [{"text": "Written."}],
+        "reviewer_agent": [{"text": "APPROVED"}],
+    }
+    events = []
+    engine = PipelineEngine(agents=create_pipeline_agents(models=replay_models(recording)), on_event=events.append,
+                            llm_parser=True)
+    result = asyncio.run(engine.run("missing.ipynb"))
+
+    assert result.approved
+    assert result.outputs["parser_agent"] == '{"code": "x = 1", "documentation": ""}'
+    kinds = [(e.stage, e.kind) for e in events if not e.partial]
+    assert kinds[:3] == [("parser_agent", "tool_call"), ("parser_agent", "tool_result"), ("parser_agent", "text")]
+    assert {stage for stage, _ in kinds} == {
+        "parser_agent", "architect_agent", "refactorer_agent", "devops_agent", "reviewer_agent"
+    }
+
+
+def test_console_printer_prefixes_interleaved_stages():
+    out = io.StringIO()
+    printer = ConsolePrinter(stream=out)
+    for event in [
+        StreamEvent("a", "text", "Hel", partial=True),
+        StreamEvent("b", "text", "Wor", partial=True),
+        StreamEvent("a", "text", "lo", partial=True),
+        StreamEvent("a", "text", "Hello"),
+        StreamEvent("b", "text", "World"),
+        StreamEvent("c", "text", "Cached"),
+    ]:
+        printer(event)
+    printer.status("done")
+    assert out.getvalue() == "[a] Hel\n[b] Wor\n[a] lo\n[c] Cached\ndone\n"
+
+
+def test_transcript_replaces_chunks_with_final_text():
+    transcript = StageTranscript()
+    transcript.add(StreamEvent("a", "tool_call", "write_file(path=x.py)"))
+    transcript.add(StreamEvent("a", "text", "Do", partial=True))
+    transcript.add(StreamEvent("a", "text", "ne", partial=True))
+    assert transcript.render("a").endswith("Done ▌")
+    transcript.add(StreamEvent("a", "text", "Done."))
+    assert transcript.render("a") == "🔧 `write_file(path=x.py)`\n\nDone."
@@ -0,0 +1,59 @@
+"""
+Unit tests for pipeline tracing.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.callbacks.tracing_plugin import TracingPlugin
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.replay_llm import replay_models
+from src.utils.tracing import Tracer
+
+
+def test_spans_cover_stages_models_and_tools(tmp_path):
+    recording = {
+        "parser_agent": [{"text": "{}"}],
+        "architect_agent": [{"text": "{}"}],
+        "refactorer_agent": [
+            {"function_calls": [{"name": "write_file", "args": {"path": str(tmp_path / "a.py"), "content": "a = 1\n"}}]},
+            {"text": "Written."},
+        ],
+        "devops_agent": [{"text": "Nothing to do."}],
+        "reviewer_agent": [{"text": "APPROVED"}],
+    }
+    tracer = Tracer()
+    engine = PipelineEngine(
+        agents=create_pipeline_agents(output_dir=str(tmp_path), models=replay_models(recording)),
+        plugins=[TracingPlugin(tracer)],
+        tracer=tracer,
+        llm_parser=True,
+    )
+    asyncio.run(engine.run("notebook.ipynb"))
+
+    spans = {span.span_id: span for span in tracer.spans}
+    kinds = [span.kind for span in spans.values()]
+    assert kinds.count("run") == 1 and kinds.count("round") == 1 and kinds.count("stage") == 5
+    assert kinds.count("model") == 6 and kinds.count("tool") == 1
+    assert all(span.end is not None for span in spans.values())
+
+    for span in spans.values():
+        if span.kind in ("model", "tool"):
+            assert spans[span.parent_id].kind == "stage"
+            assert spans[span.parent_id].attrs["agent"] == span.attrs["agent"]
+
+    summary = tracer.summary()
+    assert summary["refactorer_agent"]["model_calls"] == 2
+    assert summary["refactorer_agent"]["tool_calls"] == {"write_file": 1}
+    assert summary["refactorer_agent"]["prompt_tokens"] > 0
+    assert "refactorer_agent" in tracer.format_summary()
+
+    trace_path = tmp_path / "trace.json"
+    tracer.export(str(trace_path))
+    exported = json.loads(trace_path.read_text())
+    assert len(exported["spans"]) == len(spans)
+    assert all(s["duration_ms"] >= 0 for s in exported["spans"])
@@ -0,0 +1,91 @@
+"""
+Unit tests for the local static checks of generated projects.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.pipeline.engine import PipelineEngine, create_pipeline_agents
+from src.pipeline.feedback import parse_feedback
+from src.pipeline.verification import VERIFIED, verify_project
+from src.replay_llm import replay_models
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_clean_project_is_verified(tmp_path):
+    write(tmp_path / "src" / "__init__.py", "")
+    write(tmp_path / "src" / "model.py", "import json\n\ndef build():\n    return json.dumps({})\n")
+    write(tmp_path / "src" / "train.py", "from src.model import build\nfrom .model import build as b2\n")
+    write(tmp_path / "main.py", "import model_helpers\nfrom src import train\n")
+    write(tmp_path / "model_helpers.py", "")
+    write(tmp_path / "tests" / "test_model.py", "try:\n    import not_installed_pkg\nexcept ImportError:\n    pass\n")
+
+    report = verify_project(str(tmp_path))
+    assert report.files_checked == 6
+    assert report.ok, report.issues
+    assert report.to_feedback() == VERIFIED
+
+
+def test_syntax_and_import_errors_are_reported(tmp_path):
+    write(tmp_path / "src" / "data.py", "def load():\n  x = 1\n    return x\n")
+    write(tmp_path / "src" / "train.py", "import json\nfrom src.missing import thing\nimport nonexistent_pkg_xyz\n")
+
+    report = verify_project(str(tmp_path))
+    kinds = sorted((os.path.basename(i.path), i.line, i.kind) for i in report.issues)
+    assert kinds == [("data.py", 3, "syntax"), ("train.py", 2, "import"), ("train.py", 3, "import")]
+
+
+def test_undefined_names_are_reported(tmp_path):
+    write(tmp_path / "train.py", "import json\n\ndef fit(data):\n    return json.dumps(data), model\n")
+    write(tmp_path / "star.py", "from json import *\n\nprint(dumps({}))\n")
+    report = verify_project(str(tmp_path))
+    assert [(os.path.basename(i.path), i.line, i.kind, i.message) for i in report.issues] == [
+        ("train.py", 4, "lint", "undefined name 'model'"),
+    ]
+
+
+def test_declared_requirements_count_as_available(tmp_path):
+    write(tmp_path / "train.py", "import nonexistent_pkg_xyz\nfrom sklearn_like_pkg import fit\n")
+    write(tmp_path / "requirements.txt", "# deps\nnonexistent-pkg-xyz>=1.0\nsklearn_like_pkg==2.0\n")
+    assert verify_project(str(tmp_path)).ok
+
+
+def test_feedback_maps_to_failing_files(tmp_path):
+    write(tmp_path / "train.py", "import nonexistent_pkg_xyz\n")
+    write(tmp_path / "model.py", "x = 1\n")
+    feedback = verify_project(str(tmp_path)).to_feedback()
+    plan = parse_feedback(feedback, str(tmp_path), [str(tmp_path / "train.py"), str(tmp_path / "model.py")])
+    assert list(plan.work_items) == [str(tmp_path / "train.py")]
+
+
+def test_failed_checks_skip_the_reviewer(tmp_path):
+    output_dir = tmp_path / "OUTPUT"
+    broken = str(output_dir / "train.py")
+    recording = {
+        "parser_agent": [{"text": '{"code": "x = 1", "documentation": ""}'}],
+        "architect_agent": [{"text": '{"OUTPUT": {"train.py": "Training"}}'}],
+        "refactorer_agent": [
+            {"function_calls": [{"name": "write_file", "args": {"path": broken, "content": "def f(:\n"}}]},
+            {"text": "Written."},
+            {"function_calls": [{"name": "write_file", "args": {"path": broken, "content": "def f():\n    pass\n"}}]},
+            {"text": "Fixed."},
+        ],
+        "devops_agent": [{"text": "Nothing to do."}],
+        "reviewer_agent": [{"text": "APPROVED"}],
+    }
+    models = replay_models(recording)
+    agents = create_pipeline_agents(output_dir=str(output_dir), models=models)
+    engine = PipelineEngine(agents=agents, output_dir=str(output_dir), max_rounds=3, llm_parser=True)
+    result = asyncio.run(engine.run("notebook.ipynb"))
+
+    assert result.approved and result.rounds == 2
+    # Round 1 failed the static checks, so the reviewer was only called in round 2.
+    assert models["reviewer"].calls == 1
+    assert result.outputs["verifier"] == VERIFIED